@@ -0,0 +1,407 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+
+from datetime import datetime
+
+from common.constants import BREAK_LOOP, FFMPEG_CODEC, FFMPEG_CRF, FFMPEG_PIPE_PIXEL_FORMAT, FFMPEG_PRESET, GRAPH_ENGINE, PROTON_ENERGIES, UPDATE_PERCENTAGE, UPDATE_STEP, VIDEO_ENCODER, VIDEO_FPS
+from common.exceptions import NoDataFoundError
+from common.progress import format_duration
+from controller.batchrenderer import BatchRenderer
+from controller.videogenerator import VideoGenerator
+from model.particlefluxgraphimages import GRAPH_ENGINES
+from model.solarframecache import get_frame_cache
+from model.videoencoders import FFMPEG_CODECS, FFMPEG_PIPE_PIXEL_FORMATS, FFMPEG_PRESETS, VIDEO_ENCODERS
+from model.videolayout import VIDEO_PANELS
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Values of the request for every format and quality of the command line
+FORMATS = {"horizontal": "YouTube (horizontal)", "vertical": "Instagram (vertical)"}
+QUALITIES = {"medium": "Medium (720p)", "high": "High (1080p)"}
+
+# Default values of the request spec
+DEFAULT_SPEC = {
+    "begin": None,
+    "end": None,
+    "input": None,
+    "output": None,
+    "format": "horizontal",
+    "quality": "medium",
+    "solar_activity": False,
+    "protons": [],
+    "neutrons": False,
+    "comment": "",
+    "export_frames": None,
+    "name": None,
+    "variants": [],
+    "profile": False,
+    "encoder": None,
+    "fps": None,
+    "codec": None,
+    "crf": None,
+    "preset": None,
+    "pipe_format": None,
+    "graph_engine": None,
+    "layout": None
+}
+
+# Settings of the video encoder, by request spec key (the default ones are used for the settings that are not given)
+ENCODER_SETTINGS = {"encoder": "Backend", "fps": "FPS", "codec": "Codec", "crf": "CRF", "preset": "Preset", "pipe_format": "PipePixelFormat"}
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+class ConsoleProgress():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## It replaces the queue of the Loading Frame: the messages put by the video generator
+    ## are printed on the standard error stream, so that the standard output is kept for the paths of the videos
+    ## Every line starts with prefix (the name of the job in a batch)
+    def __init__(self, stream = sys.stderr, prefix = ""):
+
+        # Defining attributes from parameters
+        self.stream = stream
+        self.prefix = prefix
+
+        # Last percentage printed, to print a percentage only when it changes
+        self.last_percentage = None
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function called by the video generator, like Queue.put()
+    def put(self, message : tuple):
+
+        (signal, content) = message
+
+        # A new step has started
+        if signal == UPDATE_STEP:
+            self.last_percentage = None
+            print(f"{self.prefix}[{content['current_step']}/{content['total_steps']}] {content['new_step_content']}", file=self.stream, flush=True)
+
+        # The percentage of the current step has increased
+        elif signal == UPDATE_PERCENTAGE:
+            percentage = int(content["current_step"] * 100 / content["total_steps"]) if content["total_steps"] else 100
+
+            if percentage != self.last_percentage:
+                self.last_percentage = percentage
+                # Adding the throughput and the remaining time of the step, when they are known
+                throughput = ""
+
+                if content.get("items_per_second") is not None:
+                    throughput += f", {content['items_per_second']:.1f} frames/s"
+
+                if content.get("remaining_seconds") is not None and content["current_step"] < content["total_steps"]:
+                    throughput += f", {format_duration(content['remaining_seconds'])} left"
+
+                print(f"{self.prefix}    {percentage:3d}% ({content['current_step']}/{content['total_steps']}{throughput})", file=self.stream, flush=True)
+
+        # The generation is over
+        elif signal == BREAK_LOOP:
+            if content.get("error") is not None:
+                print(f"{self.prefix}Failed: {content['error']}", file=self.stream, flush=True)
+            elif content.get("is_cancelled"):
+                print(f"{self.prefix}Cancelled", file=self.stream, flush=True)
+            else:
+                print(f"{self.prefix}Done!", file=self.stream, flush=True)
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Function building the parser of the command line
+def build_argument_parser() -> argparse.ArgumentParser:
+
+    parser = argparse.ArgumentParser(description="Renders a SolarActivid video without the graphical interface. The request can be given in a JSON spec file (--spec), whose values are replaced by the ones given on the command line. Several videos can be rendered at once from a manifest (--manifest), loading their common inputs only once.")
+
+    # Request spec
+    parser.add_argument("--spec", help="JSON file of the request, with the keys: begin, end, input, output, format, quality, solar_activity, protons, neutrons, comment, export_frames, name, variants, profile, encoder, fps, codec, crf, preset, pipe_format, graph_engine, layout")
+    parser.add_argument("--manifest", help="JSON file of a batch: {\"defaults\": {spec}, \"jobs\": [{spec}, ...]}, where the values of a job replace the ones of the command line, which replace the defaults")
+
+    # Time range
+    parser.add_argument("--begin", help="beginning of the time range, like 2024-06-17 05:00")
+    parser.add_argument("--end", help="end of the time range, like 2024-06-18 17:00")
+
+    # Folders
+    parser.add_argument("--input", help="folder of the solar activity images and particle flux files")
+    parser.add_argument("--output", help="folder where the video is written (created if it doesn't exist)")
+
+    # Format & Quality
+    parser.add_argument("--format", choices=FORMATS.keys())
+    parser.add_argument("--quality", choices=QUALITIES.keys())
+    parser.add_argument("--variant", dest="variants", action="append", metavar="FORMAT:QUALITY", help="add a video of this format and quality, like horizontal:high (can be repeated: every video is generated in the same pass, from inputs loaded once)")
+
+    # Contents of the video
+    parser.add_argument("--solar-activity", dest="solar_activity", action="store_true", default=None, help="add the solar activity images")
+    parser.add_argument("--protons", help="add the proton flux graph of these energies, separated by commas, like \">=10 MeV,>=100 MeV\" (\"all\" for every energy)")
+    parser.add_argument("--neutrons", action="store_true", default=None, help="add the neutron flux graph")
+    parser.add_argument("--comment", help="comment written under the images")
+
+    # Other options
+    parser.add_argument("--export-frames", dest="export_frames", help="folder where every frame is also exported as a PNG file")
+    parser.add_argument("--profile", action="store_true", default=None, help="profile the generation, and save the profiles next to the video (.pstats for pstats, .collapsed.txt for flame graphs)")
+    parser.add_argument("--name", help="name of the video file, without extension (built from the contents and the time range by default)")
+    parser.add_argument("--layout", help=f"rows of panels of the video from top to bottom, separated by semicolons, whose panels ({', '.join(VIDEO_PANELS)}) are separated by commas, like \"solar,protons;comment;neutrons\" (default: the layout of the format)")
+    parser.add_argument("--graph-engine", dest="graph_engine", choices=GRAPH_ENGINES, help=f"engine drawing the particle flux graph: matplotlib for every frame, or only the new segments of the lines drawn into the previous frame (default: {GRAPH_ENGINE})")
+
+    # Encoding
+    parser.add_argument("--encoder", choices=VIDEO_ENCODERS, help=f"backend writing the video: OpenCV's writer, or raw frames piped into an ffmpeg process (default: {VIDEO_ENCODER})")
+    parser.add_argument("--fps", type=float, help=f"frames per second of the video (default: {VIDEO_FPS})")
+    parser.add_argument("--codec", choices=FFMPEG_CODECS.keys(), help=f"codec of the ffmpeg encoder (default: {FFMPEG_CODEC})")
+    parser.add_argument("--crf", type=int, help=f"quality of the ffmpeg encoder, from 0 to 51, lower is better (default: {FFMPEG_CRF})")
+    parser.add_argument("--preset", choices=FFMPEG_PRESETS, help=f"preset of the ffmpeg encoder, slower presets give smaller videos (default: {FFMPEG_PRESET})")
+    parser.add_argument("--pipe-format", dest="pipe_format", choices=FFMPEG_PIPE_PIXEL_FORMATS, help=f"pixel format of the frames sent to ffmpeg (default: {FFMPEG_PIPE_PIXEL_FORMAT})")
+
+    # Cache
+    parser.add_argument("--clear-frame-cache", dest="clear_frame_cache", action="store_true", help="remove every resized solar activity frame kept on disk (except the ones of the processes running at the same time), before rendering the request if one is given")
+
+    return parser
+
+
+
+# Function giving the request spec, from the base spec (the defaults of a manifest), the spec file and the command line
+def get_request_spec(arguments : argparse.Namespace, base_spec = None) -> dict:
+
+    # Getting the default values, then the ones of the base spec and of the spec file
+    spec = dict(DEFAULT_SPEC)
+    spec.update(base_spec or {})
+
+    if arguments.spec is not None:
+        with open(arguments.spec, mode="r") as spec_file:
+            spec.update(json.load(spec_file))
+
+    # Replacing them by the ones given on the command line
+    for (one_key, value) in vars(arguments).items():
+        if one_key in spec and value is not None:
+            spec[one_key] = value
+
+    return spec
+
+
+
+# Function building the user request expected by the video generator (the same as the one of the App Frame) from a request spec
+def build_user_request(spec : dict) -> dict[str, any]:
+
+    # Checking the required values
+    for one_key in ("begin", "end", "input", "output"):
+        if spec[one_key] is None:
+            raise ValueError(f"The request has no {one_key} value")
+
+    # Getting the selected energies (as a list, or as a string of energies separated by commas)
+    protons = spec["protons"]
+
+    if isinstance(protons, str):
+        protons = PROTON_ENERGIES if protons.strip() == "all" else [one_energy.strip() for one_energy in protons.split(",") if one_energy.strip() != ""]
+
+    for one_energy in protons:
+        if one_energy not in PROTON_ENERGIES:
+            raise ValueError(f"Unknown proton energy {one_energy!r}, expected one of {', '.join(PROTON_ENERGIES)}")
+
+    # Getting the variants (as "format:quality" strings, or as {"format", "quality", "name"} specs)
+    variants = []
+
+    for one_variant in spec["variants"] or []:
+
+        if isinstance(one_variant, str):
+            (variant_format, _, variant_quality) = one_variant.partition(":")
+            one_variant = {"format": variant_format.strip(), "quality": variant_quality.strip() or spec["quality"]}
+
+        variant_format = one_variant.get("format", spec["format"])
+        variant_quality = one_variant.get("quality", spec["quality"])
+
+        if variant_format not in FORMATS or variant_quality not in QUALITIES:
+            raise ValueError(f"Unknown variant {variant_format}:{variant_quality}, expected a format of {', '.join(FORMATS)} and a quality of {', '.join(QUALITIES)}")
+
+        variants.append({"Format": FORMATS[variant_format], "Quality": QUALITIES[variant_quality]})
+
+        if one_variant.get("name"):
+            variants[-1]["VideoName"] = one_variant["name"]
+
+    # Building the request
+    user_request = {}
+
+    user_request["btnSolarActivityVideo"] = bool(spec["solar_activity"])
+    user_request["btnParticleFluxGraph"] = len(protons) > 0 or bool(spec["neutrons"])
+
+    user_request["BeginDatetime"] = datetime.fromisoformat(spec["begin"])
+    user_request["EndDatetime"] = datetime.fromisoformat(spec["end"])
+
+    user_request["Format"] = FORMATS[spec["format"]]
+    user_request["Quality"] = QUALITIES[spec["quality"]]
+
+    # The format and quality of the request are the ones of its first variant
+    if len(variants) > 0:
+        user_request["Variants"] = variants
+        user_request["Format"], user_request["Quality"] = variants[0]["Format"], variants[0]["Quality"]
+
+    user_request["InputFolder"] = spec["input"]
+    user_request["OutputFolder"] = spec["output"]
+
+    if user_request["btnParticleFluxGraph"]:
+        user_request["EnergyData"] = {
+            "ProtonFlux": len(protons) > 0,
+            "Energies": {one_energy: one_energy in protons for one_energy in PROTON_ENERGIES},
+            "NeutronFlux": bool(spec["neutrons"])
+        }
+
+    user_request["Comment"] = spec["comment"]
+
+    if spec["export_frames"] is not None:
+        user_request["ExportFramesFolder"] = spec["export_frames"]
+
+    if spec["name"] is not None:
+        user_request["VideoName"] = spec["name"]
+
+    if spec["profile"]:
+        user_request["Profile"] = True
+
+    if spec["graph_engine"] is not None:
+        user_request["GraphEngine"] = spec["graph_engine"]
+
+    # Getting the layout (as a list of rows of panels, or as a string of rows separated by semicolons)
+    layout = spec["layout"]
+
+    if isinstance(layout, str):
+        layout = [[one_panel.strip() for one_panel in one_row.split(",") if one_panel.strip() != ""] for one_row in layout.split(";")]
+
+    if layout is not None:
+        for one_panel in [one_panel for one_row in layout for one_panel in one_row]:
+            if one_panel not in VIDEO_PANELS:
+                raise ValueError(f"Unknown panel {one_panel!r}, expected one of {', '.join(VIDEO_PANELS)}")
+
+        user_request["Layout"] = layout
+
+    # Settings of the video encoder, when some are given
+    encoder_settings = {setting: spec[one_key] for (one_key, setting) in ENCODER_SETTINGS.items() if spec.get(one_key) is not None}
+
+    if len(encoder_settings) > 0:
+        user_request["Encoder"] = encoder_settings
+
+    return user_request
+
+
+
+# Function giving the user request of every job of a manifest
+def get_manifest_requests(arguments : argparse.Namespace) -> list:
+
+    with open(arguments.manifest, mode="r") as manifest_file:
+        manifest = json.load(manifest_file)
+
+    # The manifest can also be the list of jobs only
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+
+    # Getting the spec of the command line, over the defaults of the manifest
+    command_line_spec = get_request_spec(arguments, manifest.get("defaults"))
+
+    return [build_user_request({**command_line_spec, **one_job}) for one_job in manifest["jobs"]]
+
+
+
+# Function creating the output folders of a request
+def create_output_folders(user_request : dict[str, any]):
+
+    os.makedirs(user_request["OutputFolder"], exist_ok=True)
+
+    if "ExportFramesFolder" in user_request:
+        os.makedirs(user_request["ExportFramesFolder"], exist_ok=True)
+
+
+
+# Function rendering every job of a manifest, and giving the exit code of the program
+def run_manifest(parser : argparse.ArgumentParser, arguments : argparse.Namespace) -> int:
+
+    # Building the requests and planning the batch
+    try:
+        user_requests = get_manifest_requests(arguments)
+        job_names = [one_request.get("VideoName") or f"job {request_index + 1}" for (request_index, one_request) in enumerate(user_requests)]
+        batch_renderer = BatchRenderer(user_requests, [ConsoleProgress(prefix=f"{one_name}: ") for one_name in job_names])
+    except (OSError, ValueError, KeyError) as error:
+        parser.error(str(error))
+
+    for one_generator in batch_renderer.video_generators:
+        if not one_generator.has_content():
+            parser.error("Nothing to render in a job: select solar_activity, protons and/or neutrons")
+
+        create_output_folders(one_generator.userRequest)
+
+    # Rendering every job
+    errors = batch_renderer.run()
+
+    # Giving the path of every video on the standard output, and the errors on the standard error stream
+    for (one_name, one_generator, one_error) in zip(job_names, batch_renderer.video_generators, errors):
+        if one_error is None:
+            print(*one_generator.video_paths, sep="\n")
+        else:
+            print(f"Error in {one_name}: {one_error}", file=sys.stderr)
+
+        for one_path in one_generator.profile_paths:
+            print(f"{one_name}: profile saved in {one_path}", file=sys.stderr)
+
+    return 0 if all(one_error is None for one_error in errors) else 1
+
+
+
+# Function rendering the video of the command line request, and giving the exit code of the program
+def main(argv = None) -> int:
+
+    parser = build_argument_parser()
+    arguments = parser.parse_args(argv)
+
+    # Clearing the cache of the solar activity frames, and stopping there when nothing else is asked
+    if arguments.clear_frame_cache:
+        get_frame_cache().clear()
+        print("Solar activity frames cache cleared", file=sys.stderr)
+
+        if arguments.manifest is None and arguments.spec is None and arguments.begin is None:
+            return 0
+
+    # Rendering a batch
+    if arguments.manifest is not None:
+        return run_manifest(parser, arguments)
+
+    # Building the request
+    try:
+        user_request = build_user_request(get_request_spec(arguments))
+    except (OSError, ValueError, KeyError) as error:
+        parser.error(str(error))
+
+    # Creating the job generating the video, which prints its progress on the standard error stream
+    try:
+        video_generator = VideoGenerator(user_request, ConsoleProgress())
+    except ValueError as error:
+        parser.error(str(error))
+
+    if not video_generator.has_content():
+        parser.error("Nothing to render: select --solar-activity, --protons and/or --neutrons")
+
+    # Creating the output folders
+    create_output_folders(user_request)
+
+    # Generating the video
+    try:
+        video_generator.run()
+    except NoDataFoundError as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    finally:
+        for one_path in video_generator.profile_paths:
+            print(f"Profile saved in {one_path}", file=sys.stderr)
+
+    # Giving the path of every video on the standard output
+    print(*video_generator.video_paths, sep="\n")
+
+    return 0
+
+
+
+# Main function
+if __name__ == "__main__":
+
+    # Allowing the worker processes rendering the graphs to start from a frozen executable
+    multiprocessing.freeze_support()
+
+    sys.exit(main())
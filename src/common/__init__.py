@@ -1,3 +1,3 @@
-from .exceptions import NoDataFoundError
+from .exceptions import GenerationCancelledError, NoDataFoundError
 
-__all__ = ['NoDataFoundError']
\ No newline at end of file
+__all__ = ['GenerationCancelledError', 'NoDataFoundError']
\ No newline at end of file
@@ -0,0 +1,36 @@
+import threading
+
+from common.exceptions import GenerationCancelledError
+
+class CancellationToken():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The token of a video generation job, shared by the job and the objects producing its images:
+    ## the job is cancelled by cancel() (from any thread), and they stop between two frames with raise_if_cancelled()
+    def __init__(self):
+
+        # Event set when the job is cancelled
+        self.cancel_event = threading.Event()
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function cancelling the job
+    def cancel(self):
+        self.cancel_event.set()
+
+
+
+    # Function telling if the job has been cancelled
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+
+
+    # Function raising a GenerationCancelledError when the job has been cancelled
+    def raise_if_cancelled(self):
+        if self.cancel_event.is_set():
+            raise GenerationCancelledError("The video generation has been cancelled")
+    ## --------------------------------------------------------------------------------------------------------------------- ##
\ No newline at end of file
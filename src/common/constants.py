@@ -9,11 +9,129 @@ RESOLUTION_VERTICAL_MED = (720, 1280)
 RESOLUTION_HORIZONTAL_HIGH = (1920, 1080)
 RESOLUTION_VERTICAL_HIGH = (1080, 1920)
 
+# Energies of the GOES proton flux
+PROTON_ENERGIES = [">=1 MeV", ">=10 MeV", ">=100 MeV", ">=30 MeV", ">=5 MeV", ">=50 MeV", ">=500 MeV", ">=60 MeV"]
+
 # Comment block height
 COMMENT_BLOCK_HEIGHT = 60
 
+# Panels of the videos: solar activity images, particle flux graph (protons and neutrons in one image),
+# proton flux graph alone, neutron flux graph alone, and comment block (COMMENT_BLOCK_HEIGHT high)
+SOLAR_ACTIVITY_PANEL = "solar"
+PARTICLE_GRAPH_PANEL = "graph"
+PROTON_GRAPH_PANEL = "protons"
+NEUTRON_GRAPH_PANEL = "neutrons"
+COMMENT_PANEL = "comment"
+
+# Layout of the videos of every format: rows of panels from top to bottom, whose panels are side by side
+# The panels that are not in the video are left out, and the rows share the height that the comment rows don't use
+VIDEO_LAYOUTS = {
+    HORIZONTAL: [[SOLAR_ACTIVITY_PANEL, PARTICLE_GRAPH_PANEL], [COMMENT_PANEL]],
+    VERTICAL: [[SOLAR_ACTIVITY_PANEL], [COMMENT_PANEL], [PARTICLE_GRAPH_PANEL]]
+}
+
+# Streaming pipeline: frames are produced, combined and written to the video
+# one at a time, instead of building every list of images first
+STREAMING_PIPELINE = True
+
+# Frame buffers: when streaming, the new frames are combined into the pixels of the frames given two frames before,
+# whose black background and comment block are already drawn (the video writers only keep the previous frame)
+REUSE_FRAME_BUFFERS = True
+
+# Batch rendering: number of jobs of a batch rendered at the same time
+# (their graph rendering workers share the CPU cores)
+BATCH_MAX_CONCURRENT_JOBS = 4
+
+# Startup: the modules of the video generation (OpenCV, Matplotlib, NumPy and the models) are not imported before
+# the window is shown, but in a background thread once it is shown (or when the first video is asked for, when disabled)
+PRELOAD_GENERATION_MODULES = True
+
+# Loading frame: milliseconds between two readings of the signals of the video generation
+# (the latest progress read is shown, the previous ones are skipped)
+LOADING_FRAME_REFRESH_INTERVAL = 100
+
 # Signals for loading frame
 BREAK_LOOP = -1
 UPDATE_STEP = 1
 UPDATE_PERCENTAGE = 2
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+## Common ------------------------------------------------------------------------------------------------------------ ##
+# Folder of the application data (caches, indexes), in the user's home
+APP_DATA_FOLDER_NAME = ".solaractivid"
+
+# Profiling of a job (when its request asks for it): seconds between two samples of the stack of a thread
+PROFILING_SAMPLING_INTERVAL = 0.005
+
+# Progress of a step: seconds between two progress updates put on the loading frame queue (the last one is always put),
+# and weight of the last throughput in the smoothed one, from which the remaining time is estimated
+PROGRESS_UPDATE_INTERVAL = 0.25
+PROGRESS_RATE_SMOOTHING = 0.3
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+## Model ------------------------------------------------------------------------------------------------------------- ##
+# Solar activity images selection: the images are selected from a catalog of the input folder,
+# updated only when the folder changes, instead of parsing the name of every file on every request
+IMAGE_CATALOG_ENABLED = True
+
+# Solar activity images loading: number of threads decoding, resizing and annotating the images
+# (1 loads every image in the video generation thread, 0 uses one thread per CPU core)
+SOLAR_IMAGES_LOADING_WORKERS = 0
+
+# Solar activity frames cache: resized frames are kept on disk, in memory-mappable files,
+# so that rendering the same images at the same size again doesn't decode them
+# Every process running at once has its own cache, whose least recently used frames are replaced
+# when it reaches its maximum size (in bytes)
+SOLAR_FRAME_CACHE_ENABLED = True
+SOLAR_FRAME_CACHE_MAX_SIZE = 8 * 1024**3
+SOLAR_FRAME_CACHE_FLUSH_INTERVAL = 100 # Number of frames between two savings of the cache index
+
+# Batch rendering: decoded source images shared by the jobs of a batch are kept in memory until every job needing them
+# has loaded them, within this size (in bytes)
+SHARED_SOURCE_IMAGES_MAX_SIZE = 2 * 1024**3
+
+# Proton flux loading: the daily GOES JSON files are ingested into a columnar store of the application data folder
+# (one chunk of memory-mappable columns per month), from which only the requested range and energies are read
+PROTON_FLUX_STORE_ENABLED = True
+
+# Graph rendering: the figure, its axes and decorations are built once,
+# then only the lines are updated and redrawn for every frame
+REUSE_GRAPH_FIGURE = True
+
+# Graph engine: "matplotlib" draws every frame with matplotlib, "raster" draws the axes, their decorations and legends
+# with matplotlib once, then only draws the new segments of the lines into the pixels of the previous frame
+GRAPH_ENGINE = "matplotlib"
+
+# Graph rendering in a pool of processes: number of workers (1 renders every frame in the
+# video generation thread, 0 uses one worker per CPU core), number of frames sent to a worker
+# at once, and minimum number of frames for which starting the workers is worth it
+GRAPH_RENDERING_WORKERS = 0
+GRAPH_RENDERING_CHUNK_SIZE = 16
+GRAPH_RENDERING_MIN_PARALLEL_FRAMES = 100
+
+# Graph lines decimation: only the lowest and the highest measures of every pixel column of a line are drawn,
+# so that drawing a line takes the same time whatever its number of measures
+GRAPH_LINE_DECIMATION = True
+
+# Hold frames: a frame identical to the previous one (same source image file, same plot limits of the graph)
+# isn't loaded, rendered or combined again, the previous frame is given again
+HOLD_DUPLICATE_FRAMES = True
+
+# Video encoding: backend writing the videos ("opencv": OpenCV's VideoWriter, "ffmpeg": raw frames piped into an ffmpeg process),
+# and frames per second of the videos
+VIDEO_ENCODER = "opencv"
+VIDEO_FPS = 25
+
+# Video encoding with OpenCV: codec of the videos
+OPENCV_FOURCC = "mp4v"
+
+# Video encoding with ffmpeg: program, codec (libx264 or libx265), quality (CRF, from 0 to 51, lower is better),
+# preset (slower presets give smaller videos), pixel format of the frames sent through the pipe (rgb24, bgr24 or yuv420p)
+# and number of encoding threads (0 lets ffmpeg choose)
+FFMPEG_PATH = "ffmpeg"
+FFMPEG_CODEC = "libx264"
+FFMPEG_CRF = 23
+FFMPEG_PRESET = "medium"
+FFMPEG_PIPE_PIXEL_FORMAT = "yuv420p"
+FFMPEG_THREADS = 0
 ## ------------------------------------------------------------------------------------------------------------------- ##
\ No newline at end of file
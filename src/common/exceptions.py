@@ -2,4 +2,9 @@ class NoDataFoundError(Exception):
     """Exception class raised when no data for Solar Activity or Particle Flux Graph is found."""
     def __init__(self, *args: object) -> None:
         super().__init__(*args)
-        print('tacos')
\ No newline at end of file
+
+
+class GenerationCancelledError(Exception):
+    """Exception class raised between two frames when the video generation has been cancelled by the user."""
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
\ No newline at end of file
@@ -0,0 +1,38 @@
+import sys
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+# Function locking a file for the calling process, without waiting: it gives the opened lock file, which keeps the lock
+# until it is closed or until the process ends, or None when another process (or another opening of the file) holds the lock
+def try_lock_file(file_path : str):
+
+    lock_file = open(file_path, mode="a+")
+
+    try:
+        if sys.platform == "win32":
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    except OSError:
+        lock_file.close()
+        return None
+
+    return lock_file
+
+
+
+# Function releasing the lock of a file given by try_lock_file()
+def unlock_file(lock_file):
+
+    if sys.platform == "win32":
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    lock_file.close()
\ No newline at end of file
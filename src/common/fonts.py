@@ -0,0 +1,24 @@
+import functools
+import re
+
+from PIL import ImageFont
+
+# Function giving the Arial font of a size, which is only loaded once
+# (the default font of Pillow is used where Arial isn't installed, like on most Linux systems)
+@functools.lru_cache(maxsize=None)
+def get_font(font_size : int) -> ImageFont.FreeTypeFont:
+
+    try:
+        return ImageFont.truetype('arial.ttf', font_size)
+    except OSError:
+        return ImageFont.load_default(font_size)
+
+
+
+# Function giving the name of the font of a size (see get_font()), with letters, digits and "-" only
+def get_font_name(font_size : int) -> str:
+
+    font = get_font(font_size)
+    font_name = "-".join(font.getname()) if hasattr(font, "getname") else "default"
+
+    return re.sub(r"[^A-Za-z0-9]+", "-", font_name).strip("-")
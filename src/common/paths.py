@@ -0,0 +1,15 @@
+import os
+
+from common.constants import APP_DATA_FOLDER_NAME
+
+# Function giving the path of a folder inside the application data folder (in the user's home),
+# creating it if it doesn't exist yet
+def get_app_data_folder(*subfolders : str) -> str:
+
+    # Building the path
+    folder_path = os.path.join(os.path.expanduser("~"), APP_DATA_FOLDER_NAME, *subfolders)
+
+    # Creating the folder
+    os.makedirs(folder_path, exist_ok=True)
+
+    return folder_path
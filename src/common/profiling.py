@@ -0,0 +1,266 @@
+import collections
+import cProfile
+import itertools
+import multiprocessing.util
+import os
+import pstats
+import shutil
+import sys
+import tempfile
+import threading
+
+from common.constants import PROFILING_SAMPLING_INTERVAL
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Extensions of the profile files: statistics of cProfile (readable by pstats, snakeviz...),
+# and sampled stacks in the collapsed format (readable by flamegraph.pl, speedscope...)
+PSTATS_EXTENSION = ".pstats"
+COLLAPSED_STACKS_EXTENSION = ".collapsed.txt"
+
+# Numbers of the profiled jobs of the process, giving the name prefix of the threads started for every job
+job_numbers = itertools.count(1)
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+class StackSampler():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The sampler reads the stack of a thread every interval seconds, from its own thread,
+    ## and counts how many times every stack has been seen
+    ## When threadNamePrefix is given, the threads whose name starts with it (followed by "_") are sampled too,
+    ## like the threads of a ThreadPoolExecutor given this prefix
+    def __init__(self, threadId : int, threadNamePrefix = None, interval = PROFILING_SAMPLING_INTERVAL):
+
+        # Defining attributes from parameters
+        self.threadId = threadId
+        self.threadNamePrefix = threadNamePrefix
+        self.interval = interval
+
+        # Number of samples of every collapsed stack
+        self.stack_counts = collections.Counter()
+
+        # Thread reading the stacks, until stop() is called
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.sample, name="StackSampler", daemon=True)
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Functions starting and stopping the sampling
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+
+
+    # Function reading the stacks of the threads until the sampling is stopped
+    def sample(self):
+        while not self.stop_event.wait(self.interval):
+            frames = sys._current_frames()
+
+            for thread_id in self.get_thread_ids():
+                frame = frames.get(thread_id)
+
+                if frame is not None:
+                    self.stack_counts[get_collapsed_stack(frame)] += 1
+
+
+
+    # Function giving the identifiers of the sampled threads
+    def get_thread_ids(self) -> list:
+
+        if self.threadNamePrefix is None:
+            return [self.threadId]
+
+        return [self.threadId] + [one_thread.ident for one_thread in threading.enumerate() if one_thread.name.startswith(self.threadNamePrefix + "_")]
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+class JobProfiler():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The profiler of a video generation job, used in a "with" statement around the generation, in the thread of the job:
+    ## this thread is profiled by cProfile and sampled by a StackSampler, and the worker processes started for the job
+    ## profile themselves into workers_folder (see start_worker_profiling())
+    ## The thread pools of the job (loading the images, encoding the videos) are created with get_thread_pool_arguments():
+    ## their threads are named after thread_name_prefix, so that they are sampled too, and they are profiled by cProfile
+    ## At the end, everything is merged into outputPath + ".pstats" and outputPath + ".collapsed.txt"
+    def __init__(self, outputPath : str):
+
+        # Defining attributes from parameters
+        self.outputPath = outputPath
+
+        # Temporary folder where the worker processes save their profiles
+        self.workers_folder = tempfile.mkdtemp(prefix="solaractivid_profile_")
+
+        # Name prefix of the threads started for the job
+        self.thread_name_prefix = f"profiled_job_{next(job_numbers)}"
+
+        # Profilers of this thread
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), self.thread_name_prefix)
+
+        # Profilers of the threads of the thread pools, and the lock protecting them
+        self.thread_profilers = []
+        self.thread_profilers_lock = threading.Lock()
+
+        # Paths of the saved profiles
+        self.profile_paths = []
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Functions allowing the profiler to be used in a "with" statement
+    def __enter__(self):
+
+        self.sampler.start()
+
+        # Only one cProfile profiler can be active at once since Python 3.12,
+        # so a job started while another one is profiled is only sampled
+        try:
+            self.profiler.enable()
+        except ValueError as error:
+            print("The job is only sampled :", error, file=sys.stderr)
+            self.profiler = None
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        if self.profiler is not None:
+            self.profiler.disable()
+
+        self.sampler.stop()
+
+        # Saving the profiles even when the generation has failed, since they show where it was
+        self.save()
+
+
+
+    # Function giving the arguments of a ThreadPoolExecutor of the job, whose threads are sampled and profiled
+    def get_thread_pool_arguments(self) -> dict:
+        return {"thread_name_prefix": self.thread_name_prefix, "initializer": self.start_thread_profiling}
+
+
+
+    # Function called when a thread of a thread pool of the job starts: the thread is profiled by its own cProfile profiler
+    # Since Python 3.12, only one profiler can be active at once, and the one of the job already profiles every thread
+    def start_thread_profiling(self):
+
+        thread_profiler = cProfile.Profile()
+
+        try:
+            thread_profiler.enable()
+        except ValueError:
+            return
+
+        with self.thread_profilers_lock:
+            self.thread_profilers.append(thread_profiler)
+
+
+
+    # Function merging the profiles of this thread, of the threads of the thread pools and of the worker processes, and saving them
+    def save(self):
+
+        stats = pstats.Stats()
+        stack_counts = collections.Counter(self.sampler.stack_counts)
+
+        if self.profiler is not None:
+            stats.add(self.profiler)
+
+        # Adding the profiles of the threads of the thread pools (which have been shut down with the generation)
+        with self.thread_profilers_lock:
+            for thread_profiler in self.thread_profilers:
+                stats.add(thread_profiler)
+
+        # Adding the profiles of the worker processes
+        for filename in sorted(os.listdir(self.workers_folder)):
+            file_path = os.path.join(self.workers_folder, filename)
+
+            if filename.endswith(PSTATS_EXTENSION):
+                stats.add(file_path)
+            elif filename.endswith(COLLAPSED_STACKS_EXTENSION):
+                stack_counts.update(read_collapsed_stacks(file_path))
+
+        # Saving the merged profiles
+        stats.dump_stats(self.outputPath + PSTATS_EXTENSION)
+        write_collapsed_stacks(self.outputPath + COLLAPSED_STACKS_EXTENSION, stack_counts)
+
+        self.profile_paths = [self.outputPath + PSTATS_EXTENSION, self.outputPath + COLLAPSED_STACKS_EXTENSION]
+
+        shutil.rmtree(self.workers_folder, ignore_errors=True)
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Function giving the arguments of a ThreadPoolExecutor started for a job: the ones of its profiler (see JobProfiler),
+# or no arguments when the job isn't profiled
+def get_thread_pool_arguments(profiler = None) -> dict:
+    return profiler.get_thread_pool_arguments() if profiler is not None else {}
+
+
+
+# Function giving the stack of a frame in the collapsed format: the functions from the outermost one, separated by ";"
+def get_collapsed_stack(frame) -> str:
+
+    functions = []
+
+    while frame is not None:
+        code = frame.f_code
+        functions.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+
+    return ";".join(reversed(functions))
+
+
+
+# Functions reading and writing a file of collapsed stacks, where every line is a stack followed by its number of samples
+def read_collapsed_stacks(file_path : str) -> collections.Counter:
+
+    stack_counts = collections.Counter()
+
+    with open(file_path, mode="r", encoding="utf-8") as stacks_file:
+        for line in stacks_file:
+            (stack, _, count) = line.rstrip("\n").rpartition(" ")
+
+            if stack:
+                stack_counts[stack] += int(count)
+
+    return stack_counts
+
+def write_collapsed_stacks(file_path : str, stack_counts : collections.Counter):
+    with open(file_path, mode="w", encoding="utf-8") as stacks_file:
+        for (stack, count) in sorted(stack_counts.items()):
+            stacks_file.write(f"{stack} {count}\n")
+
+
+
+# Function called when a worker process of a profiled job starts: the process profiles itself,
+# and saves its profiles into profile_folder when it exits
+def start_worker_profiling(profile_folder : str):
+
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident())
+
+    sampler.start()
+    profiler.enable()
+
+    # Saving the profiles of the process
+    def save_worker_profiles():
+        profiler.disable()
+        sampler.stop()
+
+        profiler.dump_stats(os.path.join(profile_folder, f"worker_{os.getpid()}{PSTATS_EXTENSION}"))
+        write_collapsed_stacks(os.path.join(profile_folder, f"worker_{os.getpid()}{COLLAPSED_STACKS_EXTENSION}"), sampler.stack_counts)
+
+    # The worker processes are multiprocessing processes, which call their finalizers when they exit
+    multiprocessing.util.Finalize(None, save_worker_profiles, exitpriority=10)
\ No newline at end of file
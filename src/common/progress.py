@@ -0,0 +1,75 @@
+import time
+
+from common.constants import PROGRESS_RATE_SMOOTHING, PROGRESS_UPDATE_INTERVAL, UPDATE_PERCENTAGE
+
+class ProgressReporter():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The reporter of the progress of a step, which puts it on loadingFrameQueue at most every interval seconds
+    ## (and always for the last item), with the throughput of the step (items per second) and its estimated remaining time
+    ## Nothing is put when loadingFrameQueue is None
+    def __init__(self, loadingFrameQueue, totalSteps : int, interval = PROGRESS_UPDATE_INTERVAL):
+
+        # Defining attributes from parameters
+        self.loadingFrameQueue = loadingFrameQueue
+        self.totalSteps = totalSteps
+        self.interval = interval
+
+        # Time and step of the start of the step, and of the last progress put on the queue
+        self.last_time = time.perf_counter()
+        self.last_step = 0
+
+        # Throughput of the step, smoothed over the last updates
+        self.items_per_second = None
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function called for every item of the step, which puts the progress on the queue when it is time to
+    def update(self, current_step : int):
+
+        if self.loadingFrameQueue is None:
+            return
+
+        # Waiting for the interval, unless the step is over
+        current_time = time.perf_counter()
+
+        if current_time - self.last_time < self.interval and current_step < self.totalSteps:
+            return
+
+        # Computing the throughput since the last update, smoothed with the previous ones
+        if current_time > self.last_time and current_step > self.last_step:
+            items_per_second = (current_step - self.last_step) / (current_time - self.last_time)
+
+            if self.items_per_second is None:
+                self.items_per_second = items_per_second
+            else:
+                self.items_per_second += PROGRESS_RATE_SMOOTHING * (items_per_second - self.items_per_second)
+
+        (self.last_time, self.last_step) = (current_time, current_step)
+
+        # Estimating the remaining time
+        remaining_seconds = None
+
+        if self.items_per_second:
+            remaining_seconds = max(0, self.totalSteps - current_step) / self.items_per_second
+
+        self.loadingFrameQueue.put((UPDATE_PERCENTAGE, {
+            "current_step": current_step,
+            "total_steps": self.totalSteps,
+            "items_per_second": self.items_per_second,
+            "remaining_seconds": remaining_seconds
+        }))
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Function giving a duration in seconds as a text, like 1:05:02 or 0:42
+def format_duration(seconds : float) -> str:
+
+    (minutes, seconds) = divmod(int(round(seconds)), 60)
+    (hours, minutes) = divmod(minutes, 60)
+
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours > 0 else f"{minutes}:{seconds:02d}"
\ No newline at end of file
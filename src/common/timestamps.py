@@ -0,0 +1,87 @@
+import functools
+import numpy as np
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Formats of the timestamps found in the input files
+GOES_TIME_TAG_FORMAT = "%Y-%m-%dT%H:%M:%S" # "time_tag" of the GOES proton flux JSON files (followed by "Z")
+NMDB_DATE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S" # "start_date_time" of the NMDB neutron flux CSV files
+IMAGE_FILENAME_FORMAT = "%Y%m%d_%H%M" # First characters of the solar activity image file names
+
+# Number of digits of every supported directive
+DIRECTIVE_WIDTHS = {"Y": 4, "m": 2, "d": 2, "H": 2, "M": 2, "S": 2}
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+# Function converting a whole column of fixed-format strings into a datetime64 array (in seconds), in one vectorized call
+# Instead of parsing every string with strptime, the digits are read at their fixed positions in an array of characters
+# Longer strings are cut to the width of the format (like the "Z" suffix of GOES time tags),
+# and strings that don't match the format give NaT
+def parse_timestamps(strings, time_format : str) -> np.ndarray:
+
+    # Getting the width of the format, the position of its fields and of its literal characters
+    (format_width, fields, literals) = get_format_layout(time_format)
+
+    # Building an array of characters codes, with one row per string
+    # (shorter strings are padded with null characters, which are not digits)
+    characters = np.asarray(np.asarray(strings, dtype=str), dtype=f'U{format_width}').reshape(-1)
+    codes = characters.view(np.uint32).reshape(-1, format_width).astype(np.int64)
+
+    # Checking the literal characters
+    is_valid = np.ones(len(codes), dtype=bool)
+
+    for (position, character) in literals:
+        is_valid &= codes[:, position] == ord(character)
+
+    # Reading the value of every field from its digits
+    values = {"Y": 1970, "m": 1, "d": 1, "H": 0, "M": 0, "S": 0}
+
+    for (directive, (start, width)) in fields.items():
+        digits = codes[:, start:start+width] - ord("0")
+        is_valid &= ((digits >= 0) & (digits <= 9)).all(axis=1)
+        values[directive] = digits @ (10 ** np.arange(width - 1, -1, -1))
+
+    # Checking the bounds of every field (invalid strings are given a neutral date before the conversion)
+    is_valid &= (values["m"] >= 1) & (values["m"] <= 12) & (values["d"] >= 1) & (values["d"] <= 31)
+    is_valid &= (values["H"] <= 23) & (values["M"] <= 59) & (values["S"] <= 59)
+
+    for directive in values.keys():
+        values[directive] = np.where(is_valid, values[directive], 1 if directive in ("m", "d") else 0)
+
+    # Converting the fields into datetimes: month, then day (a day that doesn't exist in its month is invalid), then time
+    months = ((values["Y"] - 1970)*12 + values["m"] - 1).astype('datetime64[M]')
+    days = months.astype('datetime64[D]') + (values["d"] - 1).astype('timedelta64[D]')
+    is_valid &= days.astype('datetime64[M]') == months
+
+    timestamps = days.astype('datetime64[s]') + (values["H"]*3600 + values["M"]*60 + values["S"]).astype('timedelta64[s]')
+    timestamps[~is_valid] = np.datetime64('NaT')
+
+    return timestamps
+
+
+
+# Function giving the layout of a format: its width, the (start, width) of every directive, and the (position, character) of every literal
+@functools.lru_cache(maxsize=None)
+def get_format_layout(time_format : str) -> tuple:
+
+    fields = {}
+    literals = []
+    position = 0
+    format_index = 0
+
+    while format_index < len(time_format):
+
+        # Directive, like "%Y"
+        if time_format[format_index] == "%":
+            directive = time_format[format_index + 1]
+            fields[directive] = (position, DIRECTIVE_WIDTHS[directive])
+            position += DIRECTIVE_WIDTHS[directive]
+            format_index += 2
+
+        # Literal character, like "-"
+        else:
+            literals.append((position, time_format[format_index]))
+            position += 1
+            format_index += 1
+
+    return (position, fields, tuple(literals))
\ No newline at end of file
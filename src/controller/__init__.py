@@ -1,3 +1,16 @@
-from .apphandler import AppHandler
+# The classes are only imported when they are asked for: the App Handler doesn't import customtkinter and the other GUI modules
+# when the video generation is used alone (see cli.py), and the video generation doesn't import OpenCV, Matplotlib and the models
+# while the application starts (see AppHandler)
+def __getattr__(name : str):
+    if name == "AppHandler":
+        from .apphandler import AppHandler
+        return AppHandler
+    if name == "BatchRenderer":
+        from .batchrenderer import BatchRenderer
+        return BatchRenderer
+    if name == "VideoGenerator":
+        from .videogenerator import VideoGenerator
+        return VideoGenerator
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = ['AppHandler']
\ No newline at end of file
+__all__ = ['AppHandler', 'BatchRenderer', 'VideoGenerator']
\ No newline at end of file
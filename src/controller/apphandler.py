@@ -1,18 +1,10 @@
 import customtkinter as ctk
-import cv2
-import io
-import numpy as np
-import os
 import queue
 import tkinter.messagebox as tkm
 
-from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
 from threading import Thread
 
 from common.constants import *
-from model.particlefluxgraphimages import ParticleFluxGraphImages
-from model.solaractivityimages import SolarActivityImages
 from view.appframe import AppFrame
 from view.loadingframe import LoadingFrame
 
@@ -36,18 +28,22 @@ class AppHandler():
         self.frmApp = None
         self.frmLoading = None
 
-        # Creating steps variables to be displayed on the Loading Frame
-        self.current_generation_step = 0
-        self.total_generation_steps = 0
-
         # Creating queue to allow both videoGenerationThread
         # and main thread to communicate between each other
         self.communicationQueue = None
         self.isQueueInUse = False
 
+        # Job generating the video, while it is in progress
+        self.videoGenerator = None
+
         # Starting a new user request
         self.newUserRequest()
 
+        # Importing the modules of the video generation in the background, once the window is shown
+        # (they are not imported on startup, so that the window appears sooner)
+        if PRELOAD_GENERATION_MODULES:
+            self.main_window.after_idle(self.preloadGenerationModules)
+
         # Launching app
         self.main_window.mainloop()        
     ## --------------------------------------------------------------------------------------------------------------------- ##
@@ -55,6 +51,12 @@ class AppHandler():
     
     ## METHODS ------------------------------------------------------------------------------------------------------------- ##
 
+    # Function to import the modules of the video generation in a background thread
+    def preloadGenerationModules(self):
+        Thread(target=preload_generation_modules, daemon=True).start()
+
+
+
     # Function to start a new user request
     def newUserRequest(self):
 
@@ -77,126 +79,27 @@ class AppHandler():
 
         # For debug 
         print(userRequest)
-        
-        # ----- Video format and quality ----- #
-        video_width, video_height = 0, 0
-
-        # Vertical image
-        if userRequest["Format"] == "Instagram (vertical)":
-            
-            # Medium resolution
-            if userRequest["Quality"] == "Medium (720p)":
-                
-                video_width, video_height = RESOLUTION_VERTICAL_MED
-            
-            # High resolution
-            elif userRequest["Quality"] == "High (1080p)":
-                
-                video_width, video_height =  RESOLUTION_VERTICAL_HIGH
-
-        # Horizontal image
-        elif userRequest["Format"] == "YouTube (horizontal)":
-            
-            # Medium resolution
-            if userRequest["Quality"] == "Medium (720p)":
-                
-                video_width, video_height = RESOLUTION_HORIZONTAL_MED
-            
-            # High resolution
-            elif userRequest["Quality"] == "High (1080p)":
-                
-                video_width, video_height = RESOLUTION_HORIZONTAL_HIGH
-
-        # ------------------------------------ #
-
-
-        # ----- Image types resolution ----- #
-
-        # Resolution for solar activity (video's resolution by default)
-        solar_activity_width, solar_activity_height = video_width, video_height
-
-        # Resolution for particle flux graphs (video's resolution by default)
-        particle_graph_width, particle_graph_height = video_width, video_height
-
-
-        # Dividing the width/height by 2 when both videos are selected
-        if userRequest["btnSolarActivityVideo"] and userRequest["btnParticleFluxGraph"]:
-            
-            # --------------- For vertical video --------------- #
-            if userRequest["Format"] == "Instagram (vertical)":
-
-                # Dividing image height by 2
-                solar_activity_height = solar_activity_height/2
-                particle_graph_height = particle_graph_height/2
-            
-            # -------------- For horizontal video -------------- #
-            elif userRequest["Format"] == "YouTube (horizontal)":
-
-                # Dividing image width by 2
-                solar_activity_width = solar_activity_width/2
-                particle_graph_width = particle_graph_width/2
-
-            # -------------------------------------------------- #
-        
-        # Reducing the height of the resolutions when a comment is written,
-        # in order to let space on the screen for the comment
-        if len(userRequest["Comment"]) != 0:
-            
-            # Case for vertical video with the two types of videos
-            if userRequest["Format"] == "Instagram (vertical)" and userRequest["btnSolarActivityVideo"] and userRequest["btnParticleFluxGraph"]:
-
-                solar_activity_height -= COMMENT_BLOCK_HEIGHT/2
-                particle_graph_height -= COMMENT_BLOCK_HEIGHT/2
-            
-            # Other cases
-            else:
-                solar_activity_height -= COMMENT_BLOCK_HEIGHT
-                particle_graph_height -= COMMENT_BLOCK_HEIGHT
-        
-        # Initializing dictionary for video images dimensions
-        videoDimensions = {}
-        
-        # Filling the data
-        videoDimensions["video_width"], videoDimensions["video_height"] = int(video_width), int(video_height)
-        videoDimensions["solar_activity_width"], videoDimensions["solar_activity_height"] = int(solar_activity_width), int(solar_activity_height)
-        videoDimensions["particle_graph_width"], videoDimensions["particle_graph_height"] = int(particle_graph_width), int(particle_graph_height)
-
-        # For debug : Displaying the resolutions
-        print("Video resolution :", video_width, "x", video_height)
-        print("Solar activity resolution :", solar_activity_width, "x", solar_activity_height)
-        print("Particle flux graph resolution :", particle_graph_width, "x", particle_graph_height)
 
-        # ---------------------------------- #
+        # Importing the video generation (it is already done when the preloading thread is over,
+        # otherwise this waits for it)
+        from controller.videogenerator import VideoGenerator
 
+        # Creating the job generating the video, with its own queue
+        # to allow both videoGenerationThread and main thread to communicate between each other
+        self.communicationQueue = queue.Queue()
+        video_generator = VideoGenerator(userRequest, self.communicationQueue)
+        self.videoGenerator = video_generator
 
         # ----- Launching the generation process ----- #
-
-        # Defining the total number of steps to generate the video
-        self.total_generation_steps = 0
-
-        # Adding a step : Solar activity video generation
-        if userRequest["btnSolarActivityVideo"]:
-            self.total_generation_steps += 1
-        
-        # Adding a step : Particle flux graph images
-        if userRequest["btnParticleFluxGraph"]:
-            self.total_generation_steps += 1
         
         # Checking if some content will be generated
-        if self.total_generation_steps > 0:
-
-            # Adding 2 steps (1 for combinging the images, 1 for exporting the video)
-            self.total_generation_steps += 2
-
-            # Setting the current step to 0
-            self.current_generation_step = 0
+        if video_generator.has_content():
 
             # Allowing the queue to be used
-            self.communicationQueue = queue.Queue()
             self.isQueueInUse = True
 
             # Loading thread 
-            videoGenerationThread = Thread(target=self.processVideoCreation, kwargs={"queue" : self.communicationQueue, "userRequest" : userRequest, "videoDimensions" : videoDimensions})
+            videoGenerationThread = Thread(target=video_generator.run)
 
             # Launching videthread
             videoGenerationThread.start()
@@ -205,7 +108,7 @@ class AppHandler():
             self.frmApp.pack_forget()
 
             # Creating and adding the loading frame to the main_window
-            self.frmLoading = LoadingFrame(master=self.main_window, fg_color="transparent")
+            self.frmLoading = LoadingFrame(apphandler=self, master=self.main_window, fg_color="transparent")
             self.frmLoading.pack()
 
             # Treating every element in the queue
@@ -215,8 +118,23 @@ class AppHandler():
 
 
 
+    # Function to cancel the video generation in progress,
+    # triggered by the "Cancel" button
+    def cancelUserRequest(self):
+
+        if self.videoGenerator is not None:
+            self.videoGenerator.cancel()
+
+
+
     # ----- Function to treat every information in the queue ----- #
+    # Every signal waiting in the queue is read, but only the latest percentage is shown,
+    # so that the window is redrawn once per call, however many signals were put since the last one
     def treatQueue(self):
+
+        # Latest percentage put in the queue, shown once the queue is empty
+        latest_percentage = None
+
         try:
             # Repeating until the BREAK_LOOP signal is raised
             # Or the Exception Queue.empty is raised
@@ -226,417 +144,61 @@ class AppHandler():
                 # and returns an Exception
                 (signal, kwargs) = self.communicationQueue.get_nowait()
 
-                # For updating the step
+                # For updating the step (the percentages put before it belong to the previous step)
                 if signal == UPDATE_STEP:
+                    latest_percentage = None
                     self.frmLoading.update_step(**kwargs)    
 
                 # For updating the percentage
                 elif signal == UPDATE_PERCENTAGE:
-                    self.frmLoading.update_percentage(**kwargs)   
+                    latest_percentage = kwargs
                 
                 # For breaking the loop
                 elif signal == BREAK_LOOP:
-                    # Temporary 
-                    self.frmLoading.update_percentage(1, 1)
-                    self.frmLoading.update_step("Done!")
 
                     # Indicating that the queue has done its work
                     self.communicationQueue.task_done()
                     self.isQueueInUse = False
+                    self.videoGenerator = None
 
-                    return
-            
-                self.communicationQueue.task_done()
-                
-        except queue.Empty:
-            pass
-        
-        # Recalling the function after 100 ms
-        if self.isQueueInUse:
-            self.main_window.after(100, self.treatQueue)
-
-
-
-    # ----- Function called as a thread to generate video ----- #
-    def processVideoCreation(self, queue: queue.Queue, userRequest: dict[str, any], videoDimensions: dict[str, int]):
-
-        # ----- Creating images objects ----- #
-
-        # Getting common userRequest data
-        begin_datetime = userRequest["BeginDatetime"]
-        end_datetime = userRequest["EndDatetime"]
-        input_folder = userRequest["InputFolder"]
-
-        # Creating lists of images
-        solar_activity_images = []
-        particle_graph_images = []
-
-        # Solar activity
-        if userRequest["btnSolarActivityVideo"]:
-
-            # FOR LOADING FRAME
-            ###################
-            # Incrementing current generation step
-            self.current_generation_step += 1
-
-            # Displaying the information on the Loading Frame
-            queue.put((UPDATE_STEP, {
-                "new_step_content": "Fetching solar activity images",
-                "current_step": self.current_generation_step,
-                "total_steps": self.total_generation_steps
-            }))
-            ###################
-
-            # Creating solar activity object
-            solar_activity_object = SolarActivityImages(beginDateTime=begin_datetime, endDateTime=end_datetime, imageWidth=videoDimensions["solar_activity_width"], imageHeight=videoDimensions["solar_activity_height"], inputFolder=input_folder, loadingFrameQueue=queue)
-
-            # Gathering images
-            solar_activity_images = solar_activity_object.images
-        
-        # Particle flux graph
-        if userRequest["btnParticleFluxGraph"]:
-
-            # FOR LOADING FRAME
-            ###################
-            # Incrementing current generation step
-            self.current_generation_step += 1
-
-            # Displaying the information on the Loading Frame
-            queue.put((UPDATE_STEP, {
-                "new_step_content": "Generating particle flux graph images",
-                "current_step": self.current_generation_step,
-                "total_steps": self.total_generation_steps
-            }))
-            ###################
-
-            # Considering that there are always less solar activity
-            # images than particle flux graph images, if the solar
-            # activity option is selected, we set the number of solar
-            # activity images as the minimum number of video's frames
-            number_of_images = None
-
-            if len(solar_activity_images) > 0:
-                number_of_images = len(solar_activity_images)
-
-            # Creating particle flux graph object
-            particle_graph_object = ParticleFluxGraphImages(beginDateTime=begin_datetime, endDateTime=end_datetime, dctEnergy=userRequest["EnergyData"], imageWidth=videoDimensions["particle_graph_width"], imageHeight=videoDimensions["particle_graph_height"], numberOfImages=number_of_images, inputFolder=input_folder, loadingFrameQueue=queue)
-
-            # Gathering images
-            particle_graph_images = particle_graph_object.images
-        # ----------------------------------- #
-
-        # ----- Combining different images (with comment) ----- #
-
-        # FOR LOADING FRAME
-        ###################
-        # Incrementing current generation step
-        self.current_generation_step += 1
-
-        # Displaying the information on the Loading Frame
-        queue.put((UPDATE_STEP, {
-                "new_step_content": "Combining images",
-                "current_step": self.current_generation_step,
-                "total_steps": self.total_generation_steps
-            }))
-        ###################
-
-        # Defining the video format (horizontal/vertical)
-        format = ""
-
-        if userRequest["Format"] == "Instagram (vertical)":
-            format = VERTICAL
-        elif userRequest["Format"] == "YouTube (horizontal)":
-            format = HORIZONTAL
-
-        # Combining the different kind of images, with the comment if necessary
-        final_images = self.combineImages(solar_activity_images, particle_graph_images, videoDimensions["video_width"], videoDimensions["video_height"], format, userRequest["Comment"], queue)
-        # ----------------------------------------------------- #
-
-        # ----- Defining video name ----- #
-        video_name = "SolarActivid"
-
-        # Adding selected video types
-        if userRequest["btnSolarActivityVideo"]:
-            video_name += "_SA"
-        
-        if userRequest["btnParticleFluxGraph"]:
-            video_name += "_PFG"
-        
-        # Adding Begin Datetime
-        video_name += datetime.strftime(userRequest["BeginDatetime"], "_%Y%m%d_%H%M%S")
-        
-        # Adding End Datetime
-        video_name += datetime.strftime(userRequest["EndDatetime"], "_%Y%m%d_%H%M%S")
-        
-        # Adding .mp4
-        video_name += ".mp4"
-
-        # ------------------------------- #
-
-        # ----- Exporting the video ----- #
-
-        # FOR LOADING FRAME
-        ###################
-        # Incrementing current generation step
-        self.current_generation_step += 1
-
-        # Displaying the information on the Loading Frame
-        queue.put((UPDATE_STEP, {
-                "new_step_content": "Exporting video",
-                "current_step": self.current_generation_step,
-                "total_steps": self.total_generation_steps
-            }))
-        ###################
-
-        self.generateVideo(final_images, video_name=video_name, video_width=videoDimensions["video_width"], video_height=videoDimensions["video_height"], output_folder=userRequest["OutputFolder"], loadingFrameQueue=queue)
-        # ------------------------------- #
-
-    
-        
-    # ----- Image combination algorithm ----- #
-    def combineImages(self, solar_activity_images : list, particles_graph_images : list, video_width : int, video_height : int, format : str, comment = "", loadingFrameQueue = None):
-
-        # For debug 
-        print("Combining images")
-
-        # List that will store the final images
-        final_images = []
-
-        # --- Creating comment block if it exists --- #
-        comment_block = None
-
-        if len(comment) > 0:
-
-            # Creating a new image
-            comment_block = Image.new(mode="RGBA", size=(video_width, COMMENT_BLOCK_HEIGHT), color="white")
-
-            # Creating the text 
-            text_draw = ImageDraw.Draw(comment_block)
-
-            # Setting text font
-            text_font = ImageFont.truetype('arial.ttf', 24)
+                    # Going back to the app frame, with the request that has been cancelled
+                    if kwargs.get("is_cancelled"):
+                        self.frmLoading.pack_forget()
+                        self.frmApp.pack()
 
-            # Drawing the text on the image
-            text_draw.text((20, 20), comment, font=text_font, fill="black")
+                        return
 
-        # ------------------------------------------- #
+                    # Going back to the app frame, with the request that has failed, once its error is shown
+                    if kwargs.get("error") is not None:
+                        self.frmLoading.pack_forget()
+                        self.frmApp.pack()
+                        tkm.showerror("SolarActivid", f"The video generation has failed:\n{kwargs['error']}")
 
-        # --- Getting the number of images --- #
-        number_of_images = 0
+                        return
 
-        # When the solar activity images are the only one set
-        if not particles_graph_images:
-            number_of_images = len(solar_activity_images)
-
-        # When the particle flux graph images are the only one set
-        elif not solar_activity_images:
-            number_of_images = len(particles_graph_images)
+                    # Temporary 
+                    self.frmLoading.update_percentage(1, 1)
+                    self.frmLoading.update_step("Done!")
+                    self.frmLoading.disable_cancel()
 
-        # When both are set
-        else:
+                    return
             
-            # Raising a ValueError when the number of images of both types are unequal
-            if len(solar_activity_images) != len(particles_graph_images):
-                raise ValueError("Internal Problem | The number of solar activity images and the number of particle flux images are unequal. SA = " + str(len(solar_activity_images)) + " and PFG = " + str(len(particles_graph_images)))
-
-            number_of_images = len(solar_activity_images)
-        # ------------------------------------ #
-
-        # For debug : printing the number of images
-        print("Number of images (from AppHandler) :", number_of_images)
-
-        # --- Getting image dimensions --- #
-        solar_activity_width, solar_activity_height = 0, 0
-        particles_graph_width, particles_graph_height = 0, 0
-        comment_width, comment_height = 0, 0
-
-        # We take the first image of both image types as a reference
-    
-        # Case for solar activity image
-        if len(solar_activity_images) > 0: 
-            image_reference = Image.open(solar_activity_images[0])
-            solar_activity_width = image_reference.width
-            solar_activity_height = image_reference.height
-        
-        # Case for particle flux graph image
-        if len(particles_graph_images) > 0:
-            image_reference = Image.open(particles_graph_images[0])
-            particles_graph_width = image_reference.width
-            particles_graph_height = image_reference.height
-
-        # Case for the comment
-        if comment_block is not None:
-            comment_width = comment_block.width
-            comment_height = comment_block.height
-        # -------------------------------- #
-
-
-        # --- Combining images --- #
-        
-        # For debug
-        print("Format : ", format)
-
-        # Vertical format
-        if format == VERTICAL:
-
-            # Browsing every image
-            for image_index in range(number_of_images):
-                
-                # Creating new image (with a black background)
-                new_image = Image.new(mode="RGBA", size=(video_width, video_height), color="black")
-
-                # Case for solar activity image
-                if len(solar_activity_images) > 0:
-
-                    # Opening the image
-                    sa_image = Image.open(solar_activity_images[image_index])
-
-                    # For debug : printing sa_image dimensions
-                    print(sa_image.width,"x", sa_image.height)
-                    
-                    # Adding this image to the new image, from the beginning
-                    new_image.paste(sa_image, (0, 0))
-                
-                # Case for comment, if it is defined
-                if comment_block is not None:
-                    
-                    # For debug : printing sa_image dimensions
-                    print(comment_block.width,"x", comment_block.height)
-
-                    # Adding the comment to the new image
-                    new_image.paste(comment_block, (0, solar_activity_height))
-                
-                # Case for particle flux graph image
-                if len(particles_graph_images) > 0:
-
-                    # Opening the image
-                    pfg_image = Image.open(particles_graph_images[image_index])
-
-                    # For debug : printing sa_image dimensions
-                    print(pfg_image.width,"x", pfg_image.height)
-                    
-                    # Adding this image to the new image, after the solar activity image 
-                    new_image.paste(pfg_image, (0, solar_activity_height+comment_height))
-
-                
-                # Creating a pure binary variable to store the new image
-                new_image_byte = io.BytesIO()
-
-                # Saving the new image in a pure binary format
-                new_image.save(new_image_byte, format='png')
-
-                # Adding the new image to the list
-                final_images.append(new_image_byte)
-
-                # --- Increasing percentage on loading frame --- #
-                loadingFrameQueue.put((UPDATE_PERCENTAGE, {
-                    "current_step": image_index+1,
-                    "total_steps": number_of_images
-                }))
-                # ---------------------------------------------- #
-        
-
-        # Horizontal format
-        elif format == HORIZONTAL:
-
-            # Browsing every image
-            for image_index in range(number_of_images):
-                
-                # Creating new image
-                new_image = Image.new(mode="RGBA", size=(video_width, video_height), color="black")
-
-                # Case for solar activity image
-                if len(solar_activity_images) > 0:
-
-                    # Opening the image
-                    sa_image = Image.open(solar_activity_images[image_index])
-                    
-                    # Adding this image to the new image, from the beginning
-                    new_image.paste(sa_image, (0, 0))
-                
-                # Case for particle flux graph image
-                if len(particles_graph_images) > 0:
-
-                    # Opening the image
-                    pfg_image = Image.open(particles_graph_images[image_index])
-                    
-                    # Adding this image to the new image, after the solar activity image 
-                    new_image.paste(pfg_image, (solar_activity_width, 0))
+                self.communicationQueue.task_done()
                 
-                # Case for comment, if it is defined
-                if comment_block is not None:
-                    
-                    # Adding the comment to the new image
-                    new_image.paste(comment_block, (0, video_height-comment_height))
-
-
-                # Creating a pure binary variable to store the new image
-                new_image_byte = io.BytesIO()
-
-                # Saving the new image in a pure binary format
-                new_image.save(new_image_byte, format='png')
-
-                # Adding the new image to the list
-                final_images.append(new_image_byte)
-
-                # --- Increasing percentage on loading frame --- #
-                loadingFrameQueue.put((UPDATE_PERCENTAGE, {
-                    "current_step": image_index+1,
-                    "total_steps": number_of_images
-                }))
-                # ---------------------------------------------- #     
-
-
-        # Returning the final images list          
-        return final_images
-    # --------------------------------------- #
-
-
-
-    # ----- Video generation algorithm ----- #
-    def generateVideo(self, frame_list, video_name, video_width, video_height, output_folder : str, loadingFrameQueue = None):
+        except queue.Empty:
+            pass
 
-        # Saving previous working directory
-        previous_working_directory = os.getcwd()
+        # Showing the latest percentage
+        if latest_percentage is not None:
+            self.frmLoading.update_percentage(**latest_percentage)
         
-        # Setting working directory to output folder
-        os.chdir(output_folder)
-
-        # Configuring video writer
-        output_video = cv2.VideoWriter(video_name, cv2.VideoWriter_fourcc(*'mp4v'), 25, (video_width, video_height))
-
-        # Defining the number of images
-        number_of_images = len(frame_list)
+        # Recalling the function after LOADING_FRAME_REFRESH_INTERVAL ms
+        if self.isQueueInUse:
+            self.main_window.after(LOADING_FRAME_REFRESH_INTERVAL, self.treatQueue)
 
-        counter = 1
-        for one_frame in frame_list:
+## ---------- STATIC FUNCTIONS ---------- ##
 
-            # Saving plot as a PIL image
-            current_plot_pil = Image.open(one_frame)
-            
-            # Converting PIL image to OpenCV format
-            current_plot_cv = np.array(current_plot_pil)
-            current_plot_cv = cv2.cvtColor(current_plot_cv, cv2.COLOR_RGB2BGR) # Configuring color
-
-            # Adding frame on the video
-            output_video.write(current_plot_cv)
-
-            # For debug
-            print(f'Image {counter} written')
-            counter += 1
-
-            # --- Increasing percentage on loading frame --- #
-            loadingFrameQueue.put((UPDATE_PERCENTAGE, {
-                    "current_step": counter,
-                    "total_steps": number_of_images
-                }))
-            # ---------------------------------------------- #
-
-        # Exporting video
-        cv2.destroyAllWindows()
-        output_video.release()
-        print("Video findable on " + os.getcwd() + "/" + video_name)
-
-        # Returning to the previous working directory
-        os.chdir(previous_working_directory)
-    # -------------------------------------- #
\ No newline at end of file
+# Function importing the modules of the video generation (OpenCV, Matplotlib, NumPy and the models),
+# so that they are ready when the user asks for a video
+def preload_generation_modules():
+    import controller.videogenerator
\ No newline at end of file
@@ -0,0 +1,219 @@
+import datetime as dt
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+from common.constants import *
+from common.exceptions import GenerationCancelledError, NoDataFoundError
+from controller.videogenerator import VideoGenerator
+from model.particlefluxgraphimages import read_neutron_flux_series
+from model.protonfluxstore import ProtonFluxStore
+from model.sharedsourceimages import SharedSourceImages
+from model.solaractivityimages import SolarActivityImages
+
+
+class SharedInputs():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The inputs of a batch of jobs, planned from their requests before any job starts:
+    ## the time ranges of every input folder are merged, so that the flux of every day is loaded only once for every job,
+    ## and the references of every job to the source images are counted, so that every image is decoded only once
+    def __init__(self):
+
+        # Source images shared by the jobs
+        self.sourceImages = SharedSourceImages()
+
+        # Time ranges of every input folder for the proton flux (and their energies) and for the neutron flux
+        self.proton_ranges = {}
+        self.proton_energies = {}
+        self.neutron_ranges = {}
+
+        # Flux series already loaded, by (flux, input folder, merged time range)
+        self.loaded_series = {}
+        self.lock = threading.Lock()
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function to add the inputs of a job to the plan of the batch
+    # (its solar activity images are produced at number_of_sizes sizes, one per distinct size of its variants)
+    def add_request(self, userRequest : dict[str, any], number_of_sizes = 1):
+
+        input_folder = userRequest["InputFolder"]
+        time_range = (userRequest["BeginDatetime"], userRequest["EndDatetime"])
+
+        # Solar activity: selecting the images of the job (without loading them) to count its references
+        if userRequest["btnSolarActivityVideo"]:
+            try:
+                selected_images = SolarActivityImages(beginDateTime=time_range[0], endDateTime=time_range[1], imageWidth=0, imageHeight=0, inputFolder=input_folder, lazyLoading=True)
+                for _ in range(number_of_sizes):
+                    self.sourceImages.add_references([os.path.join(input_folder, one_filename) for one_filename in selected_images.images_filenames])
+
+            # The job will raise it again when it starts
+            except NoDataFoundError:
+                pass
+
+        # Particle flux graph: adding the time range to the ranges of the input folder
+        if userRequest["btnParticleFluxGraph"]:
+            energy_data = userRequest["EnergyData"]
+
+            # The proton flux is only shared when it is read from the columnar store
+            if energy_data["ProtonFlux"] and PROTON_FLUX_STORE_ENABLED:
+                self.proton_ranges.setdefault(input_folder, []).append(time_range)
+                self.proton_energies.setdefault(input_folder, set()).update(one_energy for (one_energy, is_selected) in energy_data["Energies"].items() if is_selected)
+
+            if energy_data["NeutronFlux"]:
+                self.neutron_ranges.setdefault(input_folder, []).append(time_range)
+
+
+
+    # Function giving the (proton flux series, neutron flux series) of a job, sliced from the series loaded for the batch
+    # A series is None when it isn't selected or not shared (the job then loads it itself)
+    def get_flux_series(self, userRequest : dict[str, any]) -> tuple:
+
+        input_folder = userRequest["InputFolder"]
+        (begin_date_time, end_date_time) = (userRequest["BeginDatetime"], userRequest["EndDatetime"])
+        energy_data = userRequest["EnergyData"]
+
+        proton_flux_series, neutron_flux_series = None, None
+
+        # Proton flux, with only the energies selected by the job
+        if energy_data["ProtonFlux"] and input_folder in self.proton_ranges:
+            loaded_series = self.get_loaded_series("proton", input_folder, self.proton_ranges[input_folder], begin_date_time, end_date_time)
+            selected_energies = [one_energy for (one_energy, is_selected) in energy_data["Energies"].items() if is_selected]
+            proton_flux_series = loaded_series.between(begin_date_time, end_date_time).select(selected_energies)
+
+        # Neutron flux
+        if energy_data["NeutronFlux"] and input_folder in self.neutron_ranges:
+            loaded_series = self.get_loaded_series("neutron", input_folder, self.neutron_ranges[input_folder], begin_date_time, end_date_time)
+            neutron_flux_series = loaded_series.between(begin_date_time, end_date_time)
+
+        return (proton_flux_series, neutron_flux_series)
+
+
+
+    # Function giving the series loaded for the merged time range that contains the range of a job,
+    # loading it when no job has done it yet
+    def get_loaded_series(self, flux : str, input_folder : str, time_ranges : list, begin_date_time : dt.datetime, end_date_time : dt.datetime):
+
+        # Getting the merged time range of the job
+        merged_range = next(one_range for one_range in merge_time_ranges(time_ranges) if one_range[0] <= begin_date_time and end_date_time <= one_range[1])
+
+        # Loading the series only once (the other jobs wait for it)
+        with self.lock:
+            series_key = (flux, input_folder, merged_range)
+
+            if series_key not in self.loaded_series:
+                if flux == "proton":
+                    self.loaded_series[series_key] = ProtonFluxStore(input_folder).load(merged_range[0], merged_range[1], sorted(self.proton_energies[input_folder]))
+                else:
+                    self.loaded_series[series_key] = read_neutron_flux_series(input_folder, merged_range[0], merged_range[1])
+
+            return self.loaded_series[series_key]
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+class BatchRenderer():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## A batch renders the videos of several requests (like the ones of a manifest), while loading their inputs only once:
+    ## every job is planned first (see SharedInputs), then maxConcurrentJobs jobs are rendered at the same time
+    ## The information for the Loading Frame of every job is put on its queue of loadingFrameQueues, when they are given
+    def __init__(self, userRequests : list, loadingFrameQueues = None, maxConcurrentJobs = BATCH_MAX_CONCURRENT_JOBS):
+
+        # Defining attributes from parameters
+        self.userRequests = userRequests
+        self.maxConcurrentJobs = maxConcurrentJobs
+
+        # Inputs shared by every job
+        self.sharedInputs = SharedInputs()
+
+        # The graph rendering workers of the jobs rendered at the same time share the CPU cores
+        concurrent_jobs = max(1, min(maxConcurrentJobs, len(userRequests)))
+        graph_rendering_workers = max(1, (os.cpu_count() or 1) // concurrent_jobs)
+
+        # Creating the job of every request
+        self.video_generators = []
+
+        for (request_index, one_request) in enumerate(userRequests):
+            job_request = dict(one_request)
+            job_request.setdefault("GraphRenderingWorkers", graph_rendering_workers)
+
+            loading_frame_queue = loadingFrameQueues[request_index] if loadingFrameQueues is not None else None
+            self.video_generators.append(VideoGenerator(job_request, loading_frame_queue, self.sharedInputs))
+
+        # Checking that two jobs won't write the same video
+        video_paths = [os.path.abspath(os.path.join(one_generator.userRequest["OutputFolder"], video_name)) for one_generator in self.video_generators for video_name in one_generator.getVideoNames()]
+
+        for one_path in video_paths:
+            if video_paths.count(one_path) > 1:
+                raise ValueError(f"Several jobs of the batch write the same video {one_path}, give them different names or output folders")
+
+        # Planning the inputs of every job
+        for one_generator in self.video_generators:
+            if one_generator.has_content():
+                solar_activity_sizes = {(one_dimensions["solar_activity_width"], one_dimensions["solar_activity_height"]) for one_dimensions in one_generator.variantsDimensions}
+                self.sharedInputs.add_request(one_generator.userRequest, len(solar_activity_sizes))
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function rendering every job of the batch, and giving the error of every job (None when its video has been generated)
+    def run(self) -> list:
+        with ThreadPoolExecutor(max_workers=self.maxConcurrentJobs) as executor:
+            return list(executor.map(run_job, self.video_generators))
+
+
+
+    # Function cancelling every job of the batch, from any thread (the jobs that haven't started yet stop on their first frame)
+    def cancel(self):
+        for one_generator in self.video_generators:
+            one_generator.cancel()
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Function rendering one job of a batch, and giving its error (None when its video has been generated),
+# so that an error in one job doesn't stop the other ones
+def run_job(video_generator : VideoGenerator):
+
+    # Jobs without any content are ignored
+    if not video_generator.has_content():
+        return None
+
+    try:
+        video_generator.run()
+    except Exception as error:
+        return error
+
+    # The job has been cancelled
+    if video_generator.is_cancelled:
+        return GenerationCancelledError("The video generation has been cancelled")
+
+    return None
+
+
+
+# Function merging the time ranges that overlap or that are on the same or consecutive days
+# (so that the daily files between them are needed anyway), and giving them sorted
+def merge_time_ranges(time_ranges : list) -> list:
+
+    merged_ranges = []
+
+    for (begin_date_time, end_date_time) in sorted(time_ranges):
+
+        # Extending the last merged range
+        if merged_ranges and begin_date_time.date() <= merged_ranges[-1][1].date() + dt.timedelta(days=1):
+            merged_ranges[-1] = (merged_ranges[-1][0], max(merged_ranges[-1][1], end_date_time))
+
+        # Starting a new merged range
+        else:
+            merged_ranges.append((begin_date_time, end_date_time))
+
+    return merged_ranges
@@ -0,0 +1,746 @@
+import os
+import shutil
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from PIL import Image, ImageDraw
+from queue import Queue
+
+from common.cancellation import CancellationToken
+from common.constants import *
+from common.exceptions import GenerationCancelledError
+from common.fonts import get_font
+from common.profiling import JobProfiler, get_thread_pool_arguments
+from common.progress import ProgressReporter
+from model.particlefluxgraphimages import ParticleFluxGraphImages
+from model.sharedsourceimages import SharedSourceImages
+from model.solaractivityimages import SolarActivityImages
+from model.solarframecache import get_frame_cache
+from model.videoencoders import create_video_encoder, get_encoder_settings
+from model.videoframe import VideoFrame
+from model.videolayout import GRAPH_PANELS, VideoLayout
+
+
+class VideoGenerator():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## A video generator holds everything about one video generation job (request, dimensions, steps),
+    ## and only works with the paths given in the request, so several jobs can run at once in one process
+    ## Every information for the Loading Frame is put on loadingFrameQueue
+    ## When sharedInputs is given, the inputs already loaded for a batch of jobs are used (see BatchRenderer)
+    ## When the request has "Variants" (list of {"Format", "Quality", optionally "VideoName"}), one video is generated
+    ## for every variant in the same pass: the inputs are loaded once, and the images of every distinct size are produced once
+    ## When the request has "Profile", the generation is profiled, and the profiles are saved next to the video (see JobProfiler)
+    ## The generation can be cancelled from another thread with cancel(): it stops between two frames,
+    ## and the partial videos are removed
+    ## The videos are written by the encoder given by the "Encoder" of the request (see get_encoder_settings())
+    ## The particle flux graph is drawn by the engine given by the "GraphEngine" of the request (see GRAPH_ENGINES)
+    def __init__(self, userRequest : dict[str, any], loadingFrameQueue = None, sharedInputs = None, cancellationToken = None):
+
+        # Defining attributes from parameters
+        self.userRequest = userRequest
+        self.loadingFrameQueue = loadingFrameQueue if loadingFrameQueue is not None else Queue()
+        self.sharedInputs = sharedInputs
+        self.cancellationToken = cancellationToken if cancellationToken is not None else CancellationToken()
+
+        # Defining the variants of the video, and the dimensions of every variant and of its images
+        # (videoDimensions are the ones of the first variant)
+        self.variants = get_request_variants(userRequest)
+        self.variantsDimensions = [get_video_dimensions({**userRequest, **one_variant}) for one_variant in self.variants]
+        self.videoDimensions = self.variantsDimensions[0]
+
+        # Checking that two variants won't write the same video
+        video_names = self.getVideoNames()
+
+        if len(set(video_names)) < len(video_names):
+            raise ValueError("Several variants of the request write the same video, give them different formats, qualities or names")
+
+        # Defining the settings of the video encoder (a ValueError is raised when they can't be used)
+        self.encoderSettings = get_encoder_settings(userRequest.get("Encoder"))
+
+        # Creating steps variables to be displayed on the Loading Frame
+        self.current_generation_step = 0
+        self.total_generation_steps = 0
+
+        # Adding a step : Solar activity video generation
+        if userRequest["btnSolarActivityVideo"]:
+            self.total_generation_steps += 1
+        
+        # Adding a step : Particle flux graph images
+        if userRequest["btnParticleFluxGraph"]:
+            self.total_generation_steps += 1
+
+        # Adding 2 steps (1 for combinging the images, 1 for exporting the video),
+        # or 1 step when both are done at the same time while streaming
+        if self.total_generation_steps > 0:
+            self.total_generation_steps += 1 if STREAMING_PIPELINE else 2
+
+        # Path of the generated videos (video_path is the one of the first variant), known once they are exported
+        self.video_path = None
+        self.video_paths = []
+
+        # Profiler of the generation, only created when the request asks for it, and paths of the saved profiles
+        self.profiler = None
+        self.profile_paths = []
+
+        # Set once the generation has stopped because it has been cancelled
+        self.is_cancelled = False
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function telling if some content will be generated
+    def has_content(self) -> bool:
+        return self.total_generation_steps > 0
+
+
+
+    # Function cancelling the generation, from any thread
+    def cancel(self):
+        self.cancellationToken.cancel()
+
+
+
+    # Function generating the video, then telling the Loading Frame that it is done, that it has been cancelled,
+    # or that it has failed (the error is raised again afterwards, for the command line and the batches)
+    def run(self):
+
+        # Error that has stopped the generation, given to the Loading Frame
+        generation_error = None
+
+        try:
+            # Generating the video, while profiling it when it is asked
+            if self.userRequest.get("Profile"):
+                self.profiler = JobProfiler(os.path.join(self.userRequest["OutputFolder"], os.path.splitext(self.getVideoName())[0]))
+
+                try:
+                    with self.profiler:
+                        self.processVideoCreation()
+                finally:
+                    self.profile_paths = self.profiler.profile_paths
+            else:
+                self.processVideoCreation()
+
+        # The generation has stopped between two frames
+        except GenerationCancelledError as error:
+            print(error, file=sys.stderr)
+            self.is_cancelled = True
+
+        # The generation has failed
+        except Exception as error:
+            generation_error = error
+            raise
+
+        # Breaking the loop of the Loading Frame, whatever happened, so that it never waits forever
+        finally:
+            self.loadingFrameQueue.put((BREAK_LOOP, {"is_cancelled": self.is_cancelled, "error": generation_error}))
+
+
+
+    # ----- Function called as a thread to generate video ----- #
+    def processVideoCreation(self):
+
+        # Getting the request of this job
+        userRequest = self.userRequest
+        queue = self.loadingFrameQueue
+
+        # ----- Creating images objects ----- #
+
+        # Getting common userRequest data
+        begin_datetime = userRequest["BeginDatetime"]
+        end_datetime = userRequest["EndDatetime"]
+        input_folder = userRequest["InputFolder"]
+
+        # When streaming, the images objects are created without their images:
+        # the frames are produced one by one while the video is written,
+        # so the percentage is only driven by the video export
+        models_queue = None if STREAMING_PIPELINE else queue
+
+        # Creating the images of every distinct panel and size needed by the variants, by (panel, (width, height))
+        solar_activity_images = {}
+        particle_graph_images = {}
+
+        # Number of frames of the video
+        number_of_images = 0
+
+        # Solar activity
+        if userRequest["btnSolarActivityVideo"]:
+
+            # FOR LOADING FRAME
+            ###################
+            # Incrementing current generation step
+            self.current_generation_step += 1
+
+            # Displaying the information on the Loading Frame
+            queue.put((UPDATE_STEP, {
+                "new_step_content": "Fetching solar activity images",
+                "current_step": self.current_generation_step,
+                "total_steps": self.total_generation_steps
+            }))
+            ###################
+
+            # Getting the cache of resized images, if it is enabled
+            # (it is shared by every job of the process)
+            frame_cache = None
+
+            if SOLAR_FRAME_CACHE_ENABLED:
+                frame_cache = get_frame_cache()
+
+            # Getting the distinct sizes of the solar activity images of the variants
+            solar_activity_sizes = list(dict.fromkeys((one_dimensions["solar_activity_width"], one_dimensions["solar_activity_height"]) for one_dimensions in self.variantsDimensions))
+
+            # Getting the source images shared by the jobs of the batch,
+            # or sharing them between the sizes of this job, so that every source image is decoded only once
+            source_images = self.sharedInputs.sourceImages if self.sharedInputs is not None else None
+            is_sharing_sizes = source_images is None and len(solar_activity_sizes) > 1
+
+            if is_sharing_sizes:
+                source_images = SharedSourceImages()
+
+            for (solar_activity_width, solar_activity_height) in solar_activity_sizes:
+
+                # Creating solar activity object (its images are loaded below)
+                solar_activity_object = SolarActivityImages(beginDateTime=begin_datetime, endDateTime=end_datetime, imageWidth=solar_activity_width, imageHeight=solar_activity_height, inputFolder=input_folder, loadingFrameQueue=models_queue, lazyLoading=True, loadingWorkers=userRequest.get("SolarImagesLoadingWorkers", SOLAR_IMAGES_LOADING_WORKERS), frameCache=frame_cache, sourceImages=source_images, cancellationToken=self.cancellationToken, profiler=self.profiler)
+
+                # Adding the references of this size to the source images
+                if is_sharing_sizes:
+                    source_images.add_references([os.path.join(input_folder, one_filename) for one_filename in solar_activity_object.images_filenames])
+
+                solar_activity_images[(SOLAR_ACTIVITY_PANEL, (solar_activity_width, solar_activity_height))] = solar_activity_object
+                number_of_images = len(solar_activity_object)
+
+            # Gathering images
+            for (one_key, solar_activity_object) in solar_activity_images.items():
+                solar_activity_images[one_key] = solar_activity_object.iter_images() if STREAMING_PIPELINE else list(solar_activity_object.iter_images())
+        
+        # Particle flux graph
+        if userRequest["btnParticleFluxGraph"]:
+
+            # FOR LOADING FRAME
+            ###################
+            # Incrementing current generation step
+            self.current_generation_step += 1
+
+            # Displaying the information on the Loading Frame
+            queue.put((UPDATE_STEP, {
+                "new_step_content": "Generating particle flux graph images",
+                "current_step": self.current_generation_step,
+                "total_steps": self.total_generation_steps
+            }))
+            ###################
+
+            # Considering that there are always less solar activity
+            # images than particle flux graph images, if the solar
+            # activity option is selected, we set the number of solar
+            # activity images as the minimum number of video's frames
+            graph_number_of_images = None
+
+            if number_of_images > 0:
+                graph_number_of_images = number_of_images
+
+            # Getting the flux data already loaded for the jobs of the batch
+            proton_flux_series, neutron_flux_series = None, None
+
+            if self.sharedInputs is not None:
+                proton_flux_series, neutron_flux_series = self.sharedInputs.get_flux_series(userRequest)
+
+            # The rendering processes save their profiles for the profiler of the job
+            profile_folder = self.profiler.workers_folder if self.profiler is not None else None
+
+            # Getting the distinct graph panels of the variants and their sizes,
+            # whose rendering workers share the CPU cores
+            graph_panels = list(dict.fromkeys((one_panel, one_dimensions["layout"].get_size(one_panel)) for one_dimensions in self.variantsDimensions for one_panel in one_dimensions["layout"].get_panels() if one_panel in GRAPH_PANELS))
+            rendering_workers = userRequest.get("GraphRenderingWorkers", GRAPH_RENDERING_WORKERS)
+
+            if len(graph_panels) > 1:
+                rendering_workers = max(1, (rendering_workers if rendering_workers > 0 else (os.cpu_count() or 1)) // len(graph_panels))
+
+            for (graph_panel, (particle_graph_width, particle_graph_height)) in graph_panels:
+
+                # Fluxes drawn on the graph of the panel
+                dct_energy = userRequest["EnergyData"]
+
+                if graph_panel == PROTON_GRAPH_PANEL:
+                    dct_energy = {**dct_energy, "NeutronFlux": False}
+                elif graph_panel == NEUTRON_GRAPH_PANEL:
+                    dct_energy = {**dct_energy, "ProtonFlux": False}
+
+                # Creating particle flux graph object
+                particle_graph_object = ParticleFluxGraphImages(beginDateTime=begin_datetime, endDateTime=end_datetime, dctEnergy=dct_energy, imageWidth=particle_graph_width, imageHeight=particle_graph_height, numberOfImages=graph_number_of_images, inputFolder=input_folder, loadingFrameQueue=models_queue, lazyLoading=STREAMING_PIPELINE, graphEngine=userRequest.get("GraphEngine", GRAPH_ENGINE), renderingWorkers=rendering_workers, protonFluxSeries=proton_flux_series, neutronFluxSeries=neutron_flux_series, profileFolder=profile_folder, cancellationToken=self.cancellationToken)
+
+                # The flux data loaded for this panel is used by the next ones
+                proton_flux_series = particle_graph_object.proton_flux_series if particle_graph_object.proton_flux_series is not None else proton_flux_series
+                neutron_flux_series = particle_graph_object.neutron_flux_series if particle_graph_object.neutron_flux_series is not None else neutron_flux_series
+
+                # Gathering images
+                particle_graph_images[(graph_panel, (particle_graph_width, particle_graph_height))] = particle_graph_object.iter_images() if STREAMING_PIPELINE else particle_graph_object.images
+                number_of_images = len(particle_graph_object)
+
+                # The graphs of the next panels have as many images as this one
+                graph_number_of_images = number_of_images
+        # ----------------------------------- #
+
+        # ----- Combining different images (with comment) ----- #
+
+        # FOR LOADING FRAME
+        ###################
+        # Incrementing current generation step
+        self.current_generation_step += 1
+
+        # Displaying the information on the Loading Frame
+        queue.put((UPDATE_STEP, {
+                "new_step_content": "Combining images and exporting video" if STREAMING_PIPELINE else "Combining images",
+                "current_step": self.current_generation_step,
+                "total_steps": self.total_generation_steps
+            }))
+        ###################
+
+        # Combining the different kind of images of every variant, with the comment if necessary
+        # When streaming, every frame is combined only when the video writers ask for it
+        if STREAMING_PIPELINE:
+            final_images = self.iterVariantsImages(solar_activity_images, particle_graph_images, userRequest["Comment"], REUSE_FRAME_BUFFERS)
+        else:
+            final_images = self.combineImages(solar_activity_images, particle_graph_images, userRequest["Comment"], queue)
+        # ----------------------------------------------------- #
+
+        # ----- Defining videos names ----- #
+        video_names = self.getVideoNames()
+        # --------------------------------- #
+
+        # ----- Exporting the videos ----- #
+
+        # FOR LOADING FRAME
+        ###################
+        # When streaming, the export is done on the same step as the combination
+        if not STREAMING_PIPELINE:
+
+            # Incrementing current generation step
+            self.current_generation_step += 1
+
+            # Displaying the information on the Loading Frame
+            queue.put((UPDATE_STEP, {
+                    "new_step_content": "Exporting video",
+                    "current_step": self.current_generation_step,
+                    "total_steps": self.total_generation_steps
+                }))
+        ###################
+
+        # Frames are only exported as PNG files when the request asks for it
+        export_frames_folder = userRequest.get("ExportFramesFolder")
+
+        self.video_paths = [os.path.join(userRequest["OutputFolder"], one_name) for one_name in video_names]
+        self.video_path = self.video_paths[0]
+
+        try:
+            self.generateVideo(final_images, video_names=video_names, videos_dimensions=self.variantsDimensions, output_folder=userRequest["OutputFolder"], loadingFrameQueue=queue, number_of_images=number_of_images, export_frames_folder=export_frames_folder, encoder_settings=self.encoderSettings)
+
+        # When streaming, closing the generators of the images that haven't been read until the end
+        # (the generation has been cancelled or has failed), so that their loading threads and rendering processes stop now
+        finally:
+            for images_stream in [final_images, *solar_activity_images.values(), *particle_graph_images.values()]:
+                if hasattr(images_stream, "close"):
+                    images_stream.close()
+        # -------------------------------- #
+
+    
+        
+    # ----- Video name ----- #
+    # The name given by the variant or by the request (without extension), or a name built from the video types and the time range
+    # When the request has several variants, the names that are not given by the variant end with the resolution of the video
+    def getVideoName(self, variantIndex = 0) -> str:
+
+        # Name given by the variant
+        if self.variants[variantIndex].get("VideoName"):
+            return self.variants[variantIndex]["VideoName"] + ".mp4"
+
+        # Name given by the request
+        if self.userRequest.get("VideoName"):
+            video_name = self.userRequest["VideoName"]
+
+        else:
+            video_name = "SolarActivid"
+
+            # Adding selected video types
+            if self.userRequest["btnSolarActivityVideo"]:
+                video_name += "_SA"
+            
+            if self.userRequest["btnParticleFluxGraph"]:
+                video_name += "_PFG"
+            
+            # Adding Begin Datetime
+            video_name += datetime.strftime(self.userRequest["BeginDatetime"], "_%Y%m%d_%H%M%S")
+            
+            # Adding End Datetime
+            video_name += datetime.strftime(self.userRequest["EndDatetime"], "_%Y%m%d_%H%M%S")
+
+        # Adding the resolution of the variant
+        if len(self.variants) > 1:
+            video_name += f"_{self.variantsDimensions[variantIndex]['video_width']}x{self.variantsDimensions[variantIndex]['video_height']}"
+        
+        # Adding .mp4
+        video_name += ".mp4"
+
+        return video_name
+
+
+
+    # Function giving the name of the video of every variant
+    def getVideoNames(self) -> list:
+        return [self.getVideoName(variant_index) for variant_index in range(len(self.variants))]
+    # ---------------------- #
+
+
+
+    # ----- Image combination algorithm ----- #
+    # solar_activity_images and particles_graph_images are the lists of images of every panel and size, by (panel, (width, height))
+    def combineImages(self, solar_activity_images : dict, particles_graph_images : dict, comment = "", loadingFrameQueue = None):
+
+        # For debug 
+        print("Combining images", file=sys.stderr)
+
+        # --- Getting the number of images --- #
+        number_of_images = 0
+
+        # Getting the images of the first size of every type
+        first_solar_activity_images = next(iter(solar_activity_images.values()), [])
+        first_particles_graph_images = next(iter(particles_graph_images.values()), [])
+
+        # When the solar activity images are the only one set
+        if not first_particles_graph_images:
+            number_of_images = len(first_solar_activity_images)
+
+        # When the particle flux graph images are the only one set
+        elif not first_solar_activity_images:
+            number_of_images = len(first_particles_graph_images)
+
+        # When both are set
+        else:
+            
+            # Raising a ValueError when the number of images of both types are unequal
+            if len(first_solar_activity_images) != len(first_particles_graph_images):
+                raise ValueError("Internal Problem | The number of solar activity images and the number of particle flux images are unequal. SA = " + str(len(first_solar_activity_images)) + " and PFG = " + str(len(first_particles_graph_images)))
+
+            number_of_images = len(first_solar_activity_images)
+        # ------------------------------------ #
+
+        # For debug : printing the number of images
+        print("Number of images (from AppHandler) :", number_of_images, file=sys.stderr)
+
+        # List that will store the final images (the images of every variant, for every frame)
+        final_images = []
+
+        # Reporter of the progress on the loading frame
+        progress_reporter = ProgressReporter(loadingFrameQueue, number_of_images)
+
+        # Combining every image
+        for new_images in self.iterVariantsImages(solar_activity_images, particles_graph_images, comment):
+
+            # Stopping between two images when the generation has been cancelled
+            self.cancellationToken.raise_if_cancelled()
+
+            # Adding the new images to the list
+            final_images.append(new_images)
+
+            # --- Increasing percentage on loading frame --- #
+            progress_reporter.update(len(final_images))
+            # ---------------------------------------------- #
+
+        # Returning the final images list          
+        return final_images
+    # --------------------------------------- #
+
+
+
+    # ----- Image combination generator ----- #
+    # Combines the frames one at a time, giving the list of the new VideoFrame of every variant,
+    # as soon as the images of every panel and size are given by solar_activity_images and particles_graph_images
+    # (lists or generators, by (panel, (width, height))), which are all read at the same pace
+    # When reuse_frame_buffers is set, the frames are combined into the pixels of the frames given two frames before:
+    # the caller can only keep the frames it has been given last
+    def iterVariantsImages(self, solar_activity_images : dict, particles_graph_images : dict, comment = "", reuse_frame_buffers = False):
+
+        # --- Getting the layout and the comment block of every variant --- #
+        variants_layouts = []
+
+        for one_dimensions in self.variantsDimensions:
+
+            video_layout = one_dimensions["layout"]
+            (comment_width, _) = video_layout.get_size(COMMENT_PANEL)
+
+            variants_layouts.append({
+                "video_layout": video_layout,
+                "panels_keys": [(one_panel, video_layout.get_size(one_panel)) for one_panel in video_layout.get_panels() if one_panel != COMMENT_PANEL],
+                "comment_block": self.getCommentBlock(comment_width, comment)
+            })
+        # ------------------------------------------------------------------ #
+
+        # --- Reading the images of every panel and size at once --- #
+        # A type of images that isn't selected has no panel, so it has no images
+        images_keys = list(solar_activity_images.keys()) + list(particles_graph_images.keys())
+        images_streams = list(solar_activity_images.values()) + list(particles_graph_images.values())
+        # ----------------------------------------------------------- #
+
+        # --- Combining images --- #
+        previous_images, previous_frames = None, None
+
+        # Frames given before the previous ones, whose pixels are reused when reuse_frame_buffers is set
+        frame_buffers = [None] * len(variants_layouts)
+
+        for images in zip(*images_streams):
+
+            # When every image is the same as for the previous frame (hold frames of the images objects),
+            # the previous new images are given again, without combining them
+            if previous_images is not None and all(one_image is previous_image for (one_image, previous_image) in zip(images, previous_images)):
+                yield previous_frames
+                continue
+
+            images_by_key = dict(zip(images_keys, images))
+
+            # Giving the new image of every variant to the caller
+            new_frames = [self.combineFrame({one_key[0]: images_by_key[one_key] for one_key in layout["panels_keys"]}, layout["video_layout"], layout["comment_block"], frame_buffer) for (layout, frame_buffer) in zip(variants_layouts, frame_buffers)]
+
+            if reuse_frame_buffers and previous_frames is not None:
+                frame_buffers = previous_frames
+
+            previous_images, previous_frames = images, new_frames
+
+            yield previous_frames
+        # ------------------------ #
+    # --------------------------------------- #
+
+
+
+    # ----- Comment block ----- #
+    # Creates the comment block of a video as a raw frame, or gives None when there is no comment
+    def getCommentBlock(self, video_width : int, comment = ""):
+
+        if len(comment) == 0:
+            return None
+
+        # Creating a new image
+        comment_image = Image.new(mode="RGB", size=(video_width, COMMENT_BLOCK_HEIGHT), color="white")
+
+        # Creating the text 
+        text_draw = ImageDraw.Draw(comment_image)
+
+        # Setting text font
+        text_font = get_font(24)
+
+        # Drawing the text on the image
+        text_draw.text((20, 20), comment, font=text_font, fill="black")
+
+        # Converting the comment into a raw frame, only once
+        return VideoFrame.from_pil(comment_image)
+    # ------------------------- #
+
+
+
+    # ----- Frame combination ----- #
+    # Combines the image of every panel of a video layout (panels_images, by panel) and the comment block
+    # (None when there is no comment) into a new VideoFrame, every image being copied into the rectangle of its panel,
+    # or into frame_buffer, a frame previously combined with the same layout, without allocating any pixels
+    def combineFrame(self, panels_images : dict, video_layout : VideoLayout, comment_block = None, frame_buffer = None) -> VideoFrame:
+
+        # Creating new frame (with a black background),
+        # or reusing the frame buffer, whose background and comment block are already drawn
+        new_image = frame_buffer if frame_buffer is not None else VideoFrame.black(video_layout.videoWidth, video_layout.videoHeight)
+
+        # Adding the comment to the new image, if it is defined
+        if comment_block is not None and frame_buffer is None:
+            video_layout.paste(new_image, COMMENT_PANEL, comment_block)
+
+        # Adding the image of every panel to the new image
+        for (one_panel, one_image) in panels_images.items():
+            video_layout.paste(new_image, one_panel, one_image)
+
+        return new_image
+    # ----------------------------- #
+
+
+
+    # ----- Video generation algorithm ----- #
+    # Writes the videos of every variant at once: every element of frame_list is the list of the frames of every video
+    # frame_list can be a list or a generator: in the second case, number_of_images
+    # has to be given to display the percentage on the loading frame
+    # When export_frames_folder is set, every frame is also exported there as a PNG file
+    # The videos are written by the encoder of encoder_settings (see get_encoder_settings(), the default encoder when it isn't given)
+    def generateVideo(self, frame_list, video_names : list, videos_dimensions : list, output_folder : str, loadingFrameQueue = None, number_of_images = None, export_frames_folder = None, encoder_settings = None):
+
+        # Configuring the encoder of every video
+        if encoder_settings is None:
+            encoder_settings = get_encoder_settings()
+
+        # Encoders of the videos, started in the try block below, so that the ones already started are stopped when another one can't be
+        output_videos = []
+
+        # Defining the number of images
+        if number_of_images is None:
+            number_of_images = len(frame_list)
+
+        # Paths of the frames exported as PNG files, and last frame exported for every video, with its path
+        exported_frames_paths = []
+        last_exported_frames = {}
+
+        # Function adding a frame on a video (and exporting it if it was asked)
+        def write_frame(output_video, video_name : str, one_frame : VideoFrame, counter : int):
+
+            # Adding frame on the video
+            output_video.write(one_frame)
+
+            # Exporting the frame as a PNG file if it was asked
+            # (a hold frame, the same frame as the previous one, is copied from the previous file instead of being compressed again)
+            if export_frames_folder is not None:
+                frame_path = os.path.join(export_frames_folder, f"{os.path.splitext(video_name)[0]}_{counter:06d}.png")
+                (last_frame, last_frame_path) = last_exported_frames.get(video_name, (None, None))
+
+                if one_frame is last_frame:
+                    shutil.copyfile(last_frame_path, frame_path)
+                else:
+                    one_frame.save_png(frame_path)
+
+                last_exported_frames[video_name] = (one_frame, frame_path)
+                exported_frames_paths.append(frame_path)
+
+        # Reporter of the progress on the loading frame
+        progress_reporter = ProgressReporter(loadingFrameQueue, number_of_images)
+
+        try:
+            for (video_name, one_dimensions) in zip(video_names, videos_dimensions):
+                output_videos.append(create_video_encoder(os.path.join(output_folder, video_name), one_dimensions["video_width"], one_dimensions["video_height"], encoder_settings))
+
+            # The videos are encoded at the same time (the encoders release the GIL while encoding)
+            with ThreadPoolExecutor(max_workers=len(output_videos), **get_thread_pool_arguments(self.profiler)) as executor:
+
+                counter = 0
+                for frames in frame_list:
+
+                    # Stopping between two frames when the generation has been cancelled
+                    self.cancellationToken.raise_if_cancelled()
+
+                    counter += 1
+
+                    # Adding the frame of every video
+                    if len(output_videos) == 1:
+                        write_frame(output_videos[0], video_names[0], frames[0], counter)
+                    else:
+                        list(executor.map(write_frame, output_videos, video_names, frames, [counter] * len(output_videos)))
+
+                    # --- Increasing percentage on loading frame --- #
+                    progress_reporter.update(counter)
+                    # ---------------------------------------------- #
+
+            # Exporting videos (the encoders finish encoding the last frames)
+            # When an encoder fails, the encoders that are not closed yet are stopped below
+            for output_video in output_videos:
+                output_video.close()
+
+        # Stopping the encoders that are not closed yet when the generation has been cancelled or has failed
+        # (the ffmpeg processes would wait for frames otherwise), and removing the partial videos and the frames already exported
+        except Exception:
+
+            for output_video in output_videos:
+                output_video.abort()
+
+            for one_path in [os.path.join(output_folder, video_name) for video_name in video_names] + exported_frames_paths:
+                if os.path.exists(one_path):
+                    os.remove(one_path)
+
+            raise
+
+        for video_name in video_names:
+            print("Video findable on " + os.path.join(output_folder, video_name), file=sys.stderr)
+    # -------------------------------------- #
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Function giving the variants of a request: its own "Variants", or the only variant of its format and quality
+def get_request_variants(userRequest : dict[str, any]) -> list:
+
+    if userRequest.get("Variants"):
+        return userRequest["Variants"]
+
+    return [{"Format": userRequest["Format"], "Quality": userRequest["Quality"]}]
+
+
+
+# Function that defines the dimensions of the video and of its images, depending on the user's request
+def get_video_dimensions(userRequest : dict[str, any]) -> dict[str, int]:
+
+    # ----- Video format and quality ----- #
+    video_width, video_height = 0, 0
+
+    # Vertical image
+    if userRequest["Format"] == "Instagram (vertical)":
+        
+        # Medium resolution
+        if userRequest["Quality"] == "Medium (720p)":
+            
+            video_width, video_height = RESOLUTION_VERTICAL_MED
+        
+        # High resolution
+        elif userRequest["Quality"] == "High (1080p)":
+            
+            video_width, video_height =  RESOLUTION_VERTICAL_HIGH
+
+    # Horizontal image
+    elif userRequest["Format"] == "YouTube (horizontal)":
+        
+        # Medium resolution
+        if userRequest["Quality"] == "Medium (720p)":
+            
+            video_width, video_height = RESOLUTION_HORIZONTAL_MED
+        
+        # High resolution
+        elif userRequest["Quality"] == "High (1080p)":
+            
+            video_width, video_height = RESOLUTION_HORIZONTAL_HIGH
+
+    # ------------------------------------ #
+
+
+    # ----- Layout of the panels ----- #
+
+    # Panels shown in the video
+    shown_panels = set()
+
+    if userRequest["btnSolarActivityVideo"]:
+        shown_panels.add(SOLAR_ACTIVITY_PANEL)
+
+    if userRequest["btnParticleFluxGraph"]:
+        shown_panels.add(PARTICLE_GRAPH_PANEL)
+
+        if userRequest["EnergyData"]["ProtonFlux"]:
+            shown_panels.add(PROTON_GRAPH_PANEL)
+
+        if userRequest["EnergyData"]["NeutronFlux"]:
+            shown_panels.add(NEUTRON_GRAPH_PANEL)
+
+    # Leaving space on the screen for the comment, when a comment is written
+    if len(userRequest["Comment"]) != 0:
+        shown_panels.add(COMMENT_PANEL)
+
+    # Resolving the layout of the request, or the one of the format, into the rectangles of the panels
+    video_format = VERTICAL if userRequest["Format"] == "Instagram (vertical)" else HORIZONTAL
+    video_layout = VideoLayout(userRequest.get("Layout") or VIDEO_LAYOUTS[video_format], video_width, video_height, shown_panels)
+
+    # Initializing dictionary for video images dimensions
+    videoDimensions = {}
+    
+    # Filling the data (the size of a panel that isn't in the video is 0 x 0)
+    videoDimensions["video_width"], videoDimensions["video_height"] = int(video_width), int(video_height)
+    videoDimensions["solar_activity_width"], videoDimensions["solar_activity_height"] = video_layout.get_size(SOLAR_ACTIVITY_PANEL)
+    videoDimensions["particle_graph_width"], videoDimensions["particle_graph_height"] = video_layout.get_size(PARTICLE_GRAPH_PANEL)
+    videoDimensions["layout"] = video_layout
+
+    # For debug : Displaying the resolutions
+    print("Video resolution :", video_width, "x", video_height, file=sys.stderr)
+
+    for (one_panel, (x, y, width, height)) in video_layout.rectangles.items():
+        print(f"Panel {one_panel} resolution : {width} x {height} at ({x}, {y})", file=sys.stderr)
+
+    # -------------------------------- #
+
+    return videoDimensions
@@ -1,7 +1,12 @@
 import customtkinter as ctk
+import multiprocessing
 
 from controller.apphandler import AppHandler
 
 # Main function
 if __name__ == "__main__":
+
+    # Allowing the worker processes rendering the graphs to start from the PyInstaller executable
+    multiprocessing.freeze_support()
+
     AppHandler()
\ No newline at end of file
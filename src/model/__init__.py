@@ -1,4 +1,14 @@
+from .fluxseries import FluxSeries
+from .imagecatalog import ImageCatalog
+from .linedecimator import LineDecimator
+from .overlaylayer import OverlayLayer
 from .particlefluxgraphimages import ParticleFluxGraphImages
+from .protonfluxstore import ProtonFluxStore
+from .sharedsourceimages import SharedSourceImages
 from .solaractivityimages import SolarActivityImages
+from .solarframecache import SolarFrameCache, get_frame_cache
+from .videoencoders import FFmpegVideoEncoder, OpenCVVideoEncoder, create_video_encoder, get_encoder_settings
+from .videoframe import VideoFrame
+from .videolayout import VideoLayout
 
-__all__ = ['ParticleFluxGraphImages', 'SolarActivityImages']
\ No newline at end of file
+__all__ = ['FFmpegVideoEncoder', 'FluxSeries', 'ImageCatalog', 'LineDecimator', 'OpenCVVideoEncoder', 'OverlayLayer', 'ParticleFluxGraphImages', 'ProtonFluxStore', 'SharedSourceImages', 'SolarActivityImages', 'SolarFrameCache', 'VideoFrame', 'VideoLayout', 'create_video_encoder', 'get_encoder_settings', 'get_frame_cache']
\ No newline at end of file
@@ -0,0 +1,91 @@
+import numpy as np
+
+from datetime import datetime
+
+
+class FluxSeries():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## A flux series holds the measures of a particle flux in columns: one array of sorted times (datetime64, in seconds),
+    ## and one float array of the same length for every measure (proton energy or neutron station)
+    def __init__(self, times, columns : dict):
+
+        # Defining attributes from parameters
+        self.times = np.asarray(times, dtype='datetime64[s]')
+        self.columns = {label: np.asarray(values, dtype=float) for (label, values) in columns.items()}
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function giving the number of measures
+    def __len__(self):
+        return len(self.times)
+
+
+
+    # Function giving the first time of the series, as a Python datetime
+    def min_time(self) -> datetime:
+        return self.times.min().astype(datetime)
+
+
+
+    # Function giving the last time of the series, as a Python datetime
+    def max_time(self) -> datetime:
+        return self.times.max().astype(datetime)
+
+
+
+    # Function giving the minimum measure of every column (missing measures are ignored)
+    def min_value(self) -> float:
+        return float(min(np.nanmin(values) for values in self.columns.values()))
+
+
+
+    # Function giving the maximum measure of every column (missing measures are ignored)
+    def max_value(self) -> float:
+        return float(max(np.nanmax(values) for values in self.columns.values()))
+
+
+
+    # Function giving the part of the series between begin_date_time and end_date_time (both included)
+    def between(self, begin_date_time : datetime, end_date_time : datetime):
+
+        # The times are sorted, so the bounds are found by bisection
+        begin_index = np.searchsorted(self.times, np.datetime64(begin_date_time, 's'), side='left')
+        end_index = np.searchsorted(self.times, np.datetime64(end_date_time, 's'), side='right')
+
+        return FluxSeries(self.times[begin_index:end_index], {label: values[begin_index:end_index] for (label, values) in self.columns.items()})
+
+
+
+    # Function giving a series with only the columns of labels (the columns that are missing,
+    # or without any measure, are left out)
+    def select(self, labels : list):
+        return FluxSeries(self.times, {label: self.columns[label] for label in labels if label in self.columns and not np.isnan(self.columns[label]).all()})
+
+
+
+    # Function building a series from a proton flux dictionary
+    # Dictionary format : {">=1 MeV" : {timestamp1 : flux, timestamp2 : flux, ...}, ">=10 MeV" : {timestamp1 : flux, timestamp2 : flux, ...}, ...}
+    # The times of the first energy are used for every energy
+    @classmethod
+    def from_proton_dict(cls, proton_flux_dict : dict):
+
+        # Case when no energy has been found
+        if len(proton_flux_dict) == 0:
+            return cls([], {})
+
+        first_key = list(proton_flux_dict.keys())[0]
+
+        return cls(list(proton_flux_dict[first_key].keys()), {one_energy: list(proton_flux_dict[one_energy].values()) for one_energy in proton_flux_dict.keys()})
+
+
+
+    # Function building a series from a neutron flux dictionary
+    # Dictionary format : {"start_date_time" : [list of datetimes], "Measure" : [List of measures]}
+    @classmethod
+    def from_neutron_dict(cls, neutron_flux_dict : dict):
+        return cls(neutron_flux_dict["start_date_time"], {one_key: values for (one_key, values) in neutron_flux_dict.items() if one_key != "start_date_time"})
+    ## --------------------------------------------------------------------------------------------------------------------- ##
@@ -0,0 +1,133 @@
+import hashlib
+import numpy as np
+import os
+import sqlite3
+
+from datetime import datetime
+
+from common.paths import get_app_data_folder
+from common.timestamps import IMAGE_FILENAME_FORMAT, parse_timestamps
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Extensions of the image files
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", "png")
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+class ImageCatalog():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The catalog keeps, for every image of the input folder, its timestamp, channel (image type), resolution and size,
+    ## in a SQLite database of the application data folder (the input folder may be read-only)
+    ## The timestamps are indexed, so selecting the images of a time range doesn't depend on the size of the folder
+    def __init__(self, inputFolder : str, imageTypes : list, resolutions : list, catalogFolder = None):
+
+        # Defining attributes from parameters
+        self.inputFolder = inputFolder
+        self.imageTypes = imageTypes
+        self.resolutions = resolutions
+
+        # One database per input folder, named after its absolute path
+        folder_key = hashlib.sha1(os.path.abspath(inputFolder).encode("utf-8")).hexdigest()
+
+        # Opening the database, or a temporary one in memory when it can't be created
+        try:
+            catalog_folder = catalogFolder if catalogFolder is not None else get_app_data_folder("catalogs")
+            self.connection = sqlite3.connect(os.path.join(catalog_folder, folder_key + ".sqlite"))
+        except (OSError, sqlite3.Error):
+            self.connection = sqlite3.connect(":memory:")
+
+        # Creating the tables, if they don't exist yet
+        self.connection.execute("CREATE TABLE IF NOT EXISTS images (filename TEXT PRIMARY KEY, timestamp INTEGER NOT NULL, channel TEXT, resolution TEXT, size INTEGER)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS images_timestamp ON images (timestamp)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS folder_state (key TEXT PRIMARY KEY, value INTEGER)")
+        self.connection.commit()
+
+        # Updating the catalog with the current content of the folder
+        self.refresh()
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Functions allowing the catalog to be used in a "with" statement, which closes it at the end
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+
+    # Function to close the database
+    def close(self):
+        self.connection.close()
+
+
+
+    # Function that updates the catalog when the folder has changed since the last time (from its modification time)
+    # Only the new images are parsed, and the removed ones are deleted from the catalog
+    def refresh(self):
+
+        # Getting the modification time of the folder, and the one of the last refresh
+        folder_mtime = os.stat(self.inputFolder).st_mtime_ns
+        row = self.connection.execute("SELECT value FROM folder_state WHERE key = 'mtime'").fetchone()
+
+        # Nothing to do if the folder hasn't changed
+        if row is not None and row[0] == folder_mtime:
+            return
+
+        # Getting the images of the folder, and the ones of the catalog
+        folder_entries = {entry.name: entry for entry in os.scandir(self.inputFolder) if entry.name.endswith(IMAGE_EXTENSIONS)}
+        catalog_filenames = {one_row[0] for one_row in self.connection.execute("SELECT filename FROM images")}
+
+        # Removing the images that are not in the folder anymore
+        removed_filenames = catalog_filenames - folder_entries.keys()
+        self.connection.executemany("DELETE FROM images WHERE filename = ?", ((one_filename,) for one_filename in removed_filenames))
+
+        # Adding the new images
+        new_filenames = list(folder_entries.keys() - catalog_filenames)
+        new_rows = []
+
+        # According to the file name pattern, the date is specified in the 13 first characters,
+        # and the dates of every new file are read at once (in seconds since 1970-01-01)
+        # Files that don't follow this pattern are ignored
+        filename_timestamps = parse_timestamps(new_filenames, IMAGE_FILENAME_FORMAT)
+
+        for (one_filename, filename_timestamp) in zip(new_filenames, filename_timestamps):
+
+            if np.isnat(filename_timestamp):
+                continue
+
+            new_rows.append((one_filename, int(filename_timestamp.astype(np.int64)), find_key(one_filename, self.imageTypes), find_key(one_filename, self.resolutions), folder_entries[one_filename].stat().st_size))
+
+        self.connection.executemany("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?)", new_rows)
+
+        # Saving the modification time of this refresh
+        self.connection.execute("INSERT OR REPLACE INTO folder_state VALUES ('mtime', ?)", (folder_mtime,))
+        self.connection.commit()
+
+
+
+    # Function giving the (filename, channel, resolution) of every image between begin_date_time and end_date_time,
+    # sorted by filename
+    def select(self, begin_date_time : datetime, end_date_time : datetime) -> list:
+        return self.connection.execute("SELECT filename, channel, resolution FROM images WHERE timestamp BETWEEN ? AND ? ORDER BY filename", (to_epoch_seconds(begin_date_time), to_epoch_seconds(end_date_time))).fetchall()
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Function giving the number of seconds between 1970-01-01 and a datetime, whose time zone is ignored
+def to_epoch_seconds(date_time : datetime) -> int:
+    return int((date_time.replace(tzinfo=None) - datetime(1970, 1, 1)).total_seconds())
+
+
+
+# Function giving the first key found on a file name, after its timestamp, or None if there is none
+def find_key(filename : str, keys : list):
+    for one_key in keys:
+        if filename.find(one_key, 14) != -1:
+            return one_key
+    return None
@@ -0,0 +1,114 @@
+import numpy as np
+
+from common.constants import GRAPH_LINE_DECIMATION
+
+
+class LineDecimator():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The min/max decimation of a line (sorted x values and their y values) drawn on an axis from xMin to xMax,
+    ## which is numberOfColumns pixels wide at most: only the lowest and the highest point of every pixel column are kept,
+    ## so the line has about 2 points per column whatever its number of measures, and looks the same (its peaks are kept)
+    ## The points of every column are found once, so that any beginning of the line (see get_indices()) is decimated
+    ## by reading the columns before its last one, and only the measures of its last column
+    def __init__(self, xValues, yValues, xMin : float, xMax : float, numberOfColumns : int, enabled = GRAPH_LINE_DECIMATION):
+
+        # Defining attributes from parameters
+        self.xValues = np.asarray(xValues, dtype=float)
+        self.yValues = np.asarray(yValues, dtype=float)
+
+        # A line with less than 2 measures per column is drawn as it is
+        self.is_decimated = enabled and len(self.xValues) > 2 * numberOfColumns and xMax > xMin
+
+        if not self.is_decimated:
+            return
+
+        # Column of every measure (the x values are sorted, so are their columns)
+        columns = ((self.xValues - xMin) * (numberOfColumns / (xMax - xMin))).astype(np.int64)
+        np.clip(columns, 0, numberOfColumns - 1, out=columns)
+
+        # Index of the first measure of every column that has measures, and of the measure after its last one
+        self.column_starts = np.flatnonzero(np.diff(columns, prepend=-1))
+        self.column_ends = np.append(self.column_starts[1:], len(columns))
+
+        # Indices of the points kept for every column, one after another,
+        # and index of the first point of every column among them
+        (self.indices, self.indices_starts) = get_column_indices(self.yValues, self.column_starts, len(columns))
+        self.indices_ends = np.append(self.indices_starts[1:], len(self.indices))
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function giving the indices of the points to draw for the first plot_limit measures of the line
+    # (a slice of every measure when the line isn't decimated)
+    def get_indices(self, plot_limit : int):
+
+        if not self.is_decimated or plot_limit <= 0:
+            return slice(0, max(0, plot_limit))
+
+        plot_limit = min(plot_limit, len(self.xValues))
+
+        # Column of the last measure, whose points are found again from its first measures only
+        last_column = np.searchsorted(self.column_starts, plot_limit - 1, side='right') - 1
+        last_column_start = self.column_starts[last_column]
+
+        if plot_limit == self.column_ends[last_column]:
+            last_column_indices = self.indices[self.indices_starts[last_column]:self.indices_ends[last_column]]
+        else:
+            last_column_indices = get_column_indices(self.yValues[last_column_start:plot_limit], np.zeros(1, dtype=np.int64), plot_limit - last_column_start)[0] + last_column_start
+
+        # The last measure is always drawn, so that the line ends where the measures end
+        if last_column_indices[-1] != plot_limit - 1:
+            last_column_indices = np.append(last_column_indices, plot_limit - 1)
+
+        return np.concatenate((self.indices[:self.indices_starts[last_column]], last_column_indices))
+
+
+
+    # Function building the decimator of a line drawn on an axis, whose limits are already set:
+    # the columns are the pixels of the figure, which is at least as wide as the axis
+    @classmethod
+    def from_axis(cls, ax, x_values, y_values):
+        (x_min, x_max) = ax.get_xlim()
+
+        return cls(x_values, y_values, x_min, x_max, int(np.ceil(ax.figure.bbox.width)))
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Function giving the indices of the points kept for the measures y_values, whose columns begin at column_starts
+# (and the last one ends at number_of_values): the lowest and highest measures of every column, and its first
+# missing measure (NaN) so that the line is still cut there, in the order of the measures, one column after another
+# It also gives the index of the first point of every column among these points
+def get_column_indices(y_values, column_starts, number_of_values : int) -> tuple:
+
+    positions = np.arange(number_of_values)
+    is_missing = np.isnan(y_values)
+    column_lengths = np.diff(np.append(column_starts, number_of_values))
+
+    # Lowest and highest measures of every column, the missing ones being left out
+    lowest_values = np.minimum.reduceat(np.where(is_missing, np.inf, y_values), column_starts)
+    highest_values = np.maximum.reduceat(np.where(is_missing, -np.inf, y_values), column_starts)
+
+    # First index of these measures in every column (the first measure when the column has only missing ones),
+    # and of the first missing measure (number_of_values when there isn't any)
+    lowest_indices = np.minimum.reduceat(np.where(y_values == np.repeat(lowest_values, column_lengths), positions, number_of_values), column_starts)
+    highest_indices = np.minimum.reduceat(np.where(y_values == np.repeat(highest_values, column_lengths), positions, number_of_values), column_starts)
+    missing_indices = np.minimum.reduceat(np.where(is_missing, positions, number_of_values), column_starts)
+
+    lowest_indices = np.where(lowest_indices == number_of_values, column_starts, lowest_indices)
+    highest_indices = np.where(highest_indices == number_of_values, lowest_indices, highest_indices)
+    missing_indices = np.where(missing_indices == number_of_values, lowest_indices, missing_indices)
+
+    # Points of every column, in the order of the measures and without the same point twice
+    column_indices = np.sort(np.stack((lowest_indices, highest_indices, missing_indices), axis=1), axis=1)
+    is_kept = np.ones(column_indices.shape, dtype=bool)
+    is_kept[:, 1:] = column_indices[:, 1:] != column_indices[:, :-1]
+
+    # Index of the first point of every column among the points
+    column_points = is_kept.sum(axis=1)
+    indices_starts = np.cumsum(column_points) - column_points
+
+    return (column_indices[is_kept], indices_starts)
@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+
+from PIL import Image, ImageDraw
+
+from common.fonts import get_font
+from model.videoframe import VideoFrame
+
+
+class OverlayLayer():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## A static layer drawn over frames (a credit watermark...), rendered only once: the colors of its pixels premultiplied
+    ## by their opacity, and their transparency, within the bounding box of its visible pixels, at the (x, y) position of the frames
+    ## It is built from an RGBA image of the size of the frames (see from_image() and draw_text_image())
+    def __init__(self, premultipliedPixels : np.ndarray, transparency : np.ndarray, x : int, y : int):
+
+        # Defining attributes from parameters
+        self.premultipliedPixels = premultipliedPixels
+        self.transparency = transparency
+        self.x = x
+        self.y = y
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function drawing the layer over the pixels of a frame, in place and without any new array
+    # (the pixels of a frame decoded by Pillow are read-only, so they are copied first)
+    def draw_on(self, frame : VideoFrame):
+
+        if not frame.pixels.flags.writeable:
+            frame.pixels = frame.pixels.copy()
+
+        (height, width, _) = self.premultipliedPixels.shape
+        frame_pixels = frame.pixels[self.y:self.y+height, self.x:self.x+width]
+
+        # pixel * transparency + premultiplied color
+        cv2.multiply(frame_pixels, self.transparency, dst=frame_pixels, scale=1/255)
+        cv2.add(frame_pixels, self.premultipliedPixels, dst=frame_pixels)
+
+
+
+    # Function building a layer from an RGBA image, resized to (width, height) when they are given:
+    # its colors are premultiplied by their opacity before being resized, so that the edges of the layer keep their colors
+    @classmethod
+    def from_image(cls, image : Image.Image, width = None, height = None):
+
+        premultiplied_image = image.convert("RGBa")
+
+        if width is not None and height is not None:
+            premultiplied_image = premultiplied_image.resize((int(width), int(height)))
+
+        # Keeping the visible pixels only
+        bounding_box = premultiplied_image.getchannel(3).getbbox() or (0, 0, 1, 1)
+        pixels = np.asarray(premultiplied_image.crop(bounding_box))
+
+        premultiplied_pixels = np.ascontiguousarray(pixels[:, :, :3])
+        transparency = np.ascontiguousarray(np.repeat(255 - pixels[:, :, 3:], 3, axis=2))
+
+        return cls(premultiplied_pixels, transparency, bounding_box[0], bounding_box[1])
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Function giving an RGBA image of size (width, height) where a text is written at (x, y), the rest being transparent
+def draw_text_image(width : int, height : int, x : int, y : int, text : str, font_size : int, color = "white") -> Image.Image:
+
+    # Writing the text on the opacity of the image
+    opacity = Image.new(mode="L", size=(int(width), int(height)), color=0)
+    ImageDraw.Draw(opacity).text((x, y), text, font=get_font(font_size), fill=255)
+
+    image = Image.new(mode="RGBA", size=opacity.size, color=color)
+    image.putalpha(opacity)
+
+    return image
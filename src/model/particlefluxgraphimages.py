@@ -1,26 +1,70 @@
-import csv
 import cv2
 import datetime as dt
-import io
+import functools
 import json
+import matplotlib.colors as mcolors
 import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
+import multiprocessing
 import numpy as np
 import os
+import pickle
 import sys
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from PIL import Image
 
-from common.constants import UPDATE_PERCENTAGE
+from common.constants import GRAPH_ENGINE, GRAPH_RENDERING_CHUNK_SIZE, GRAPH_RENDERING_MIN_PARALLEL_FRAMES, GRAPH_RENDERING_WORKERS, HOLD_DUPLICATE_FRAMES, PROTON_FLUX_STORE_ENABLED, REUSE_GRAPH_FIGURE
+from common.progress import ProgressReporter
 from common.exceptions import NoDataFoundError
+from common.profiling import start_worker_profiling
+from common.timestamps import GOES_TIME_TAG_FORMAT, NMDB_DATE_TIME_FORMAT, parse_timestamps
+from model.fluxseries import FluxSeries
+from model.linedecimator import LineDecimator
+from model.protonfluxstore import ProtonFluxStore
+from model.videoframe import VideoFrame
 
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Names of the NMDB columns holding the measures of a single station
+NEUTRON_SINGLE_STATION_COLUMNS = ("RCORR_E", "Neutron flux")
+
+# Engines drawing the frames of the graph: matplotlib for every frame (see GraphRenderer),
+# or matplotlib for the background only and the lines drawn directly into the pixels (see RasterGraphRenderer)
+MATPLOTLIB_GRAPH_ENGINE = "matplotlib"
+RASTER_GRAPH_ENGINE = "raster"
+GRAPH_ENGINES = [MATPLOTLIB_GRAPH_ENGINE, RASTER_GRAPH_ENGINE]
+
+# Precision of the points of the lines drawn by RasterGraphRenderer: 2^RASTER_LINE_SHIFT subpixels per pixel
+RASTER_LINE_SHIFT = 4
+RASTER_LINE_SUBPIXELS = 2 ** RASTER_LINE_SHIFT
+
+# Pixels around the legends laid over the lines by RasterGraphRenderer, for the edges of their frames
+RASTER_LEGEND_PADDING = 2
+
+## ------------------------------------------------------------------------------------------------------------------- ##
 
 class ParticleFluxGraphImages():
 
     ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
     ## It that will directly build the graph images
-    def __init__(self, beginDateTime : datetime, endDateTime : datetime, dctEnergy : dict[str, bool], imageWidth : float, imageHeight : float, inputFolder : str, numberOfImages = None, loadingFrameQueue = None):
+    ## When lazyLoading is set, the graph images are not built by the constructor:
+    ## they are produced one by one by iter_images(), when the video needs them
+    ## When reuseFigure is set, one figure is built and only its lines are redrawn for every frame (see GraphRenderer)
+    ## graphEngine is the engine drawing the frames (see GRAPH_ENGINES): with the raster engine, only the new segments
+    ## of the lines are drawn for every frame, into the pixels of the previous one (see RasterGraphRenderer)
+    ## renderingWorkers is the number of processes rendering the frames (1 renders them in this process, 0 uses every CPU core)
+    ## When useProtonStore is set, the proton flux is loaded from a columnar store of the input folder (see ProtonFluxStore)
+    ## instead of reading the JSON files of every day
+    ## When protonFluxSeries or neutronFluxSeries are given (already loaded for a batch of jobs), they are used instead of the files
+    ## When profileFolder is given (the job is profiled), the rendering processes save their profiles there
+    ## When cancellationToken (a CancellationToken) is given, the rendering stops between two frames once it is cancelled
+    ## When holdDuplicateFrames is set, a frame with the same plot limits as the previous one isn't rendered: the previous frame is given again
+    def __init__(self, beginDateTime : datetime, endDateTime : datetime, dctEnergy : dict[str, bool], imageWidth : float, imageHeight : float, inputFolder : str, numberOfImages = None, loadingFrameQueue = None, lazyLoading = False, reuseFigure = REUSE_GRAPH_FIGURE, graphEngine = GRAPH_ENGINE, renderingWorkers = GRAPH_RENDERING_WORKERS, useProtonStore = PROTON_FLUX_STORE_ENABLED, protonFluxSeries = None, neutronFluxSeries = None, profileFolder = None, cancellationToken = None, holdDuplicateFrames = HOLD_DUPLICATE_FRAMES):
         
         # Defining attributes from parameters
         self.beginDateTime = beginDateTime
@@ -31,25 +75,82 @@ class ParticleFluxGraphImages():
         self.inputFolder = inputFolder
         self.numberOfImages = numberOfImages
         self.loadingFrameQueue = loadingFrameQueue
-
-        # Defining dictionaries for particle flux
-        proton_flux_dictionary = None
-        neutron_flux_dictionary = None
+        self.lazyLoading = lazyLoading
+        self.reuseFigure = reuseFigure
+        self.graphEngine = graphEngine
+        self.renderingWorkers = renderingWorkers
+        self.useProtonStore = useProtonStore
+        self.profileFolder = profileFolder
+        self.cancellationToken = cancellationToken
+        self.holdDuplicateFrames = holdDuplicateFrames
+
+        # We raise a ValueError exception when the graph engine doesn't exist
+        if self.graphEngine not in GRAPH_ENGINES:
+            raise ValueError(f"Unknown graph engine {self.graphEngine}, it should be one of {', '.join(GRAPH_ENGINES)}")
+
+        # Defining flux series for particle flux
+        self.proton_flux_series = None
+        self.neutron_flux_series = None
         
-        # Getting Proton flux data dictionary if selected
+        # Getting Proton flux data if selected
         if dctEnergy["ProtonFlux"]:
-            proton_flux_dictionary = self.proton_json_to_dict(self.beginDateTime, self.endDateTime, self.dctEnergy["Energies"])
 
-        # Getting Neutron flux data dictionary if selected
+            # Already loaded
+            if protonFluxSeries is not None:
+                self.proton_flux_series = protonFluxSeries
+
+            # From the columnar store, only for the selected energies
+            elif self.useProtonStore:
+                selected_energies = [one_energy for (one_energy, is_selected) in self.dctEnergy["Energies"].items() if is_selected]
+                self.proton_flux_series = ProtonFluxStore(self.inputFolder).load(self.beginDateTime, self.endDateTime, selected_energies)
+
+            # From the JSON files
+            else:
+                self.proton_flux_series = FluxSeries.from_proton_dict(self.proton_json_to_dict(self.beginDateTime, self.endDateTime, self.dctEnergy["Energies"]))
+
+            # We raise a NoDataFoundError exception when there is no measure in the range
+            if len(self.proton_flux_series) == 0 or len(self.proton_flux_series.columns) == 0:
+                raise NoDataFoundError("No corresponding proton flux data has been found")
+
+        # Getting Neutron flux data if selected (already loaded, or from the CSV files)
         if dctEnergy["NeutronFlux"]:
-            neutron_flux_dictionary = self.neutron_csv_to_dict(self.beginDateTime, self.endDateTime)
+            self.neutron_flux_series = neutronFluxSeries if neutronFluxSeries is not None else self.neutron_csv_to_series(self.beginDateTime, self.endDateTime)
+
+            # We raise a NoDataFoundError exception when there is no measure in the range
+            if len(self.neutron_flux_series) == 0:
+                raise NoDataFoundError("No corresponding neutron flux data has been found")
+
+        # Defining the list of images
+        self.images = []
 
-        # Generating graph images and storing them into a BytesIO tab
-        self.images = self.dict_to_graph(proton_flux_dict=proton_flux_dictionary, neutron_flux_dict=neutron_flux_dictionary, image_width=self.imageWidth, image_height=self.imageHeight)
+        # Generating graph images and storing them into a VideoFrame tab,
+        # unless they are asked one by one later
+        if not self.lazyLoading:
+            self.images = list(self.iter_images())
     ## --------------------------------------------------------------------------------------------------------------------- ##
     
 
 
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function giving the number of graph images that will be produced
+    def __len__(self):
+
+        # Gathering the datetimes of both graphs
+        proton_start_datetimes = self.proton_flux_series.times if self.proton_flux_series is not None else []
+        neutron_start_datetimes = self.neutron_flux_series.times if self.neutron_flux_series is not None else []
+
+        return self.get_number_of_images(proton_start_datetimes, neutron_start_datetimes)
+
+
+
+    # Generator producing every graph image as a VideoFrame, one at a time,
+    # so that only the graph being drawn is kept in memory
+    def iter_images(self):
+        return self.iter_graph_images(proton_flux_series=self.proton_flux_series, neutron_flux_series=self.neutron_flux_series, image_width=self.imageWidth, image_height=self.imageHeight)
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
     ## FUNCTIONS ----------------------------------------------------------------------------------------------------------- ##
 
     # Function to convert GOES Proton Flux data file in JSON into a legible dictionary for the graph video algorithm
@@ -59,17 +160,11 @@ class ParticleFluxGraphImages():
         # Creating a dictionary that will store the proton flux data
         final_dict = dict()
         
-        # Saving previous working directory
-        previous_working_directory = os.getcwd()
-        
-        # Setting working directory to input folder
-        os.chdir(self.inputFolder)
-
 
         ## ----- Checking every data file day per day ----- ##
 
-        current_date_time = begin_date_time # Initializing current datetime
-        while current_date_time <= end_date_time:
+        current_date_time = begin_date_time.date() # Initializing current date (the last day is checked even when it ends earlier in the day)
+        while current_date_time <= end_date_time.date():
             
             # Importing year, month and day from current_date_time
             year = current_date_time.strftime('%Y')
@@ -77,39 +172,32 @@ class ParticleFluxGraphImages():
             day = current_date_time.strftime('%d')
         
 
-            # Opening file
-            json_file = open(f"{year}{month}{day}_integral-protons-1-day.json")
+            # Opening file and loading data as a dictionary
+            with open(os.path.join(self.inputFolder, f"{year}{month}{day}_integral-protons-1-day.json")) as json_file:
+                json_data = json.load(json_file)
+
+            # We keep the measures whose energy was selected on the user's request
+            selected_measures = [measure for measure in json_data if energy_dict[measure["energy"]] == True]
 
-            # Loading data as a dictionary
-            json_data = json.load(json_file)
+            # Getting every measure["time_tag"] property of the file at once into datetimes,
+            # and checking which ones are between begin_date_time and end_date_time
+            measure_datetimes = parse_timestamps([measure["time_tag"] for measure in selected_measures], GOES_TIME_TAG_FORMAT)
+            range_mask = (measure_datetimes >= np.datetime64(begin_date_time, 's')) & (measure_datetimes <= np.datetime64(end_date_time, 's'))
 
-            # Checking every measure in the json file
-            for measure in json_data:
+            # Checking every selected measure in the json file
+            for (measure, current_measure_datetime, is_in_range) in zip(selected_measures, measure_datetimes.astype(datetime), range_mask):
 
                 # Getting current measure's energy
                 # corresponding to the measure's flux
                 current_energy = measure["energy"]
-
-                # We add this measure if only the current energy was
-                # selected on the user's request
-                if energy_dict[current_energy] == True:
                     
-                    # Adding current_energy key if it isn't set yet
-                    if current_energy not in final_dict.keys():
-                        final_dict[current_energy] = dict()
-
-                    # Getting measure["time_tag"] property into a Python datetime format
-                    current_measure_datetime = datetime.strptime(measure["time_tag"], '%Y-%m-%dT%H:%M:%SZ')
-
-                    # We add this measure to the final dictionary if only the current_measure_datetime
-                    # is between begin_date_time and end_date_time
-                    if current_measure_datetime >= begin_date_time and current_measure_datetime <= end_date_time:
-
-                        # Getting current measure's flux
-                        current_flux = measure["flux"]
+                # Adding current_energy key if it isn't set yet
+                if current_energy not in final_dict.keys():
+                    final_dict[current_energy] = dict()
 
-                        # Adding this measure to the final dictionary
-                        final_dict[current_energy][current_measure_datetime] = current_flux
+                # Adding this measure to the final dictionary if only it is in the time range
+                if is_in_range:
+                    final_dict[current_energy][current_measure_datetime] = measure["flux"]
                     
 
             # Incrementing current_date_time by one day
@@ -117,316 +205,678 @@ class ParticleFluxGraphImages():
         
         ## ------------------------------------------------ ##
 
-        # Resetting working directory to the previous one
-        os.chdir(previous_working_directory)
-        
         return final_dict
 
 
 
-    # Function to convert NEST Neutron Flux data file in CSV into a legible dictionary for the graph video algorithm
-    # Dictionary format : {"start_date_time" : [list of datetimes], "Measure" : [List of measures]}
-    # Multiple stations version : {"start_date_time" : [list of datetimes], "KERG Measure" : [List of measures], "TERA Measure" : [List of measures]}
-    def neutron_csv_to_dict(self, begin_date_time : datetime, end_date_time : datetime) -> dict:
-        
-        # Creating a dictionary that will store the neutron flux data
-        final_dict = dict()
-        
-        # Saving previous working directory
-        previous_working_directory = os.getcwd()
+    # Function to convert NEST Neutron Flux data files in CSV into a flux series for the graph video algorithm (see read_neutron_flux_series)
+    def neutron_csv_to_series(self, begin_date_time : datetime, end_date_time : datetime) -> FluxSeries:
+        return read_neutron_flux_series(self.inputFolder, begin_date_time, end_date_time)
+    
+    
+    # Function that produces images of an animated graph, depending on Proton flux and/or Neutron flux dictionaries
+    def dict_to_graph(self, proton_flux_dict = None, neutron_flux_dict = None, image_width = 640, image_height = 480) -> list:
+
+        # Converting the dictionaries into flux series
+        proton_flux_series = FluxSeries.from_proton_dict(proton_flux_dict) if proton_flux_dict is not None else None
+        neutron_flux_series = FluxSeries.from_neutron_dict(neutron_flux_dict) if neutron_flux_dict is not None else None
+
+        return list(self.iter_graph_images(proton_flux_series, neutron_flux_series, image_width, image_height))
+
+
+
+    # Function that defines how many images can be produced, depending on the datetimes of both graphs
+    def get_number_of_images(self, proton_start_datetimes, neutron_start_datetimes) -> int:
+
+        ## Determining how many images can be produced 
+        # If it has been already set while constructing the whole object, we keep it
+        # Otherwise, we will define the number of images depending on the minimum number of datetimes on the graph
+        number_of_images = self.numberOfImages
         
-        # Setting working directory to input folder
-        os.chdir(self.inputFolder)
+        # Case when the number of images is none,
+        # and has to be defined
+        if number_of_images is None:
 
+            # Case when only the proton graph is selected
+            if len(proton_start_datetimes) != 0 and len(neutron_start_datetimes) == 0:
+                number_of_images = len(proton_start_datetimes)
 
-        ## ----- Checking every data file day per day ----- ##
+            # Case when only the neutron graph is selected
+            elif len(neutron_start_datetimes) != 0 and len(proton_start_datetimes) == 0:
+                number_of_images = len(neutron_start_datetimes)  
 
-        current_date_time = begin_date_time # Initializing current datetime
-        while current_date_time <= end_date_time:
-            
-            # Importing year, month and day from current_date_time
-            year = current_date_time.strftime('%Y')
-            month = current_date_time.strftime('%m')
-            day = current_date_time.strftime('%d')
+            # Case when both are selected, 
+            # we pick the minimum number of datetimes
+            else:
+                number_of_images = min(len(proton_start_datetimes), len(neutron_start_datetimes))
+
+        return number_of_images
+
+
+
+    # Generator that produces the images of an animated graph one at a time, depending on Proton flux and/or Neutron flux
+    def iter_graph_images(self, proton_flux_series = None, neutron_flux_series = None, image_width = 640, image_height = 480):
         
+        ## ----- Setting graph boundaries ----- ##
 
-            # Building the filename
-            filename = f"neutron_flux_{year}_{month}_{day}.csv"
+        # Proton flux
+        proton_bounds = None
+        proton_start_datetimes = []
 
+        if proton_flux_series is not None:
+            proton_bounds = get_flux_bounds(proton_flux_series)
+            proton_start_datetimes = proton_flux_series.times
 
-            ## --- Changing header line --- ##
-            
-            # Opening the file and importing data
-            with open(filename, mode="r") as csv_file:
-            
-                # Importing file content in a list form
-                file_content = csv_file.readlines()
-
-                # Defining header string for the first line
-                header="start_date_time"
-
-                # Case when only one sensor is set on the file
-                if ("RCORR_E" in file_content[0] or "; Neutron flux" in file_content[0]):
-                    header = header + "; Neutron flux"
-                
-                # Other cases when there are many other sensors
-                else:
-                    # Adding KERG and TERA on the header if they exist
-                    if ("KERG" in file_content[0]):
-                        header = header + "; KERG Neutron flux"
-                    if ("TERA" in file_content[0]):
-                        header = header + "; TERA Neutron flux"
-                
-                # Adding line break
-                header = header + "\n"
-                
-                # Setting the first line of the file to the content of header
-                file_content[0] = header
-
-            # Writing new content
-            with open(filename, mode="w") as csv_file:
-                csv_file.writelines(file_content)
-            ## ---------------------------- ##
-
-
-            ## --- Converting CSV file into dictionary --- ##
-
-            # Opening and reading CSV file
-            with open(filename, mode="r") as csv_file:    
-                csv_content = csv.DictReader(csv_file, delimiter=";")
-
-                # For every line of the CSV file 
-                for current_line in csv_content:
-                    
-                    # Converting datetimes into Python datetime format
-                    reconverted_datetime = datetime.strptime(current_line["start_date_time"], '%Y-%m-%d %H:%M:%S')
-                    current_line["start_date_time"] = reconverted_datetime
+        # Neutron flux
+        neutron_bounds = None
+        neutron_start_datetimes = []
 
-                    # We allow the current line to be added only if the start_date_time
-                    # is between begin_date_time and end_date_time
-                    if current_line["start_date_time"] >= begin_date_time and current_line["start_date_time"] <= end_date_time:
+        if neutron_flux_series is not None:
+            neutron_bounds = get_flux_bounds(neutron_flux_series)
+            neutron_start_datetimes = neutron_flux_series.times
 
-                        # For every key in the current line dictionary
-                        for current_key in current_line.keys():
+        ## -------------------------------- ##
 
-                            # Setting final_dict's tabs on its values
-                            # if they are not already set
-                            if not current_key in final_dict.keys():
-                                final_dict[current_key] = []
+        ## ----- Generating graph images ----- ##
 
-                            # Converting neutron flux data in float (if current_key contains "Neutron Flux")
-                            if "Neutron flux" in current_key:
-                                final_dict[current_key].append(float(current_line[current_key]))
-                            else:
-                                final_dict[current_key].append(current_line[current_key])
+        ## Determining how many images can be produced
+        number_of_images = self.get_number_of_images(proton_start_datetimes, neutron_start_datetimes)
 
-            ## ------------------------------------------- ##
+        # For debug
+        print("Number of graph images :", number_of_images, file=sys.stderr)
 
-            # We increment the current_date_time by one day
-            current_date_time += dt.timedelta(days=1)
-        ## ------------------------------------------------ ##
+        # Defining plot limits of every frame, for both graphs
+        # Every line_index corresponds to a frame of the graph animation
+        plot_limits = []
 
-        # Resetting working directory to the previous one
-        os.chdir(previous_working_directory)
+        for line_index in range(1, number_of_images+1):
+            proton_plot_limit = round((len(proton_start_datetimes)*line_index)/number_of_images)
+            neutron_plot_limit = round((len(neutron_start_datetimes)*line_index)/number_of_images)
+            plot_limits.append((proton_plot_limit, neutron_plot_limit))
 
-        return final_dict
-    
-    
-    # Function that produces images of an animated graph, depending on Proton flux and/or Neutron flux
-    def dict_to_graph(self, proton_flux_dict = None, neutron_flux_dict = None, image_width = 640, image_height = 480) -> list:
+        # When there are more frames than measures, consecutive frames have the same plot limits, so they are identical:
+        # only the frames whose plot limits change are rendered, the other ones give the previous frame again (hold frames)
+        is_hold_frames = [self.holdDuplicateFrames and line_index > 0 and plot_limits[line_index] == plot_limits[line_index-1] for line_index in range(number_of_images)]
+        rendered_plot_limits = [one_plot_limits for (one_plot_limits, is_hold_frame) in zip(plot_limits, is_hold_frames) if not is_hold_frame]
+
+        # For debug
+        print("Number of hold frames (particle flux graph) :", number_of_images - len(rendered_plot_limits), file=sys.stderr)
+
+        # Arguments needed to build a renderer, in this process or in a worker process
+        renderer_arguments = (self.graphEngine, self.reuseFigure, proton_flux_series, neutron_flux_series, proton_bounds, neutron_bounds, image_width, image_height)
+
+        # Getting the number of worker processes (0 means one per CPU core)
+        rendering_workers = self.renderingWorkers if self.renderingWorkers > 0 else (os.cpu_count() or 1)
+
+        # Rendering the frames in a pool of processes when it is worth it,
+        # otherwise in this process
+        if rendering_workers > 1 and len(rendered_plot_limits) >= GRAPH_RENDERING_MIN_PARALLEL_FRAMES:
+            graph_frames = iter_graph_frames_in_pool(renderer_arguments, rendered_plot_limits, rendering_workers, self.profileFolder)
+        else:
+            graph_frames = iter_graph_frames(renderer_arguments, rendered_plot_limits)
+
+        # Reporter of the progress on the loading frame
+        progress_reporter = ProgressReporter(self.loadingFrameQueue, number_of_images)
+
+        try:
+            for (line_index, is_hold_frame) in enumerate(is_hold_frames, start=1):
+
+                # Stopping between two frames when the generation has been cancelled
+                if self.cancellationToken is not None:
+                    self.cancellationToken.raise_if_cancelled()
+
+                # Getting the next rendered frame, unless the previous one is given again
+                if not is_hold_frame:
+                    graph_frame = next(graph_frames)
+
+                # We give this frame of the graph to the caller
+                yield graph_frame
+
+                # --- Increasing percentage on loading frame --- #
+                progress_reporter.update(line_index)
+                # ---------------------------------------------- #
+
+        # Stopping the rendering processes now
+        # (when the frames are not all given, the generation has been cancelled or has failed)
+        finally:
+            graph_frames.close()
+
+        ## ----------------------------------- #
 
-        # Building images list
-        images_list = []
         
-        ## ----- Setting graph boundaries ----- ##
+    ## --------------------------------------------------------------------------------------------------------------------- ##
 
-        # Building dictionaries for boundaries
-        proton_bounds = {
-            'min_time': None,
-            'max_time': None,
-            'min_data': sys.float_info.max,
-            'max_data': sys.float_info.min
-        }
-
-        neutron_bounds = {
-            'min_time': None,
-            'max_time': None,
-            'min_data': sys.float_info.max,
-            'max_data': sys.float_info.min
-        }
+## ---------- GRAPH RENDERING ---------- ##
 
-        # Proton flux
-        proton_start_datetimes = []
+# Function that produces one frame of the graph where the proton and neutron lines are drawn
+# until proton_plot_limit and neutron_plot_limit, by building a whole new figure
+def render_graph_frame(proton_flux_series : FluxSeries, neutron_flux_series : FluxSeries, proton_bounds : dict, neutron_bounds : dict, image_width : int, image_height : int, proton_plot_limit : int, neutron_plot_limit : int) -> VideoFrame:
 
-        if proton_flux_dict is not None:
+    # Case for two graphs:
+    if proton_flux_series is not None and neutron_flux_series is not None:
 
-            # The keys from the fisrt value's dictionary is enough to gather every datetimes
-            first_key = list(proton_flux_dict.keys())[0]
-            proton_start_datetimes = list(proton_flux_dict[first_key].keys())
+        # Building subplots
+        # (a Figure is used instead of pyplot, whose state is shared by every thread)
+        fig = Figure(layout='constrained', figsize=(image_width/100, image_height/100))
+        axs = fig.subplots(nrows=2)
 
-            # Setting min and max times
-            proton_bounds['min_time'] = min(proton_start_datetimes)
-            proton_bounds['max_time'] = max(proton_start_datetimes)
-            
-            # Getting the min and max of all flux,
-            # no matter the energy is
-            for one_key in proton_flux_dict.keys():
-                proton_bounds['min_data'] = min(proton_bounds['min_data'], min(proton_flux_dict[one_key].values()))
-                proton_bounds['max_data'] = max(proton_bounds['max_data'], max(proton_flux_dict[one_key].values()))
+        # Proton Flux
+        ax = axs[0] # Importing first subplot
+        generate_proton_subplot(ax, proton_flux_series, proton_bounds, proton_plot_limit)
+
+        # Neutron Flux
+        ax = axs[1] # Importing second subplot
+        generate_neutron_subplot(ax, neutron_flux_series, neutron_bounds, neutron_plot_limit)
+
+        # Adding credits
+        fig.suptitle('© NOAA Space Weather Prediction Center, NMDB', ha = 'left', fontsize=12)
+
+    # Case for one graph:
+    else:
+
+        # Building subplot
+        fig = Figure(figsize=(image_width/100, image_height/100))
+        ax = fig.subplots()
+
+        # Setting credits text
+        credit_text = ""
+
+        # Proton flux
+        if proton_flux_series is not None:
+            generate_proton_subplot(ax, proton_flux_series, proton_bounds, proton_plot_limit)
+            credit_text = "© NOAA Space Weather Prediction Center"
 
         # Neutron flux
-        neutron_start_datetimes = []
+        elif neutron_flux_series is not None:
+            generate_neutron_subplot(ax, neutron_flux_series, neutron_bounds, neutron_plot_limit)
+            credit_text = "© NMDB"
 
-        if neutron_flux_dict is not None:
-            neutron_start_datetimes = neutron_flux_dict["start_date_time"]
+    # --- Saving images --- #
+    # Rendering the figure and reading its pixels directly, without any compression
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
 
-            # Setting min and max times
-            neutron_bounds['min_time'] = min(neutron_start_datetimes)
-            neutron_bounds['max_time'] = max(neutron_start_datetimes)
-        
-            # Getting the min and max of all flux,
-            # no matter the measure station is
-            for one_key in neutron_flux_dict.keys():
+    return VideoFrame.from_canvas(canvas)
+    # --------------------- #
 
-                # We ignore the "start_date_time" key,
-                # because it is not a measure station
-                if one_key != "start_date_time":
 
-                    neutron_bounds['min_data'] = min(neutron_bounds['min_data'], min(neutron_flux_dict[one_key]))
-                    neutron_bounds['max_data'] = max(neutron_bounds['max_data'], max(neutron_flux_dict[one_key]))
 
-        ## -------------------------------- ##
+# Function that gives the function rendering a frame from its (proton_plot_limit, neutron_plot_limit),
+# either with the raster engine (RasterGraphRenderer), or with matplotlib and a reused figure (GraphRenderer)
+# or a new figure for every frame
+def build_graph_frame_renderer(graph_engine : str, reuse_figure : bool, proton_flux_series : FluxSeries, neutron_flux_series : FluxSeries, proton_bounds : dict, neutron_bounds : dict, image_width : int, image_height : int):
 
-        ## ----- Generating graph images ----- ##
+    # Case for the raster engine, which always reuses its figure
+    if graph_engine == RASTER_GRAPH_ENGINE:
+        return RasterGraphRenderer(proton_flux_series, neutron_flux_series, proton_bounds, neutron_bounds, image_width, image_height).render
 
-        ## Determining how many images can be produced 
-        # If it has been already set while constructing the whole object, we keep it
-        # Otherwise, we will define the number of images depending on the minimum number of datetimes on the graph
-        number_of_images = self.numberOfImages
-        
-        # Case when the number of images is none,
-        # and has to be defined
-        if number_of_images is None:
+    # Case for a reused figure: it is built only once
+    if reuse_figure:
+        return GraphRenderer(proton_flux_series, neutron_flux_series, proton_bounds, neutron_bounds, image_width, image_height).render
 
-            # Case when only the proton graph is selected
-            if len(proton_start_datetimes) != 0 and len(neutron_start_datetimes) == 0:
-                number_of_images = len(proton_start_datetimes)
+    # Case for a new figure for every frame
+    return functools.partial(render_graph_frame, proton_flux_series, neutron_flux_series, proton_bounds, neutron_bounds, image_width, image_height)
 
-            # Case when only the neutron graph is selected
-            elif len(neutron_start_datetimes) != 0 and len(proton_start_datetimes) == 0:
-                number_of_images = len(neutron_start_datetimes)  
 
-            # Case when both are selected, 
-            # we pick the minimum number of datetimes
-            else:
-                number_of_images = min(len(proton_start_datetimes), len(neutron_start_datetimes))
+
+# Generator that renders the frames of every plot limits in this process, one after another
+def iter_graph_frames(renderer_arguments : tuple, plot_limits : list):
+
+    # Building the renderer
+    render = build_graph_frame_renderer(*renderer_arguments)
+
+    # Rendering every frame
+    for (proton_plot_limit, neutron_plot_limit) in plot_limits:
+        yield render(proton_plot_limit, neutron_plot_limit)
+
+
+
+# Renderer of a worker process, built only once by init_graph_worker()
+worker_graph_renderer = None
+
+# Function called once when a worker process starts, to build its renderer from the flux data and bounds
+# When profile_folder is given, the worker profiles itself and saves its profiles there (see JobProfiler)
+def init_graph_worker(profile_folder, *renderer_arguments):
+    global worker_graph_renderer
+
+    if profile_folder is not None:
+        start_worker_profiling(profile_folder)
+
+    worker_graph_renderer = build_graph_frame_renderer(*renderer_arguments)
+
+
+
+# Function called in a worker process to render a chunk of consecutive frames
+def render_graph_chunk(plot_limits : list) -> list:
+    return [worker_graph_renderer(proton_plot_limit, neutron_plot_limit) for (proton_plot_limit, neutron_plot_limit) in plot_limits]
+
+
+
+# Generator that renders the frames of every plot limits in a pool of worker processes
+# The plot limits are split into chunks, and the frames are given back in their order
+# When profile_folder is given, every worker saves its profiles there
+# The workers are spawned instead of forked (the default on Linux): the pool is started while other threads are running
+# (the window, the loading threads, the other jobs), and a forked worker could hold a lock that none of its threads would release
+def iter_graph_frames_in_pool(renderer_arguments : tuple, plot_limits : list, rendering_workers : int, profile_folder = None):
+
+    # Splitting the plot limits into chunks of consecutive frames
+    chunks = [plot_limits[index:index+GRAPH_RENDERING_CHUNK_SIZE] for index in range(0, len(plot_limits), GRAPH_RENDERING_CHUNK_SIZE)]
+
+    # Number of frames already given to the caller
+    given_frames = 0
+
+    try:
+        with ProcessPoolExecutor(max_workers=rendering_workers, mp_context=multiprocessing.get_context("spawn"), initializer=init_graph_worker, initargs=(profile_folder, *renderer_arguments)) as executor:
+
+            # Submitting the first chunks, while keeping at most 2 chunks per worker in flight,
+            # so that the rendered frames waiting to be given don't fill the memory
+            next_chunk_index = 0
+            pending_chunks = deque()
+
+            while next_chunk_index < len(chunks) and len(pending_chunks) < rendering_workers*2:
+                pending_chunks.append(executor.submit(render_graph_chunk, chunks[next_chunk_index]))
+                next_chunk_index += 1
+
+            try:
+                # Getting the chunks in their order
+                while pending_chunks:
+                    chunk_frames = pending_chunks.popleft().result()
+
+                    # Replacing the chunk that has been received by the next one
+                    if next_chunk_index < len(chunks):
+                        pending_chunks.append(executor.submit(render_graph_chunk, chunks[next_chunk_index]))
+                        next_chunk_index += 1
+
+                    # Giving every frame of the chunk to the caller
+                    for one_frame in chunk_frames:
+                        yield one_frame
+                        given_frames += 1
+
+            # When the caller stops before the last frame, the chunks that are not being rendered yet are not rendered
+            finally:
+                executor.shutdown(cancel_futures=True)
+
+    # When the pool can't be used (processes can't be created, or a worker died),
+    # the frames that haven't been given yet are rendered in this process
+    except (BrokenProcessPool, OSError, pickle.PicklingError) as error:
 
         # For debug
-        print("Number of graph images :", number_of_images)
+        print("Falling back to serial graph rendering :", error, file=sys.stderr)
 
-        # Every line_index corresponds to a frame of the graph animation
-        for line_index in range(1, number_of_images+1):
+        yield from iter_graph_frames(renderer_arguments, plot_limits[given_frames:])
 
-            # --- Building figure algorithm --- #
-            
-            # Defining plot limits for the current frame, for both graphs
-            proton_plot_limit = round((len(proton_start_datetimes)*line_index)/number_of_images)
-            neutron_plot_limit = round((len(neutron_start_datetimes)*line_index)/number_of_images)
 
-            # Case for two graphs:
-            if proton_flux_dict is not None and neutron_flux_dict is not None:
 
-                # Building subplots
-                fig, axs = plt.subplots(nrows=2, layout='constrained', figsize=(image_width/100, image_height/100))
+## ---------- GRAPH RENDERER ---------- ##
 
-                # Proton Flux
-                ax = axs[0] # Importing first subplot
-                generate_proton_subplot(ax, proton_flux_dict, proton_start_datetimes, proton_bounds, proton_plot_limit)
+class GraphRenderer():
 
-                # Neutron Flux
-                ax = axs[1] # Importing second subplot
-                generate_neutron_subplot(ax, neutron_flux_dict, neutron_start_datetimes, neutron_bounds, neutron_plot_limit)
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## It builds the figure, the axes, their decorations and the lines once, with the same
+    ## subplot functions as dict_to_graph, then keeps a copy of the background without the lines
+    def __init__(self, proton_flux_series : FluxSeries, neutron_flux_series : FluxSeries, proton_bounds : dict, neutron_bounds : dict, image_width : int, image_height : int):
+
+        # List of (axis, line, x values, y values, decimator, is proton line) for every line of the figure
+        self.lines = []
+
+        # Case for two graphs:
+        if proton_flux_series is not None and neutron_flux_series is not None:
+
+            # Building subplots
+            self.figure = Figure(layout='constrained', figsize=(image_width/100, image_height/100))
+            axs = self.figure.subplots(nrows=2)
+
+            # Proton Flux and Neutron Flux
+            generate_proton_subplot(axs[0], proton_flux_series, proton_bounds, len(proton_flux_series))
+            generate_neutron_subplot(axs[1], neutron_flux_series, neutron_bounds, len(neutron_flux_series))
+            self.add_lines(axs[0], proton_flux_series, True)
+            self.add_lines(axs[1], neutron_flux_series, False)
+
+            # Adding credits
+            self.figure.suptitle('© NOAA Space Weather Prediction Center, NMDB', ha = 'left', fontsize=12)
+
+        # Case for one graph:
+        else:
+
+            # Building subplot
+            self.figure = Figure(figsize=(image_width/100, image_height/100))
+            ax = self.figure.subplots()
+
+            # Proton flux
+            if proton_flux_series is not None:
+                generate_proton_subplot(ax, proton_flux_series, proton_bounds, len(proton_flux_series))
+                self.add_lines(ax, proton_flux_series, True)
+
+            # Neutron flux
+            elif neutron_flux_series is not None:
+                generate_neutron_subplot(ax, neutron_flux_series, neutron_bounds, len(neutron_flux_series))
+                self.add_lines(ax, neutron_flux_series, False)
+
+        # Drawing the whole figure once, which also computes the constrained layout,
+        # then freezing the layout so that it stays the same for every frame
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.canvas.draw()
+        self.figure.set_layout_engine('none')
+
+        # Gathering the legends, which are placed depending on the lines of every frame
+        self.legends = [ax.get_legend() for ax in self.figure.axes if ax.get_legend() is not None]
+
+        # Drawing the figure without the lines and legends, and keeping it as the background of every frame
+        for one_artist in [line for (_, line, _, _, _, _) in self.lines] + self.legends:
+            one_artist.set_visible(False)
+
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+
+        # The lines and legends are now only drawn by render()
+        for one_artist in [line for (_, line, _, _, _, _) in self.lines] + self.legends:
+            one_artist.set_visible(True)
+            one_artist.set_animated(True)
+    ## --------------------------------------------------------------------------------------------------------------------- ##
 
-                # Adding credits
-                fig.suptitle('© NOAA Space Weather Prediction Center, NMDB', ha = 'left', fontsize=12)
-                
-                # Closing plot
-                plt.close()
 
-                # --- Saving images --- #
-                current_plot_byte = io.BytesIO()
-                fig.savefig(current_plot_byte, format='png') 
-                current_plot_byte.seek(0) # Setting "reading cursor" at the beginning
 
-                # We store this frame of the graph on the final images list
-                images_list.append(current_plot_byte)
-                # --------------------- #
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
 
-            # Case for one graph:
-            else:
+    # Function to register the lines plotted on an axis, with the values of their flux series
+    def add_lines(self, ax, flux_series : FluxSeries, is_proton : bool):
 
-                # Building subplot
-                fig, ax = plt.subplots(figsize=(image_width/100, image_height/100))
+        # The x values are converted from datetimes into matplotlib's date numbers only once
+        x_values = mdates.date2num(flux_series.times)
 
-                # Setting credits text
-                credit_text = ""
+        # The lines are in the same order as the columns, as they were plotted by the subplot function
+        # (the pixel columns of their measures are found only once as well)
+        for (line, values) in zip(ax.get_lines(), flux_series.columns.values()):
+            self.lines.append((ax, line, x_values, values, LineDecimator.from_axis(ax, x_values, values), is_proton))
 
-                # Proton flux
-                if proton_flux_dict is not None:
-                    generate_proton_subplot(ax, proton_flux_dict, proton_start_datetimes, proton_bounds, proton_plot_limit)
-                    credit_text = "© NOAA Space Weather Prediction Center"
 
-                # Neutron flux
-                elif neutron_flux_dict is not None:
-                    generate_neutron_subplot(ax, neutron_flux_dict, neutron_start_datetimes, neutron_bounds, neutron_plot_limit)
-                    credit_text = "© NMDB"
 
-                # Closing plot
-                plt.close()
+    # Function that produces the frame of the graph where the proton and neutron lines
+    # are drawn until proton_plot_limit and neutron_plot_limit
+    def render(self, proton_plot_limit : int, neutron_plot_limit : int) -> VideoFrame:
 
-                # --- Saving images --- #
-                current_plot_byte = io.BytesIO()
-                fig.savefig(current_plot_byte, format='png')
+        # Restoring the background, without any line
+        self.canvas.restore_region(self.background)
 
-                current_plot_byte.seek(0) # Setting "reading cursor" at the beginning
+        # Updating and drawing every line over the background
+        # (only the lowest and highest measures of every pixel column are drawn)
+        for (ax, line, x_values, y_values, decimator, is_proton) in self.lines:
+            plot_indices = decimator.get_indices(proton_plot_limit if is_proton else neutron_plot_limit)
+            line.set_data(x_values[plot_indices], y_values[plot_indices])
+            ax.draw_artist(line)
 
-                # We store this frame of the graph on the final images list
-                images_list.append(current_plot_byte)
-                # --------------------- #
+        # Drawing the legends over the lines
+        for one_legend in self.legends:
+            self.figure.draw_artist(one_legend)
 
-            # --------------------------------- #
+        # Copying the pixels of the canvas into a new frame
+        return VideoFrame.from_canvas(self.canvas)
+    ## --------------------------------------------------------------------------------------------------------------------- ##
 
-            # --- Increasing percentage on loading frame --- #
-            self.loadingFrameQueue.put((UPDATE_PERCENTAGE, {
-                "current_step": line_index,
-                "total_steps": number_of_images
-            }))
-            # ---------------------------------------------- #
 
-        ## ----------------------------------- #
-        return images_list    
+## ---------- RASTER GRAPH RENDERER ---------- ##
 
-        
+class RasterGraphRenderer():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## It draws the figure, its axes, decorations and legends with matplotlib only once (see GraphRenderer),
+    ## then draws the lines itself into a persistent canvas: every frame only draws the segments measured since
+    ## the previous frame, with OpenCV's anti-aliased lines, and the legends are laid over a copy of the canvas
+    def __init__(self, proton_flux_series : FluxSeries, neutron_flux_series : FluxSeries, proton_bounds : dict, neutron_bounds : dict, image_width : int, image_height : int):
+
+        # Building the figure with matplotlib, whose background is kept without the lines and legends
+        graph_renderer = GraphRenderer(proton_flux_series, neutron_flux_series, proton_bounds, neutron_bounds, image_width, image_height)
+        canvas = graph_renderer.canvas
+
+        canvas.restore_region(graph_renderer.background)
+        self.background = VideoFrame.from_canvas(canvas).pixels.copy()
+        (height, width, _) = self.background.shape
+
+        # Drawing the legends, placed for the whole lines, over the background only once
+        # (they are laid over every frame, their frame letting the lines be seen through it as with matplotlib)
+        self.legends = []
+
+        for one_legend in graph_renderer.legends:
+            canvas.restore_region(graph_renderer.background)
+            graph_renderer.figure.draw_artist(one_legend)
+
+            (rows, columns) = get_pixel_slices(one_legend.get_window_extent().padded(RASTER_LEGEND_PADDING), width, height)
+            legend_pixels = VideoFrame.from_canvas(canvas).pixels[rows, columns].astype(np.float32)
+            background_pixels = self.background[rows, columns].astype(np.float32)
+
+            self.legends.append((rows, columns, legend_pixels, background_pixels, np.any(legend_pixels != background_pixels, axis=2), 1 - one_legend.get_frame().get_alpha()))
+
+        # List of (pixels of the axis, points of the measures, color, thickness, is proton line) for every line of the figure
+        # The points are the pixel coordinates of every measure in the axis, in 1/16 pixel (see cv2.polylines()),
+        # and the lines are drawn in the axis only, as matplotlib clips them
+        self.lines = []
+
+        for (ax, line, x_values, y_values, _, is_proton) in graph_renderer.lines:
+            (rows, columns) = get_pixel_slices(ax.bbox, width, height)
+
+            points = ax.transData.transform(np.column_stack((x_values, y_values)))
+            points[:, 1] = height - points[:, 1]
+            points -= (columns.start, rows.start)
+
+            color = tuple(int(round(one_channel * 255)) for one_channel in mcolors.to_rgb(line.get_color()))
+            # (OpenCV's anti-aliased lines are about one pixel wider than their thickness)
+            thickness = max(1, int(round(line.get_linewidth() * graph_renderer.figure.dpi / 72)) - 1)
+
+            self.lines.append((rows, columns, points * RASTER_LINE_SUBPIXELS, color, thickness, is_proton))
+
+        # Canvas where the lines are drawn, and number of measures of every line already drawn on it
+        self.canvas = self.background.copy()
+        self.drawn_limits = [0] * len(self.lines)
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function that produces the frame of the graph where the proton and neutron lines
+    # are drawn until proton_plot_limit and neutron_plot_limit
+    def render(self, proton_plot_limit : int, neutron_plot_limit : int) -> VideoFrame:
+
+        plot_limits = [proton_plot_limit if is_proton else neutron_plot_limit for (_, _, _, _, _, is_proton) in self.lines]
+
+        # When a line is shorter than on the canvas (the frames are not rendered in their order),
+        # every line is drawn again from the background
+        if any(plot_limit < drawn_limit for (plot_limit, drawn_limit) in zip(plot_limits, self.drawn_limits)):
+            self.canvas[:] = self.background
+            self.drawn_limits = [0] * len(self.lines)
+
+        # Drawing the segments of every line from its last drawn measure
+        for (line_index, (rows, columns, points, color, thickness, _)) in enumerate(self.lines):
+            draw_line_segments(self.canvas[rows, columns], points, max(0, self.drawn_limits[line_index] - 1), plot_limits[line_index], color, thickness)
+            self.drawn_limits[line_index] = max(self.drawn_limits[line_index], plot_limits[line_index])
+
+        # Copying the canvas into a new frame, and laying the legends over it
+        pixels = self.canvas.copy()
+
+        for (rows, columns, legend_pixels, background_pixels, is_legend, transparency) in self.legends:
+            lines_pixels = pixels[rows, columns]
+            lines_pixels[is_legend] = np.clip(legend_pixels[is_legend] + transparency * (lines_pixels[is_legend] - background_pixels[is_legend]), 0, 255)
+
+        return VideoFrame(pixels)
     ## --------------------------------------------------------------------------------------------------------------------- ##
 
+
+
 ## ---------- STATIC FUNCTIONS ---------- ##
 
+# Function to convert NEST Neutron Flux data files in CSV into a flux series for the graph video algorithm
+# Columns : "Neutron flux" when only one station is in the files, or "KERG Neutron flux", "TERA Neutron flux"... for many stations
+# The files are only read (never rewritten), and their measures are parsed in bulk
+def read_neutron_flux_series(input_folder : str, begin_date_time : datetime, end_date_time : datetime) -> FluxSeries:
+
+    # Parts of the times and of every column, day per day
+    times_parts = []
+    columns_parts = dict()
+
+
+    ## ----- Checking every data file day per day ----- ##
+
+    current_date_time = begin_date_time.date() # Initializing current date (the last day is checked even when it ends earlier in the day)
+    while current_date_time <= end_date_time.date():
+
+        # Importing year, month and day from current_date_time
+        year = current_date_time.strftime('%Y')
+        month = current_date_time.strftime('%m')
+        day = current_date_time.strftime('%d')
+
+
+        # Reading the whole file at once
+        with open(os.path.join(input_folder, f"neutron_flux_{year}_{month}_{day}.csv"), mode="r") as csv_file:
+            (times, columns) = parse_neutron_csv(csv_file.read())
+
+        # We keep the lines whose start_date_time is between begin_date_time and end_date_time
+        range_mask = (times >= np.datetime64(begin_date_time, 's')) & (times <= np.datetime64(end_date_time, 's'))
+        times_parts.append(times[range_mask])
+
+        for (one_key, values) in columns.items():
+            columns_parts.setdefault(one_key, []).append(values[range_mask])
+
+        # We increment the current_date_time by one day
+        current_date_time += dt.timedelta(days=1)
+    ## ------------------------------------------------ ##
+
+    # We raise a NoDataFoundError exception when there is no measure in the range
+    if len(times_parts) == 0 or sum(len(one_part) for one_part in times_parts) == 0:
+        raise NoDataFoundError("No corresponding neutron flux data has been found")
+
+    return FluxSeries(np.concatenate(times_parts), {one_key: np.concatenate(parts) for (one_key, parts) in columns_parts.items()})
+
+
+
+# Function giving the label of every measure column of a NMDB CSV file, from its header line
+# "start_date_time   ;RCORR_E" gives [" Neutron flux"], "start_date_time   ;KERG;TERA" gives [" KERG Neutron flux", " TERA Neutron flux"]
+# (the labels of the previous loader are kept, and headers it has already rewritten give the same labels)
+def get_neutron_column_labels(header_line : str) -> list:
+
+    # Station names of the columns, without the time column (and without the empty column of a trailing separator)
+    column_names = [one_name.strip() for one_name in header_line.rstrip(" \t;").split(";")[1:]]
+
+    # Case when only one station is set on the file
+    if len(column_names) == 1 and column_names[0] in NEUTRON_SINGLE_STATION_COLUMNS:
+        return [" Neutron flux"]
+
+    # Other cases when there are many other sensors
+    return [f" {one_name.removesuffix(' Neutron flux')} Neutron flux" for one_name in column_names]
+
+
+
+# Function converting the content of a NMDB CSV file into columns: the datetime64 times of every line,
+# and the float measures of every station, parsed in bulk instead of line per line
+def parse_neutron_csv(file_content : str) -> tuple:
+
+    # Splitting the header line from the measures (empty lines are ignored)
+    (header_line, _, measures_block) = file_content.partition("\n")
+    column_labels = get_neutron_column_labels(header_line)
+    measure_lines = np.array([one_line for one_line in measures_block.splitlines() if one_line.strip() != ""], dtype=str)
+    number_of_cells = len(column_labels) + 1
+
+    # Making every line as long as the header, so that a malformed line doesn't lose the whole file:
+    # the trailing separators are ignored, the missing cells are missing measures, and the lines with extra cells are left out
+    measure_lines = np.char.rstrip(measure_lines, " \t;")
+    lines_cells = np.char.count(measure_lines, ";") + 1
+    (measure_lines, lines_cells) = (measure_lines[lines_cells <= number_of_cells], lines_cells[lines_cells <= number_of_cells])
+
+    if len(measure_lines) == 0:
+        return (np.array([], dtype='datetime64[s]'), {one_label: np.array([], dtype=float) for one_label in column_labels})
+
+    measure_lines = np.char.add(measure_lines, np.char.multiply(";", number_of_cells - lines_cells))
+
+    # Splitting every cell at once, into one row per line
+    cells = np.array(";".join(measure_lines).split(";")).reshape(len(measure_lines), number_of_cells)
+
+    # Converting the time column and the measure columns (the lines whose time can't be read are left out later, as NaT)
+    times = parse_timestamps(np.char.strip(cells[:, 0]), NMDB_DATE_TIME_FORMAT)
+    measures = parse_measures(np.char.strip(cells[:, 1:]))
+
+    return (times, {one_label: measures[:, column_index] for (column_index, one_label) in enumerate(column_labels)})
+
+
+
+# Function converting an array of measure strings into floats, in one call when they are all numbers,
+# the empty cells and the cells that are not numbers (like "null") being missing measures (NaN)
+def parse_measures(cells : np.ndarray) -> np.ndarray:
+
+    cells = np.where(cells == "", "nan", cells)
+
+    try:
+        return cells.astype(float)
+    except ValueError:
+        return np.vectorize(parse_measure, otypes=[float])(cells)
+
+
+
+# Function converting a measure string into a float, or NaN when it isn't a number
+def parse_measure(cell : str) -> float:
+
+    try:
+        return float(cell)
+    except ValueError:
+        return np.nan
+
+
+
+# Function giving the boundaries of a graph: its first and last times, and its minimum and maximum measures
+def get_flux_bounds(flux_series : FluxSeries) -> dict:
+    return {
+        'min_time': flux_series.min_time(),
+        'max_time': flux_series.max_time(),
+        'min_data': flux_series.min_value(),
+        'max_data': flux_series.max_value()
+    }
+
+
+
+# Function giving the rows and columns of the pixels of a frame (width x height) within a bounding box of matplotlib
+# (in display coordinates, whose origin is at the bottom of the figure)
+def get_pixel_slices(bbox, width : int, height : int) -> tuple:
+    rows = slice(max(0, int(np.floor(height - bbox.y1))), min(height, int(np.ceil(height - bbox.y0))))
+    columns = slice(max(0, int(np.floor(bbox.x0))), min(width, int(np.ceil(bbox.x1))))
+
+    return (rows, columns)
+
+
+
+# Function drawing the segments of a line between its measures begin_index and end_index on pixels,
+# from the points of its measures (in 1/RASTER_LINE_SUBPIXELS pixel): the line is cut at the missing measures, as with matplotlib
+def draw_line_segments(pixels : np.ndarray, points : np.ndarray, begin_index : int, end_index : int, color : tuple, thickness : int):
+
+    segments_points = points[begin_index:end_index]
+
+    # Splitting the segments into parts without missing measures
+    measured_indices = np.flatnonzero(np.isfinite(segments_points).all(axis=1))
+    parts = np.split(segments_points[measured_indices], np.flatnonzero(np.diff(measured_indices) > 1) + 1)
+    polylines = [np.round(one_part).astype(np.int32) for one_part in parts if len(one_part) > 1]
+
+    if len(polylines) > 0:
+        cv2.polylines(pixels, polylines, False, color, thickness, cv2.LINE_AA, shift=RASTER_LINE_SHIFT)
+
+
+
 # Function to generate a proton subplot, taking into account come parameters,
-# such as the proton flux data dictionary, the start datetimes, the boundaries, and the plot index limit
-def generate_proton_subplot(ax, proton_flux_dict : dict, start_datetimes : list, boundaries_dict : dict, plot_index_limit : int):
+# such as the proton flux series, the boundaries, and the plot index limit
+def generate_proton_subplot(ax, proton_flux_series : FluxSeries, boundaries_dict : dict, plot_index_limit : int):
     
     
     # Setting plot boundaries
     ax.set_xlim(boundaries_dict["min_time"] - dt.timedelta(minutes=1) , boundaries_dict["max_time"] + dt.timedelta(minutes=1)) # Time on X (We add/subtract one minute as a padding)
     ax.set_ylim(boundaries_dict["min_data"], boundaries_dict["max_data"]) # Proton flux data on Y
 
-    # Generating plot for every energy on proton_flux_dict
-    for one_energy in proton_flux_dict.keys():
+    # Times of the measures as matplotlib's date numbers, to find their pixel columns
+    x_values = mdates.date2num(proton_flux_series.times)
+
+    # Generating plot for every energy on proton_flux_series
+    for (one_energy, values) in proton_flux_series.columns.items():
         
         # Setting plot limit depending on the line_index
         # and the number of images
-        
-        ax.plot(start_datetimes[:plot_index_limit], list(proton_flux_dict[one_energy].values())[:plot_index_limit], label=one_energy)
+        # (only the lowest and highest measures of every pixel column are plotted)
+        plot_indices = LineDecimator.from_axis(ax, x_values, values).get_indices(plot_index_limit)
+        ax.plot(proton_flux_series.times[plot_indices], values[plot_indices], label=one_energy)
         ax.legend() # Enabling legends
 
     # Setting plot title
@@ -449,24 +899,26 @@ def generate_proton_subplot(ax, proton_flux_dict : dict, start_datetimes : list,
 
 
 # Function to generate a neutron subplot, taking into account come parameters,
-# such as the neutron flux data dictionary, the start datetimes, the boundaries, and the plot index limit
-def generate_neutron_subplot(ax, neutron_flux_dict : dict, start_datetimes : list, boundaries_dict : dict, plot_index_limit : int):
+# such as the neutron flux series, the boundaries, and the plot index limit
+def generate_neutron_subplot(ax, neutron_flux_series : FluxSeries, boundaries_dict : dict, plot_index_limit : int):
     
     
     # Setting plot boundaries
     ax.set_xlim(boundaries_dict["min_time"] - dt.timedelta(minutes=1) , boundaries_dict["max_time"] + dt.timedelta(minutes=1)) # Time on X (We add/subtract one minute as a padding)
     ax.set_ylim(boundaries_dict["min_data"], boundaries_dict["max_data"]) # Neutron flux data on Y
 
-    # Generating plot for every station in graph_dictionary
-    for one_key in neutron_flux_dict.keys():
+    # Times of the measures as matplotlib's date numbers, to find their pixel columns
+    x_values = mdates.date2num(neutron_flux_series.times)
 
-        # We skip "start_date_time"
-        if one_key != "start_date_time":
+    # Generating plot for every station in neutron_flux_series
+    for (one_key, values) in neutron_flux_series.columns.items():
         
-            # Setting plot limit depending on the line_index
-            # and the number of images
-            ax.plot(start_datetimes[:plot_index_limit], neutron_flux_dict[one_key][:plot_index_limit], label=one_key)
-            ax.legend() # Enabling legends
+        # Setting plot limit depending on the line_index
+        # and the number of images
+        # (only the lowest and highest measures of every pixel column are plotted)
+        plot_indices = LineDecimator.from_axis(ax, x_values, values).get_indices(plot_index_limit)
+        ax.plot(neutron_flux_series.times[plot_indices], values[plot_indices], label=one_key)
+        ax.legend() # Enabling legends
 
     # Setting plot title
     ax.set_title(f"Neutron flux from {format_datetime(boundaries_dict["min_time"])} to {format_datetime(boundaries_dict["max_time"])}")
@@ -506,12 +958,8 @@ def generate_video(frame_list, video_name):
     counter = 1
     for one_frame in frame_list:
 
-        # Saving plot as a PIL image
-        current_plot_pil = Image.open(one_frame)
-        
-        # Converting PIL image to OpenCV format
-        current_plot_cv = np.array(current_plot_pil)
-        current_plot_cv = cv2.cvtColor(current_plot_cv, cv2.COLOR_RGB2BGR) # Configuring color
+        # Converting the frame to OpenCV format
+        current_plot_cv = one_frame.to_bgr()
 
         # Adding frame on the video
         output_video.write(current_plot_cv)
@@ -0,0 +1,252 @@
+import calendar
+import hashlib
+import json
+import numpy as np
+import os
+import threading
+
+from datetime import datetime
+
+from common.paths import get_app_data_folder
+from common.timestamps import GOES_TIME_TAG_FORMAT, parse_timestamps
+from model.fluxseries import FluxSeries
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Name of the GOES proton flux file of a day
+PROTON_FILENAME_FORMAT = "{:%Y%m%d}_integral-protons-1-day.json"
+
+# Name of the file describing a month chunk (its source files and its columns)
+CHUNK_INDEX_FILENAME = "chunk.json"
+
+# Name of the time column of a month chunk
+TIMES_FILENAME = "time.npy"
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+# Lock preventing two jobs from ingesting the same month chunk at once
+proton_store_lock = threading.Lock()
+
+
+class ProtonFluxStore():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The store keeps the GOES proton flux of the input folder in columns, chunked by month:
+    ## an int64 column of times (seconds since 1970-01-01) and one float32 column per energy, in .npy files
+    ## of the application data folder, that are memory-mapped when they are loaded
+    ## A month chunk is ingested from the daily JSON files again only when one of them has changed
+    def __init__(self, inputFolder : str, storeFolder = None):
+
+        # Defining attributes from parameters
+        self.inputFolder = inputFolder
+
+        # One store per input folder, named after its absolute path
+        # (when it can't be created, the months are ingested again on every request)
+        folder_key = hashlib.sha1(os.path.abspath(inputFolder).encode("utf-8")).hexdigest()
+
+        try:
+            self.storeFolder = storeFolder if storeFolder is not None else get_app_data_folder("proton_flux", folder_key)
+        except OSError:
+            self.storeFolder = None
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function giving the proton flux of the selected energies between begin_date_time and end_date_time (both included)
+    # The energies that are not found in the files are ignored, and a missing measure of an energy is NaN
+    def load(self, begin_date_time : datetime, end_date_time : datetime, energies : list) -> FluxSeries:
+
+        # Bounds of the range, in seconds
+        begin_seconds = np.datetime64(begin_date_time, 's').astype(np.int64)
+        end_seconds = np.datetime64(end_date_time, 's').astype(np.int64)
+
+        # Parts of the times and of every column, month per month
+        times_parts = []
+        columns_parts = {one_energy: [] for one_energy in energies}
+
+        for (year, month) in iter_months(begin_date_time, end_date_time):
+
+            # Getting the columns of the month
+            (times, columns) = self.load_month(year, month)
+
+            # The times are sorted, so the range is found by bisection
+            begin_index = np.searchsorted(times, begin_seconds, side='left')
+            end_index = np.searchsorted(times, end_seconds, side='right')
+
+            if end_index <= begin_index:
+                continue
+
+            # Copying only the requested range of the selected energies
+            times_parts.append(np.asarray(times[begin_index:end_index]))
+
+            for one_energy in energies:
+                if one_energy in columns:
+                    columns_parts[one_energy].append(np.asarray(columns[one_energy][begin_index:end_index]))
+                else:
+                    columns_parts[one_energy].append(np.full(end_index - begin_index, np.nan, dtype=np.float32))
+
+        # Gathering the parts of every month
+        if len(times_parts) == 0:
+            return FluxSeries([], {})
+
+        times = np.concatenate(times_parts).astype('datetime64[s]')
+
+        # Energies without any measure in the range are left out, like in the JSON files
+        columns = {}
+
+        for (one_energy, parts) in columns_parts.items():
+            values = np.concatenate(parts)
+
+            if not np.isnan(values).all():
+                columns[one_energy] = values
+
+        return FluxSeries(times, columns)
+
+
+
+    # Function giving the (times, {energy: flux}) columns of a month, ingesting the month first
+    # when its chunk doesn't exist or when its daily files have changed
+    def load_month(self, year : int, month : int) -> tuple:
+
+        # Getting the daily files of the month, with their modification time
+        sources = {}
+
+        for day in range(1, calendar.monthrange(year, month)[1] + 1):
+            filename = PROTON_FILENAME_FORMAT.format(datetime(year, month, day))
+
+            try:
+                sources[filename] = os.stat(os.path.join(self.inputFolder, filename)).st_mtime_ns
+            except OSError:
+                pass
+
+        # Nothing to load when there is no file for this month
+        if len(sources) == 0:
+            return (np.empty(0, dtype=np.int64), {})
+
+        with proton_store_lock:
+
+            # Case when the store can't be written: the month is ingested in memory only
+            if self.storeFolder is None:
+                return ingest_files([os.path.join(self.inputFolder, filename) for filename in sorted(sources.keys())])
+
+            chunk_folder = os.path.join(self.storeFolder, f"{year:04d}{month:02d}")
+
+            # Loading the chunk when it has been ingested from the same files
+            chunk_index = read_chunk_index(chunk_folder)
+
+            if chunk_index is None or chunk_index["sources"] != sources:
+
+                # Ingesting the month from its daily files
+                (times, columns) = ingest_files([os.path.join(self.inputFolder, filename) for filename in sorted(sources.keys())])
+
+                # Writing the chunk (when it can't be written, the ingested columns are used directly)
+                try:
+                    chunk_index = write_chunk(chunk_folder, sources, times, columns)
+                except OSError:
+                    return (times, columns)
+
+            # Memory-mapping the columns of the chunk, so that only the requested range is read
+            times = np.load(os.path.join(chunk_folder, TIMES_FILENAME), mmap_mode='r')
+            columns = {one_energy: np.load(os.path.join(chunk_folder, column_filename), mmap_mode='r') for (one_energy, column_filename) in chunk_index["columns"].items()}
+
+            return (times, columns)
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Generator giving the (year, month) of every month between begin_date_time and end_date_time
+def iter_months(begin_date_time : datetime, end_date_time : datetime):
+
+    (year, month) = (begin_date_time.year, begin_date_time.month)
+
+    while (year, month) <= (end_date_time.year, end_date_time.month):
+        yield (year, month)
+
+        # Going to the next month
+        (year, month) = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+
+# Function converting GOES proton flux JSON files into columns: the sorted int64 times (seconds since 1970-01-01)
+# of every measure, and a float32 column of flux per energy (NaN when an energy has no measure at a time)
+def ingest_files(file_paths : list) -> tuple:
+
+    # Gathering every measure of every file
+    time_tags = []
+    energies = []
+    fluxes = []
+
+    for one_path in file_paths:
+        with open(one_path, mode="r") as json_file:
+            for measure in json.load(json_file):
+                time_tags.append(measure["time_tag"])
+                energies.append(measure["energy"])
+                fluxes.append(measure["flux"])
+
+    # Converting every time at once (the measures whose time can't be read are ignored)
+    measure_times = parse_timestamps(time_tags, GOES_TIME_TAG_FORMAT)
+    is_valid = ~np.isnat(measure_times)
+
+    # Giving every measure the index of its time
+    (times, time_indexes) = np.unique(measure_times[is_valid].astype(np.int64), return_inverse=True)
+    energies = np.array(energies)[is_valid]
+    fluxes = np.array(fluxes, dtype=np.float32)[is_valid]
+
+    # Building the column of every energy
+    columns = {}
+
+    for one_energy in dict.fromkeys(energies.tolist()):
+        energy_mask = energies == one_energy
+        columns[one_energy] = np.full(len(times), np.nan, dtype=np.float32)
+        columns[one_energy][time_indexes[energy_mask]] = fluxes[energy_mask]
+
+    return (times, columns)
+
+
+
+# Function giving the index of a month chunk, or None if it doesn't exist (or if it is unreadable)
+def read_chunk_index(chunk_folder : str):
+    try:
+        with open(os.path.join(chunk_folder, CHUNK_INDEX_FILENAME), mode="r") as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return None
+
+
+
+# Function to write the columns of a month chunk, then its index, and giving this index
+# Every file is written in a temporary file first, so that a chunk is never half-written
+def write_chunk(chunk_folder : str, sources : dict, times : np.ndarray, columns : dict) -> dict:
+
+    os.makedirs(chunk_folder, exist_ok=True)
+
+    # Writing the columns
+    chunk_index = {"sources": sources, "columns": {}}
+    save_column(os.path.join(chunk_folder, TIMES_FILENAME), times)
+
+    for (column_index, (one_energy, values)) in enumerate(columns.items()):
+        column_filename = f"energy_{column_index}.npy"
+        save_column(os.path.join(chunk_folder, column_filename), values)
+        chunk_index["columns"][one_energy] = column_filename
+
+    # Writing the index
+    index_path = os.path.join(chunk_folder, CHUNK_INDEX_FILENAME)
+
+    with open(index_path + ".tmp", mode="w") as index_file:
+        json.dump(chunk_index, index_file)
+
+    os.replace(index_path + ".tmp", index_path)
+
+    return chunk_index
+
+
+
+# Function to write a column in a .npy file
+def save_column(file_path : str, values : np.ndarray):
+
+    with open(file_path + ".tmp", mode="wb") as column_file:
+        np.save(column_file, values)
+
+    os.replace(file_path + ".tmp", file_path)
@@ -0,0 +1,91 @@
+import threading
+
+from PIL import Image
+
+from common.constants import SHARED_SOURCE_IMAGES_MAX_SIZE
+
+
+class SharedSourceImages():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The source images shared by several jobs of a batch: every job needing an image adds a reference to it while the
+    ## batch is planned, and the first job asking for the image decodes it and keeps it for the other ones
+    ## An image is removed once every job has released it, and no image is kept when they would take more than maxSize bytes
+    ## (the next jobs then decode it again)
+    def __init__(self, maxSize = SHARED_SOURCE_IMAGES_MAX_SIZE):
+
+        # Defining attributes from parameters
+        self.maxSize = maxSize
+
+        # The images are asked by the loading threads of every job at once
+        self.lock = threading.Lock()
+
+        # Number of jobs that will still ask for every image, decoded images and their size, by path
+        self.references = {}
+        self.images = {}
+        self.size = 0
+
+        # Locks of the images being decoded, so that two jobs asking for the same image decode it only once
+        self.decoding_locks = {}
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function to add the references of a job to the images it will ask for
+    def add_references(self, image_paths : list):
+        with self.lock:
+            for one_path in image_paths:
+                self.references[one_path] = self.references.get(one_path, 0) + 1
+
+
+
+    # Function giving a source image, decoded by decode_function(image_path) if no other job has done it yet
+    # The image is shared: it must not be modified
+    def acquire(self, image_path : str, decode_function) -> Image.Image:
+
+        # Getting the image, or the lock of its decoding
+        with self.lock:
+            if image_path in self.images:
+                return self.images[image_path]
+
+            decoding_lock = self.decoding_locks.setdefault(image_path, threading.Lock())
+
+        # Only one job decodes the image, the other ones wait for it
+        with decoding_lock:
+
+            with self.lock:
+                if image_path in self.images:
+                    return self.images[image_path]
+
+            source_image = decode_function(image_path)
+
+            # Keeping the image when other jobs will ask for it, and when there is enough room
+            with self.lock:
+                image_size = len(source_image.getbands()) * source_image.width * source_image.height
+
+                if self.references.get(image_path, 0) > 1 and self.size + image_size <= self.maxSize:
+                    self.images[image_path] = source_image
+                    self.size += image_size
+
+                self.decoding_locks.pop(image_path, None)
+
+            return source_image
+
+
+
+    # Function called by a job once it doesn't need an image anymore
+    def release(self, image_path : str):
+        with self.lock:
+
+            self.references[image_path] = self.references.get(image_path, 0) - 1
+
+            # Removing the image when no other job will ask for it
+            if self.references[image_path] <= 0:
+                del self.references[image_path]
+                source_image = self.images.pop(image_path, None)
+
+                if source_image is not None:
+                    self.size -= len(source_image.getbands()) * source_image.width * source_image.height
+    ## --------------------------------------------------------------------------------------------------------------------- ##
@@ -1,14 +1,25 @@
 import cv2
-import io
+import filecmp
+import itertools
 import numpy as np
 import operator
 import os
+import sys
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image
 
-from common.constants import UPDATE_PERCENTAGE
+from common.constants import HOLD_DUPLICATE_FRAMES, IMAGE_CATALOG_ENABLED, SOLAR_FRAME_CACHE_FLUSH_INTERVAL, SOLAR_IMAGES_LOADING_WORKERS
+from common.progress import ProgressReporter
 from common.exceptions import NoDataFoundError
+from common.fonts import get_font_name
+from common.profiling import get_thread_pool_arguments
+from common.timestamps import IMAGE_FILENAME_FORMAT, parse_timestamps
+from model.imagecatalog import ImageCatalog
+from model.overlaylayer import OverlayLayer, draw_text_image
+from model.videoframe import VideoFrame
 
 ## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
 
@@ -24,13 +35,32 @@ ADMITTED_IMAGE_TYPES = [
     'hmimag'
 ]
 
+# Credits written on the source images, at (20, 20) in the pixels of the source image
+CREDIT_TEXT = "© Solar and Heliospheric Observatory"
+CREDIT_FONT_SIZE = 32
+CREDIT_POSITION = (20, 20)
+
+# Version of the rendering of the credits, to be increased whenever the credit layer changes:
+# with the font of the credits, it is part of the name of the frames files of the cache, so that the frames cached
+# with another rendering of the credits aren't used
+CREDIT_LAYER_VERSION = 2
+
 ## ------------------------------------------------------------------------------------------------------------------- ##
 
 class SolarActivityImages():
 
     ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
     ## It that will directly pick the images
-    def __init__(self, beginDateTime : datetime, endDateTime : datetime, imageWidth : float, imageHeight : float, inputFolder : str, loadingFrameQueue = None):
+    ## When lazyLoading is set, the images are not loaded by the constructor:
+    ## they are produced one by one by iter_images(), when the video needs them
+    ## loadingWorkers is the number of threads loading the images (1 loads them in this thread, 0 uses every CPU core)
+    ## When frameCache (a SolarFrameCache) is given, the resized images are read from it, or added to it
+    ## When useCatalog is set, the images are selected from the ImageCatalog of the input folder
+    ## When sourceImages (a SharedSourceImages) is given, the decoded images are shared with the other jobs of a batch
+    ## When cancellationToken (a CancellationToken) is given, the loading stops between two images once it is cancelled
+    ## When holdDuplicateFrames is set, an image whose file is identical to the previous one isn't loaded: the previous frame is given again
+    ## When profiler (the JobProfiler of the job) is given, the loading threads are profiled with the job
+    def __init__(self, beginDateTime : datetime, endDateTime : datetime, imageWidth : float, imageHeight : float, inputFolder : str, loadingFrameQueue = None, lazyLoading = False, loadingWorkers = SOLAR_IMAGES_LOADING_WORKERS, frameCache = None, useCatalog = IMAGE_CATALOG_ENABLED, sourceImages = None, cancellationToken = None, holdDuplicateFrames = HOLD_DUPLICATE_FRAMES, profiler = None):
         
         # Defining attributes from parameters
         self.beginDateTime = beginDateTime
@@ -39,19 +69,56 @@ class SolarActivityImages():
         self.imageHeight = imageHeight
         self.inputFolder = inputFolder
         self.loadingFrameQueue = loadingFrameQueue
+        self.lazyLoading = lazyLoading
+        self.loadingWorkers = loadingWorkers
+        self.frameCache = frameCache
+        self.useCatalog = useCatalog
+        self.sourceImages = sourceImages
+        self.cancellationToken = cancellationToken
+        self.holdDuplicateFrames = holdDuplicateFrames
+        self.profiler = profiler
 
 
         # Defining the list of images
         self.images = []
 
-        # Saving previous working directory
-        previous_working_directory = os.getcwd()
-        
-        # Setting working directory to input folder
-        os.chdir(self.inputFolder)
+        # Paths of the source images released while loading the images (see iter_images())
+        self.released_image_paths = set()
+
+        # Layers of the credits, by size of source images (see get_credit_layer())
+        self.credit_layers = dict()
+
+        # Name of the credits drawn on the frames, under which they are cached
+        self.credits_name = get_credits_name()
+
+        # Selecting the images of the time range, with the major resolution and type,
+        # from the catalog of the input folder, or by browsing the whole folder
+        if self.useCatalog:
+            self.images_filenames, self.channel = self.select_images_from_catalog()
+        else:
+            self.images_filenames, self.channel = self.select_images_from_folder()
+
+        # Loading every image now, unless they are asked one by one later
+        if not self.lazyLoading:
+            self.images = list(self.iter_images())
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function giving the number of images that will be produced
+    def __len__(self):
+        return len(self.images_filenames)
+
+
+
+    # Function that selects the images of the time range, with the major resolution and type, by browsing every file of the input folder
+    # It gives the sorted list of the selected file names, and their type
+    def select_images_from_folder(self):
 
         # Defining the list to store the images file names
-        self.images_filenames = []
+        images_filenames = []
 
         # Defining dictionaries to count the number of images of each resolution and types
 
@@ -71,54 +138,54 @@ class SolarActivityImages():
         # This filter allows to pick only the images that are in the time bounds,
         # with admitted image types and resolutions. It relies on the file name.
 
-        # We browse all the files in the directory
-        for image_filename in os.listdir('.'):
+        # We browse all the images in the directory (JPG, JPEG or PNG)
+        directory_images = [image_filename for image_filename in os.listdir(self.inputFolder) if image_filename.endswith(".jpg") or image_filename.endswith(".jpeg") or image_filename.endswith("png")]
+
+        # Checking which timestamps on the filenames are between beginDateTime and endDateTime, all at once
+        # According to the file name pattern, the date is specified in the 13 first characters
+        filename_timestamps = parse_timestamps(directory_images, IMAGE_FILENAME_FORMAT)
+        range_mask = (filename_timestamps >= np.datetime64(self.beginDateTime, 's')) & (filename_timestamps <= np.datetime64(self.endDateTime, 's'))
+
+        # For every image in the time range
+        for image_filename in itertools.compress(directory_images, range_mask):
             
-            # Checking if the file is an image (JPG, JPEG or PNG)
-            if image_filename.endswith(".jpg") or image_filename.endswith(".jpeg") or image_filename.endswith("png"):
-                
-                # Checking if the timestamp on the filename is between beginDateTime and endDateTime
-                # According to the file name pattern, the date is specified in the 13 first characters
-                filename_timestamp = datetime.strptime(image_filename[:13], '%Y%m%d_%H%M')
-                if filename_timestamp >= self.beginDateTime and filename_timestamp <= self.endDateTime:
-                    
-                    # Incrementing value of a key on both resolution_numbers and types_numbers dictionaries,
-                    # if this key has been found on the file name
-
-                    # For resolutions
-                    for one_key in resolution_numbers.keys():
-                        try:
-                            image_filename.index(one_key, 14) # Raises a ValueError whenever the one_key substring hasn't been found
-                            resolution_numbers[one_key] += 1
-
-                        # When the one_key is not found
-                        except ValueError:
-                            continue
-
-                    # For types
-                    for one_key in types_numbers.keys():
-                        try:
-                            image_filename.index(one_key, 14) # Raises a ValueError whenever the one_key substring hasn't been found
-                            types_numbers[one_key] += 1
-
-                        # When the one_key is not found, we ignore and continue
-                        except ValueError:
-                            continue
-                    
-                    # Adding the file name to the filenames list
-                    self.images_filenames.append(image_filename)
+            # Incrementing value of a key on both resolution_numbers and types_numbers dictionaries,
+            # if this key has been found on the file name
+
+            # For resolutions
+            for one_key in resolution_numbers.keys():
+                try:
+                    image_filename.index(one_key, 14) # Raises a ValueError whenever the one_key substring hasn't been found
+                    resolution_numbers[one_key] += 1
+
+                # When the one_key is not found
+                except ValueError:
+                    continue
+
+            # For types
+            for one_key in types_numbers.keys():
+                try:
+                    image_filename.index(one_key, 14) # Raises a ValueError whenever the one_key substring hasn't been found
+                    types_numbers[one_key] += 1
+
+                # When the one_key is not found, we ignore and continue
+                except ValueError:
+                    continue
+            
+            # Adding the file name to the filenames list
+            images_filenames.append(image_filename)
 
         # Case when no images has been found,
         # We raise a NoDataFoundError exception
-        if len(self.images_filenames) == 0:
+        if len(images_filenames) == 0:
             raise NoDataFoundError("No corresponding solar activity images has been found")
                     
         # Getting major resolution and type to select the images with the major resolution and type
         major_resolution = max(resolution_numbers.items(), key=operator.itemgetter(1))[0]
         major_type = max(types_numbers.items(), key=operator.itemgetter(1))[0]
-        
+
         # We remove every filenames without major resolution or type
-        for one_filename in self.images_filenames[:]:
+        for one_filename in images_filenames[:]:
             
             try:
                 # Seeking for major resolution and major type on each filename
@@ -128,52 +195,262 @@ class SolarActivityImages():
             # When one of those is not found,
             # We remove the filename from the images
             except ValueError:
-                self.images_filenames.remove(one_filename)
+                images_filenames.remove(one_filename)
         
         # Sorting the filenames
-        self.images_filenames.sort()
+        images_filenames.sort()
         
+        return images_filenames, major_type
+
+
+
+    # Function that selects the images of the time range, with the major resolution and type, from the catalog of the input folder
+    # It gives the sorted list of the selected file names, and their type
+    def select_images_from_catalog(self):
+
+        # Getting the (filename, channel, resolution) of the images of the time range
+        with ImageCatalog(self.inputFolder, ADMITTED_IMAGE_TYPES, ADMITTED_RESOLUTIONS) as catalog:
+            catalog_images = catalog.select(self.beginDateTime, self.endDateTime)
+
+        # Case when no images has been found,
+        # We raise a NoDataFoundError exception
+        if len(catalog_images) == 0:
+            raise NoDataFoundError("No corresponding solar activity images has been found")
+
+        # Counting the number of images of each resolution and types
+        resolution_numbers = dict.fromkeys(ADMITTED_RESOLUTIONS, 0)
+        types_numbers = dict.fromkeys(ADMITTED_IMAGE_TYPES, 0)
+
+        for (_, channel, resolution) in catalog_images:
+            if resolution is not None:
+                resolution_numbers[resolution] += 1
+            if channel is not None:
+                types_numbers[channel] += 1
+
+        # Getting major resolution and type to select the images with the major resolution and type
+        major_resolution = max(resolution_numbers.items(), key=operator.itemgetter(1))[0]
+        major_type = max(types_numbers.items(), key=operator.itemgetter(1))[0]
+
+        # Keeping only the filenames with major resolution and type (they are already sorted)
+        images_filenames = [filename for (filename, channel, resolution) in catalog_images if channel == major_type and resolution == major_resolution]
+
+        return images_filenames, major_type
+
+
+
+    # Generator producing every selected image as a VideoFrame, one at a time,
+    # so that only the images being processed are kept in memory
+    def iter_images(self):
+
         # Setting steps for LoadingFrame percentage
         current_step = 0
         total_steps = len(self.images_filenames)
-        
+        progress_reporter = ProgressReporter(self.loadingFrameQueue, total_steps)
 
-        # Adding every image in Byte format
-        for one_image in self.images_filenames:
+        # Getting the number of loading threads (0 means one per CPU core)
+        loading_workers = self.loadingWorkers if self.loadingWorkers > 0 else (os.cpu_count() or 1)
 
-            # Opening the image
-            current_image = Image.open(one_image, mode='r')
+        # Paths of the source images released by load_image()
+        self.released_image_paths = set()
 
-            # Adding credits to the images
-            draw = ImageDraw.Draw(current_image)
-            arial_font = ImageFont.truetype('arial.ttf', 32)
-            draw.text((20, 20), "© Solar and Heliospheric Observatory", font=arial_font)
+        # Finding the images identical to the previous one, which are not loaded:
+        # the frame of the previous image is given again (a hold frame)
+        is_duplicate_images = self.find_duplicate_images() if self.holdDuplicateFrames else [False] * total_steps
+        loaded_filenames = [one_filename for (one_filename, is_duplicate) in zip(self.images_filenames, is_duplicate_images) if not is_duplicate]
 
-            # Changing image size
-            current_image_resized = current_image.resize((imageWidth, imageHeight))
-            
-            
-            # Creating a pure binary variable to store the image
-            current_image_byte = io.BytesIO()
-
-            # Saving the image in a pure binary format
-            current_image_resized.save(current_image_byte, format='png')
-
-            # Adding the image to the list
-            self.images.append(current_image_byte)
-
-            # --- Increasing percentage on loading frame --- #
-            current_step += 1
-            self.loadingFrameQueue.put((UPDATE_PERCENTAGE, {
-                "current_step": current_step,
-                "total_steps": total_steps
-            }))
-            # ---------------------------------------------- #
-        
-        # Resetting working directory to the previous one
-        os.chdir(previous_working_directory)
+        # For debug
+        print("Number of hold frames (solar activity) :", total_steps - len(loaded_filenames), file=sys.stderr)
+
+        # Telling the other jobs of the batch that the duplicate images aren't needed by this one
+        if self.sourceImages is not None:
+            for (one_filename, is_duplicate) in zip(self.images_filenames, is_duplicate_images):
+                if is_duplicate:
+                    image_path = os.path.join(self.inputFolder, one_filename)
+                    self.sourceImages.release(image_path)
+                    self.released_image_paths.add(image_path)
+
+        # Loading the images in a pool of threads, or in this thread
+        if loading_workers > 1:
+            frames = self.iter_images_in_pool(loaded_filenames, loading_workers)
+        else:
+            frames = map(self.load_image, loaded_filenames)
+
+        try:
+            # Producing every image
+            for is_duplicate in is_duplicate_images:
+
+                # Stopping between two images when the generation has been cancelled
+                if self.cancellationToken is not None:
+                    self.cancellationToken.raise_if_cancelled()
+
+                # Loading the image, unless it is the same as the previous one
+                if not is_duplicate:
+                    one_frame = next(frames)
+
+                # Giving the image to the caller
+                yield one_frame
+
+                # Saving the cache regularly, so that the loaded images are kept even if the generation stops
+                if self.frameCache is not None and (current_step+1) % SOLAR_FRAME_CACHE_FLUSH_INTERVAL == 0:
+                    self.frameCache.flush()
+
+                # --- Increasing percentage on loading frame --- #
+                current_step += 1
+                progress_reporter.update(current_step)
+                # ---------------------------------------------- #
+
+        finally:
+
+            # Stopping the loading threads now (when the images are not all produced, the generation has been cancelled or has failed)
+            if loading_workers > 1:
+                frames.close()
+
+            # Releasing the source images that won't be loaded, so that the other jobs of the batch don't keep them for this one
+            if current_step < total_steps and self.sourceImages is not None:
+                for one_filename in self.images_filenames:
+                    image_path = os.path.join(self.inputFolder, one_filename)
+
+                    if image_path not in self.released_image_paths:
+                        self.sourceImages.release(image_path)
+
+            # Saving the cache
+            if self.frameCache is not None:
+                self.frameCache.flush()
+
+
+
+    # Generator loading the images of images_filenames in a pool of threads, and giving them back in the order of their filenames
+    # Pillow releases the GIL while decoding and resizing, so the images are really loaded in parallel
+    def iter_images_in_pool(self, images_filenames : list, loading_workers : int):
+
+        with ThreadPoolExecutor(max_workers=loading_workers, **get_thread_pool_arguments(self.profiler)) as executor:
+
+            # Images being loaded, in the order of their filenames
+            # At most 2 images per thread are in flight, so that the loaded images waiting to be given don't fill the memory
+            pending_images = deque()
+            filenames = iter(images_filenames)
+
+            for one_image in itertools.islice(filenames, loading_workers*2):
+                pending_images.append(executor.submit(self.load_image, one_image))
+
+            try:
+                # Getting the images in their order
+                while pending_images:
+                    one_frame = pending_images.popleft().result()
+
+                    # Replacing the image that has been received by the next one
+                    for one_image in itertools.islice(filenames, 1):
+                        pending_images.append(executor.submit(self.load_image, one_image))
+
+                    yield one_frame
+
+            # When the caller stops before the last image, the images that are not being loaded yet are not loaded
+            finally:
+                executor.shutdown(cancel_futures=True)
+
+
+
+    # Function telling, for every selected image, if its file is identical to the file of the previous image
+    # (the sizes of the files are compared first, so only the files having the same size as the previous one are read)
+    def find_duplicate_images(self) -> list:
+
+        is_duplicate_images = []
+        previous_path, previous_size = None, None
+
+        for one_filename in self.images_filenames:
+            image_path = os.path.join(self.inputFolder, one_filename)
+            image_size = os.path.getsize(image_path)
+
+            is_duplicate_images.append(previous_path is not None and image_size == previous_size and filecmp.cmp(previous_path, image_path, shallow=False))
+            previous_path, previous_size = image_path, image_size
+
+        return is_duplicate_images
+
+
+
+    # Function giving the layer of the credits of the source images of a size, resized like them,
+    # which is only rendered once
+    def get_credit_layer(self, source_size : tuple) -> OverlayLayer:
+
+        credit_layer = self.credit_layers.get(source_size)
+
+        if credit_layer is None:
+            credit_layer = OverlayLayer.from_image(draw_text_image(*source_size, *CREDIT_POSITION, CREDIT_TEXT, CREDIT_FONT_SIZE), self.imageWidth, self.imageHeight)
+            self.credit_layers[source_size] = credit_layer
+
+        return credit_layer
+
+
+
+    # Function that opens an image, resizes it and adds the credits on it,
+    # or reads it from the frame cache when it has already been done
+    def load_image(self, image_filename : str) -> VideoFrame:
+
+        # Path of the image
+        image_path = os.path.join(self.inputFolder, image_filename)
+
+        try:
+            return self.load_image_from_path(image_path)
+
+        # Telling the other jobs of the batch that this image isn't needed by this one anymore
+        finally:
+            if self.sourceImages is not None:
+                self.sourceImages.release(image_path)
+                self.released_image_paths.add(image_path)
+
+
+
+    # Function that loads the image of a path, as described by load_image()
+    def load_image_from_path(self, image_path : str) -> VideoFrame:
+
+        # Reading the image from the cache
+        if self.frameCache is not None:
+            cached_frame = self.frameCache.get(image_path, self.channel, self.imageWidth, self.imageHeight, self.credits_name)
+
+            if cached_frame is not None:
+                return cached_frame
+
+        # Opening the image, or getting it from the other jobs of the batch
+        if self.sourceImages is not None:
+            current_image = self.sourceImages.acquire(image_path, decode_source_image)
+        else:
+            current_image = decode_source_image(image_path)
+
+        # Changing image size
+        current_image_resized = current_image.resize((self.imageWidth, self.imageHeight))
+
+        # Converting the image into a raw frame
+        current_frame = VideoFrame.from_pil(current_image_resized)
+
+        # Adding credits to the frame (their layer is rendered once for every size of source images)
+        self.get_credit_layer(current_image.size).draw_on(current_frame)
+
+        # Adding the frame to the cache
+        if self.frameCache is not None:
+            self.frameCache.put(image_path, self.channel, self.imageWidth, self.imageHeight, self.credits_name, current_frame)
+
+        return current_frame
     ## --------------------------------------------------------------------------------------------------------------------- ##
 
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Function giving the name of the credits drawn on the frames, which changes with the version of the credit layer and with its font
+def get_credits_name() -> str:
+    return f"credits-v{CREDIT_LAYER_VERSION}-{get_font_name(CREDIT_FONT_SIZE)}"
+
+
+
+# Function that opens an image (the credits are added on the resized frames, see SolarActivityImages.get_credit_layer())
+def decode_source_image(image_path : str) -> Image.Image:
+
+    # Opening the image
+    current_image = Image.open(image_path, mode='r')
+    current_image.load()
+
+    return current_image
+
+
+
 ## ---------- TEST ZONE ---------- ##
 
 # ----- Video generation algorithm ----- #
@@ -188,12 +465,8 @@ def generate_video(frame_list, video_name):
     counter = 1
     for one_frame in frame_list:
 
-        # Saving plot as a PIL image
-        current_plot_pil = Image.open(one_frame)
-        
-        # Converting PIL image to OpenCV format
-        current_plot_cv = np.array(current_plot_pil)
-        current_plot_cv = cv2.cvtColor(current_plot_cv, cv2.COLOR_RGB2BGR) # Configuring color
+        # Converting the frame to OpenCV format
+        current_plot_cv = one_frame.to_bgr()
 
         # Adding frame on the video
         output_video.write(current_plot_cv)
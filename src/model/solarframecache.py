@@ -0,0 +1,352 @@
+import itertools
+import json
+import numpy as np
+import os
+import threading
+import time
+
+from common.constants import SOLAR_FRAME_CACHE_MAX_SIZE
+from common.filelock import try_lock_file, unlock_file
+from common.paths import get_app_data_folder
+from model.videoframe import VideoFrame
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Name of the file describing every frames file of a partition of the cache,
+# and of the file locked by the process using the partition
+INDEX_FILENAME = "index.json"
+LOCK_FILENAME = "partition.lock"
+
+# Number of frames a frames file can store when it is created (doubled whenever it is full)
+INITIAL_CAPACITY = 64
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+class SolarFrameCache():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The cache stores the resized solar activity frames in one frames file per (channel, size, credits),
+    ## the credits being the name of the credits drawn on the frames (which changes with their rendering), or None
+    ## where every frame is a fixed-shape uint8 array, so that the file can be memory-mapped
+    ## The index gives, for every frames file, the slot of every source image (path and modification time)
+    ## and the last access of every slot
+    ## Every process uses its own partition of the cache folder (a numbered subfolder), locked as long as the cache is opened,
+    ## so that the index and the slots of a partition are only changed by one process, which takes the first free partition
+    ## The frames files of a partition never get bigger than maxSize: when it is reached, the least recently used slots are reused,
+    ## except the slots given since the cache has been opened, whose frames may still be used by a job (see allocate_slot())
+    def __init__(self, cacheFolder = None, maxSize = SOLAR_FRAME_CACHE_MAX_SIZE):
+
+        # Defining attributes from parameters
+        self.cacheFolder = cacheFolder if cacheFolder is not None else get_app_data_folder("solar_frames")
+        self.maxSize = maxSize
+
+        # The cache can be used by several loading threads at once
+        self.lock = threading.Lock()
+
+        # Memory-mapped frames files that are already opened, by name
+        self.memory_maps = {}
+
+        # Slots of every frames file whose frame has been given since the cache has been opened, by name
+        self.given_slots = {}
+
+        # The frames files that have not been used since the cache has been opened can make room for the new ones
+        self.opening_time = time.time()
+
+        # Locking the first partition that no other process uses
+        for partition_number in itertools.count():
+            self.partitionFolder = os.path.join(self.cacheFolder, str(partition_number))
+            os.makedirs(self.partitionFolder, exist_ok=True)
+
+            self.partition_lock = try_lock_file(os.path.join(self.partitionFolder, LOCK_FILENAME))
+
+            if self.partition_lock is not None:
+                break
+
+        # Loading the index, or starting a new one when there is none (or when it is unreadable)
+        self.index = read_index(self.partitionFolder)
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function giving the cached frame of a source image, or None if it isn't cached
+    # The frame is read directly from the memory-mapped file, without any copy, so its pixels are read-only
+    def get(self, source_path : str, channel : str, width : int, height : int, credits):
+
+        with self.lock:
+
+            # Getting the frames file of this channel and size
+            store_name = get_store_name(channel, width, height, credits)
+            store = self.index.get(store_name)
+
+            if store is None:
+                return None
+
+            # Getting the slot of the source image
+            slot = store["slots"].get(get_source_key(source_path))
+
+            if slot is None:
+                return None
+
+            # Opening the frames file (its index entry is removed when the file can't be opened anymore)
+            try:
+                memory_map = self.get_memory_map(store_name)
+            except (OSError, ValueError):
+                del self.index[store_name]
+                return None
+
+            # Marking the slot and the frames file as recently used, and the slot as given
+            store["last_access"] = store["accesses"][slot] = time.time()
+            self.given_slots.setdefault(store_name, set()).add(slot)
+
+            frame_pixels = memory_map[slot]
+            frame_pixels.setflags(write=False)
+
+            return VideoFrame(frame_pixels)
+
+
+
+    # Function to add the frame of a source image to the cache
+    def put(self, source_path : str, channel : str, width : int, height : int, credits, frame : VideoFrame):
+
+        # Only frames of the expected size can be stored in the frames file
+        if frame.width != width or frame.height != height:
+            return
+
+        with self.lock:
+
+            # Getting the frames file of this channel and size, or creating it
+            store_name = get_store_name(channel, width, height, credits)
+
+            if store_name not in self.index:
+                self.index[store_name] = {"width": width, "height": height, "capacity": 0, "slots": {}, "accesses": [], "last_access": 0}
+
+            store = self.index[store_name]
+
+            # Getting the slot of the source image, or a new one
+            # (the frame isn't stored when a single frame is bigger than the cache)
+            source_key = get_source_key(source_path)
+            slot = store["slots"].get(source_key)
+
+            if slot is None:
+                slot = self.allocate_slot(store_name)
+
+                if slot is None:
+                    return
+
+            # Writing the frame in its slot (the slot is marked as given, since the job may give the frame again from the cache)
+            self.get_memory_map(store_name)[slot] = frame.to_rgb()
+            store["slots"][source_key] = slot
+            store["last_access"] = store["accesses"][slot] = time.time()
+            self.given_slots.setdefault(store_name, set()).add(slot)
+
+
+
+    # Function to save the index and the frames files, and to remove the least recently used frames files
+    # when the cache is too big (when its maximum size has been lowered since they have been written)
+    def flush(self):
+
+        with self.lock:
+
+            # Writing the frames on the disk
+            for memory_map in self.memory_maps.values():
+                memory_map.flush()
+
+            # Removing the least recently used frames files, until the cache is small enough
+            stores_by_last_access = sorted(self.index.keys(), key=lambda one_store: self.index[one_store]["last_access"])
+
+            while self.get_size() > self.maxSize:
+                self.remove_store(stores_by_last_access.pop(0))
+
+            # Writing the index (in a temporary file first, so that it is never half-written)
+            self.save_index()
+
+
+
+    # Function to remove every frame of the cache, in its partition and in the partitions that no other process uses
+    def clear(self):
+
+        with self.lock:
+
+            # Removing every frames file
+            for store_name in list(self.index.keys()):
+                self.remove_store(store_name)
+
+            # Writing the empty index
+            self.save_index()
+
+            # Clearing the other partitions, while they are locked
+            for partition_name in os.listdir(self.cacheFolder):
+                partition_folder = os.path.join(self.cacheFolder, partition_name)
+
+                if partition_folder == self.partitionFolder or not os.path.isdir(partition_folder):
+                    continue
+
+                partition_lock = try_lock_file(os.path.join(partition_folder, LOCK_FILENAME))
+
+                if partition_lock is not None:
+                    for store_name in list(read_index(partition_folder).keys()) + [INDEX_FILENAME]:
+                        remove_file(os.path.join(partition_folder, store_name))
+
+                    unlock_file(partition_lock)
+
+
+
+    # Function giving the size of every frames file of the cache, in bytes
+    def get_size(self) -> int:
+        return sum(store["capacity"] * store["width"] * store["height"] * 3 for store in self.index.values())
+
+
+
+    # Function giving the memory map of a frames file, opening it if it isn't opened yet
+    def get_memory_map(self, store_name : str) -> np.memmap:
+
+        if store_name not in self.memory_maps:
+            store = self.index[store_name]
+            self.memory_maps[store_name] = np.memmap(os.path.join(self.partitionFolder, store_name), dtype=np.uint8, mode="r+", shape=(store["capacity"], store["height"], store["width"], 3))
+
+        return self.memory_maps[store_name]
+
+
+
+    # Function giving a slot of a frames file for a new source image, or None when there is no room for it:
+    # the frames file grows as long as the cache stays within its maximum size, removing the other frames files
+    # that have not been used since the oldest slot of this one (since the cache has been opened, when it has no slot),
+    # then its least recently used slot is reused
+    # The slots given since the cache has been opened are never reused, since their frames may still be composited or encoded
+    # by a job (a hold frame gives the same frame again without reading the cache), and would be overwritten
+    def allocate_slot(self, store_name : str):
+
+        store = self.index[store_name]
+        frame_size = store["width"] * store["height"] * 3
+
+        # Giving the next free slot
+        if len(store["slots"]) < store["capacity"]:
+            return len(store["slots"])
+
+        # Removing the frames files that are older than every slot of this one, while growing it doesn't fit in the cache
+        oldest_access = min(store["accesses"], default=self.opening_time)
+        other_stores = sorted((one_store for one_store in self.index.keys() if one_store != store_name), key=lambda one_store: self.index[one_store]["last_access"])
+
+        while self.get_size() + frame_size > self.maxSize and len(other_stores) > 0 and self.index[other_stores[0]]["last_access"] < oldest_access:
+            self.remove_store(other_stores.pop(0))
+
+        # Growing the frames file, within the maximum size of the cache
+        new_capacity = min(max(INITIAL_CAPACITY, store["capacity"]*2), store["capacity"] + (self.maxSize - self.get_size()) // frame_size)
+
+        if new_capacity > store["capacity"]:
+            self.grow_store(store_name, new_capacity)
+            return len(store["slots"])
+
+        # Reusing the least recently used slot that hasn't been given, whose source image isn't cached anymore
+        given_slots = self.given_slots.get(store_name, set())
+        free_slots = [one_slot for one_slot in range(store["capacity"]) if one_slot not in given_slots]
+
+        if len(free_slots) == 0:
+            return None
+
+        slot = min(free_slots, key=lambda one_slot: store["accesses"][one_slot])
+
+        for (source_key, one_slot) in list(store["slots"].items()):
+            if one_slot == slot:
+                del store["slots"][source_key]
+
+        return slot
+
+
+
+    # Function to change the number of frames a frames file can store
+    def grow_store(self, store_name : str, new_capacity : int):
+
+        store = self.index[store_name]
+
+        # Closing the previous memory map (frames already given keep their own mapping)
+        if store_name in self.memory_maps:
+            self.memory_maps.pop(store_name).flush()
+
+        # Extending the file to its new size
+        with open(os.path.join(self.partitionFolder, store_name), mode="ab") as store_file:
+            store_file.truncate(new_capacity * store["width"] * store["height"] * 3)
+
+        store["accesses"] += [0] * (new_capacity - store["capacity"])
+        store["capacity"] = new_capacity
+
+
+
+    # Function to remove a frames file and its index entry
+    def remove_store(self, store_name : str):
+
+        # Closing the memory map (the frames already given keep their own mapping)
+        self.memory_maps.pop(store_name, None)
+        self.given_slots.pop(store_name, None)
+
+        # Removing the file (it may still be in use on some systems, in which case its index entry is removed anyway)
+        remove_file(os.path.join(self.partitionFolder, store_name))
+
+        del self.index[store_name]
+
+
+
+    # Function to write the index in the partition of the cache
+    def save_index(self):
+
+        index_path = os.path.join(self.partitionFolder, INDEX_FILENAME)
+
+        with open(index_path + ".tmp", mode="w") as index_file:
+            json.dump(self.index, index_file)
+
+        os.replace(index_path + ".tmp", index_path)
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Caches already opened in this process, by folder, and the lock protecting them
+opened_frame_caches = {}
+opened_frame_caches_lock = threading.Lock()
+
+# Function giving the cache of a folder (the default one when cache_folder is None), shared by every job of the process,
+# so that several jobs running at once use the same index
+def get_frame_cache(cache_folder = None) -> SolarFrameCache:
+
+    with opened_frame_caches_lock:
+        if cache_folder not in opened_frame_caches:
+            opened_frame_caches[cache_folder] = SolarFrameCache(cache_folder)
+
+        return opened_frame_caches[cache_folder]
+
+
+
+
+# Function giving the name of the frames file of a channel and a size, with the name of the credits drawn on its frames,
+# or without credits (when credits is None)
+def get_store_name(channel : str, width : int, height : int, credits) -> str:
+    return f"{channel}_{width}x{height}_{credits if credits is not None else 'raw'}.frames"
+
+
+
+# Function giving the key of a source image in a frames file,
+# which changes whenever the source image is modified
+def get_source_key(source_path : str) -> str:
+    return f"{os.path.abspath(source_path)}|{os.stat(source_path).st_mtime_ns}"
+
+
+
+# Function giving the index of a partition of the cache, or an empty one when there is none (or when it is unreadable)
+def read_index(partition_folder : str) -> dict:
+
+    try:
+        with open(os.path.join(partition_folder, INDEX_FILENAME), mode="r") as index_file:
+            return json.load(index_file)
+    except (OSError, ValueError):
+        return {}
+
+
+
+# Function removing a file, when it exists and isn't in use
+def remove_file(file_path : str):
+
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
@@ -0,0 +1,228 @@
+import cv2
+import shutil
+import subprocess
+import tempfile
+
+from common.constants import FFMPEG_CODEC, FFMPEG_CRF, FFMPEG_PATH, FFMPEG_PIPE_PIXEL_FORMAT, FFMPEG_PRESET, FFMPEG_THREADS, OPENCV_FOURCC, VIDEO_ENCODER, VIDEO_FPS
+from model.videoframe import VideoFrame
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Backends writing the videos
+OPENCV_ENCODER = "opencv"
+FFMPEG_ENCODER = "ffmpeg"
+VIDEO_ENCODERS = [OPENCV_ENCODER, FFMPEG_ENCODER]
+
+# Codecs of the ffmpeg backend, and their options (the H.265 videos are tagged so that Apple's players read them)
+FFMPEG_CODECS = {
+    "libx264": [],
+    "libx265": ["-tag:v", "hvc1"]
+}
+
+# Pixel formats of the frames sent to ffmpeg: the frames as they are (3 bytes per pixel),
+# or converted into YUV 4:2:0 (1.5 bytes per pixel, the format of the video, so ffmpeg doesn't convert them)
+FFMPEG_PIPE_PIXEL_FORMATS = ["rgb24", "bgr24", "yuv420p"]
+
+# Presets of the ffmpeg codecs, from the fastest to the smallest video
+FFMPEG_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"]
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+class OpenCVVideoEncoder():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The encoder writing a video with OpenCV's VideoWriter, in this process
+    def __init__(self, outputPath : str, width : int, height : int, fps = VIDEO_FPS, fourcc = OPENCV_FOURCC):
+
+        # Defining attributes from parameters
+        self.outputPath = outputPath
+
+        # Configuring the video writer
+        self.video_writer = cv2.VideoWriter(outputPath, cv2.VideoWriter_fourcc(*fourcc), fps, (int(width), int(height)))
+
+        # Last frame written, and its pixels in OpenCV's color order
+        self.last_frame, self.last_pixels = None, None
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function adding a frame to the video, in OpenCV's color order
+    # (the pixels of a hold frame, the same frame as the previous one, are not converted again)
+    def write(self, frame : VideoFrame):
+
+        if frame is not self.last_frame:
+            self.last_frame, self.last_pixels = frame, frame.to_bgr()
+
+        self.video_writer.write(self.last_pixels)
+
+
+
+    # Function finishing the video
+    def close(self):
+        self.video_writer.release()
+
+
+
+    # Function stopping the encoding without finishing the video (the caller removes it)
+    def abort(self):
+        self.video_writer.release()
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+class FFmpegVideoEncoder():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The encoder streaming the raw frames into an ffmpeg process through a pipe, which encodes them with its own threads
+    ## The frames are sent in pipePixelFormat (see FFMPEG_PIPE_PIXEL_FORMATS), and the video is in YUV 4:2:0,
+    ## the format read by every player and social platform
+    def __init__(self, outputPath : str, width : int, height : int, fps = VIDEO_FPS, codec = FFMPEG_CODEC, crf = FFMPEG_CRF, preset = FFMPEG_PRESET, pipePixelFormat = FFMPEG_PIPE_PIXEL_FORMAT, threads = FFMPEG_THREADS, ffmpegPath = FFMPEG_PATH):
+
+        # Defining attributes from parameters
+        self.outputPath = outputPath
+        self.pipePixelFormat = pipePixelFormat
+
+        # The messages of ffmpeg are kept in a file, so that the process never waits for them to be read
+        self.error_file = tempfile.TemporaryFile()
+
+        # Starting the ffmpeg process, reading the frames from its standard input
+        command = [
+            ffmpegPath, "-y", "-hide_banner", "-loglevel", "error", "-nostats",
+            "-f", "rawvideo", "-pix_fmt", pipePixelFormat, "-s", f"{int(width)}x{int(height)}", "-r", str(fps), "-i", "-",
+            "-c:v", codec, "-crf", str(crf), "-preset", preset, "-threads", str(threads), *FFMPEG_CODECS.get(codec, []),
+            "-pix_fmt", "yuv420p", "-movflags", "+faststart", outputPath
+        ]
+
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self.error_file)
+
+        # Last frame sent, and its pixels in the format of the pipe
+        self.last_frame, self.last_pixels = None, None
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function sending a frame to ffmpeg (the pipe is written without holding the GIL)
+    # (the pixels of a hold frame, the same frame as the previous one, are not converted again)
+    def write(self, frame : VideoFrame):
+
+        # Getting the pixels in the format of the pipe
+        if frame is not self.last_frame:
+            self.last_frame = frame
+
+            if self.pipePixelFormat == "yuv420p":
+                self.last_pixels = cv2.cvtColor(frame.to_rgb(), cv2.COLOR_RGB2YUV_I420)
+            elif self.pipePixelFormat == "bgr24":
+                self.last_pixels = frame.to_bgr()
+            else:
+                self.last_pixels = frame.to_rgb()
+
+        try:
+            self.process.stdin.write(self.last_pixels.data)
+
+        # ffmpeg has stopped
+        except BrokenPipeError:
+            self.process.wait()
+            raise self.get_error()
+
+
+
+    # Function finishing the video, once ffmpeg has encoded every frame
+    # (the file of the messages is closed even when ffmpeg has failed)
+    def close(self):
+
+        try:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+            if self.process.wait() != 0:
+                raise self.get_error()
+
+        finally:
+            self.error_file.close()
+
+
+
+    # Function stopping the encoding without finishing the video (the caller removes it),
+    # which can also be called once the video is finished, or once close() has failed
+    def abort(self):
+
+        self.process.kill()
+        self.process.wait()
+
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+
+        self.error_file.close()
+
+
+
+    # Function giving the error of the ffmpeg process, with its messages
+    def get_error(self) -> RuntimeError:
+
+        self.error_file.seek(0)
+        messages = self.error_file.read().decode(errors="replace").strip()
+
+        return RuntimeError(f"ffmpeg couldn't encode {self.outputPath} (exit code {self.process.returncode}): {messages}")
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Function giving the settings of the video encoder, from the "Encoder" of a request (whose missing settings are the default ones):
+# {"Backend", "FPS", "Codec", "CRF", "Preset", "PipePixelFormat", "Threads"}
+# It raises a ValueError when a setting isn't supported, or when ffmpeg is asked for but can't be found
+def get_encoder_settings(encoder_request = None) -> dict:
+
+    encoder_settings = {
+        "Backend": VIDEO_ENCODER,
+        "FPS": VIDEO_FPS,
+        "Codec": FFMPEG_CODEC,
+        "CRF": FFMPEG_CRF,
+        "Preset": FFMPEG_PRESET,
+        "PipePixelFormat": FFMPEG_PIPE_PIXEL_FORMAT,
+        "Threads": FFMPEG_THREADS,
+        **(encoder_request or {})
+    }
+
+    # Checking the settings
+    if encoder_settings["Backend"] not in VIDEO_ENCODERS:
+        raise ValueError(f"Unknown video encoder {encoder_settings['Backend']}, it should be one of {', '.join(VIDEO_ENCODERS)}")
+
+    if encoder_settings["FPS"] <= 0:
+        raise ValueError(f"The number of frames per second should be positive, not {encoder_settings['FPS']}")
+
+    if encoder_settings["Backend"] == FFMPEG_ENCODER:
+
+        if encoder_settings["Codec"] not in FFMPEG_CODECS:
+            raise ValueError(f"Unknown codec {encoder_settings['Codec']}, it should be one of {', '.join(FFMPEG_CODECS)}")
+
+        if encoder_settings["Preset"] not in FFMPEG_PRESETS:
+            raise ValueError(f"Unknown preset {encoder_settings['Preset']}, it should be one of {', '.join(FFMPEG_PRESETS)}")
+
+        if encoder_settings["PipePixelFormat"] not in FFMPEG_PIPE_PIXEL_FORMATS:
+            raise ValueError(f"Unknown pipe pixel format {encoder_settings['PipePixelFormat']}, it should be one of {', '.join(FFMPEG_PIPE_PIXEL_FORMATS)}")
+
+        if not 0 <= encoder_settings["CRF"] <= 51:
+            raise ValueError(f"The CRF should be between 0 and 51, not {encoder_settings['CRF']}")
+
+        if shutil.which(FFMPEG_PATH) is None:
+            raise ValueError(f"The ffmpeg encoder needs the {FFMPEG_PATH} program, which hasn't been found")
+
+    return encoder_settings
+
+
+
+# Function creating the encoder of a video from its settings (see get_encoder_settings())
+def create_video_encoder(output_path : str, width : int, height : int, encoder_settings : dict):
+
+    if encoder_settings["Backend"] == FFMPEG_ENCODER:
+        return FFmpegVideoEncoder(output_path, width, height, fps=encoder_settings["FPS"], codec=encoder_settings["Codec"], crf=encoder_settings["CRF"], preset=encoder_settings["Preset"], pipePixelFormat=encoder_settings["PipePixelFormat"], threads=encoder_settings["Threads"])
+
+    return OpenCVVideoEncoder(output_path, width, height, fps=encoder_settings["FPS"])
\ No newline at end of file
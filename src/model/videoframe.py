@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+
+from PIL import Image
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Channel orders of a frame
+RGB = "RGB" # Used by Pillow and matplotlib
+BGR = "BGR" # Used by OpenCV
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+class VideoFrame():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## A frame is a contiguous uint8 array of shape (height, width, 3),
+    ## given from one stage of the video generation to the next one without any compression
+    def __init__(self, pixels : np.ndarray, channelOrder = RGB):
+
+        # Keeping the pixels in a contiguous uint8 array (no copy when it is already the case)
+        self.pixels = np.ascontiguousarray(pixels, dtype=np.uint8)
+        self.channelOrder = channelOrder
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Width of the frame, in pixels
+    @property
+    def width(self) -> int:
+        return self.pixels.shape[1]
+
+
+
+    # Height of the frame, in pixels
+    @property
+    def height(self) -> int:
+        return self.pixels.shape[0]
+
+
+
+    # Function to build a frame from a PIL image
+    @classmethod
+    def from_pil(cls, image : Image.Image):
+        return cls(np.asarray(image.convert("RGB")), RGB)
+
+
+
+    # Function to build a frame from a matplotlib canvas that has already been drawn,
+    # by reading its RGBA buffer and dropping the alpha channel
+    @classmethod
+    def from_canvas(cls, canvas):
+        return cls(np.asarray(canvas.buffer_rgba())[:, :, :3], RGB)
+
+
+
+    # Function to build a black frame, to be filled by VideoLayout.paste()
+    @classmethod
+    def black(cls, width : int, height : int, channelOrder = RGB):
+        return cls(np.zeros((height, width, 3), dtype=np.uint8), channelOrder)
+
+
+
+    # Function giving the pixels in the RGB order
+    def to_rgb(self) -> np.ndarray:
+        if self.channelOrder == RGB:
+            return self.pixels
+        return cv2.cvtColor(self.pixels, cv2.COLOR_BGR2RGB)
+
+
+
+    # Function giving the pixels in the BGR order, as expected by OpenCV
+    def to_bgr(self) -> np.ndarray:
+        if self.channelOrder == BGR:
+            return self.pixels
+        return cv2.cvtColor(self.pixels, cv2.COLOR_RGB2BGR)
+
+
+
+    # Function giving the frame as a PIL image
+    def to_pil(self) -> Image.Image:
+        return Image.fromarray(self.to_rgb())
+
+
+
+    # Function to export the frame as a PNG file,
+    # which is the only place where frames are compressed
+    def save_png(self, file_path : str):
+        self.to_pil().save(file_path, format='png')
+    ## --------------------------------------------------------------------------------------------------------------------- ##
@@ -0,0 +1,83 @@
+from common.constants import COMMENT_BLOCK_HEIGHT, COMMENT_PANEL, NEUTRON_GRAPH_PANEL, PARTICLE_GRAPH_PANEL, PROTON_GRAPH_PANEL, SOLAR_ACTIVITY_PANEL
+from model.videoframe import BGR, VideoFrame
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Panels that can be placed in a layout, and the ones showing a particle flux graph
+VIDEO_PANELS = [SOLAR_ACTIVITY_PANEL, PARTICLE_GRAPH_PANEL, PROTON_GRAPH_PANEL, NEUTRON_GRAPH_PANEL, COMMENT_PANEL]
+GRAPH_PANELS = [PARTICLE_GRAPH_PANEL, PROTON_GRAPH_PANEL, NEUTRON_GRAPH_PANEL]
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+class VideoLayout():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## The layout of the frames of a video (videoWidth x videoHeight), resolved once from its rows of panels (see VIDEO_LAYOUTS):
+    ## only the panels of shownPanels are kept, every row without any panel is left out, the comment rows are
+    ## COMMENT_BLOCK_HEIGHT high, the other rows share the rest of the height, and the panels of a row share its width
+    ## Every panel gets the rectangle of the frames where its images are copied (see paste())
+    ## It raises a ValueError when a panel of the rows doesn't exist
+    def __init__(self, rows : list, videoWidth : int, videoHeight : int, shownPanels):
+
+        # Defining attributes from parameters
+        self.rows = rows
+        self.videoWidth = int(videoWidth)
+        self.videoHeight = int(videoHeight)
+
+        # Checking the panels
+        for one_panel in [one_panel for one_row in rows for one_panel in one_row]:
+            if one_panel not in VIDEO_PANELS:
+                raise ValueError(f"Unknown panel {one_panel}, it should be one of {', '.join(VIDEO_PANELS)}")
+
+        # Keeping the rows of the panels shown
+        shown_rows = [[one_panel for one_panel in one_row if one_panel in shownPanels] for one_row in rows]
+        shown_rows = [one_row for one_row in shown_rows if len(one_row) > 0]
+
+        # Height of the rows that are not comment rows
+        is_comment_rows = [all(one_panel == COMMENT_PANEL for one_panel in one_row) for one_row in shown_rows]
+        number_of_images_rows = len(shown_rows) - sum(is_comment_rows)
+        images_row_height = (videoHeight - COMMENT_BLOCK_HEIGHT * sum(is_comment_rows)) / max(1, number_of_images_rows)
+
+        # Rectangle (x, y, width, height) of every panel, from the top left corner of the frames
+        self.rectangles = dict()
+        y = 0
+
+        for (one_row, is_comment_row) in zip(shown_rows, is_comment_rows):
+            row_height = int(COMMENT_BLOCK_HEIGHT if is_comment_row else images_row_height)
+            x = 0
+
+            for one_panel in one_row:
+                panel_width = int(videoWidth / len(one_row))
+                self.rectangles[one_panel] = (x, y, panel_width, row_height)
+                x += panel_width
+
+            y += row_height
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function giving the panels of the layout, from the top left one
+    def get_panels(self) -> list:
+        return list(self.rectangles.keys())
+
+
+
+    # Function giving the size (width, height) of the images of a panel, or (0, 0) when it isn't in the layout
+    def get_size(self, panel : str) -> tuple:
+        (_, _, width, height) = self.rectangles.get(panel, (0, 0, 0, 0))
+        return (width, height)
+
+
+
+    # Function copying the image of a panel into its rectangle of a frame,
+    # as a single slice assignment (the part of the image outside of the rectangle is ignored)
+    def paste(self, frame : VideoFrame, panel : str, image : VideoFrame):
+
+        (x, y, width, height) = self.rectangles[panel]
+        image_pixels = image.to_bgr() if frame.channelOrder == BGR else image.to_rgb()
+
+        (height, width) = (min(height, image.height), min(width, image.width))
+        frame.pixels[y:y+height, x:x+width] = image_pixels[:height, :width]
+    ## --------------------------------------------------------------------------------------------------------------------- ##
@@ -76,6 +76,11 @@ class AppFrame(ctk.CTkScrollableFrame):
         self.btnGenerate = ctk.CTkButton(self, text="Generate", command=self.btnGenerateClicked)
         self.btnGenerate.pack(anchor="center", pady=10)
 
+        # ----- Profiling Checkbox ----- #
+        # When checked, the generation is profiled, and the profiles are saved next to the video
+        self.chkProfile = ctk.CTkCheckBox(self, text="Profile the generation")
+        self.chkProfile.pack(anchor="center", pady=(0, 10))
+
     ## --------------------------------------------------------------------------------------------------------------------- ##
 
 
@@ -156,6 +161,9 @@ class AppFrame(ctk.CTkScrollableFrame):
         # ----- Comment ----- #
         user_request["Comment"] = self.frmComment.entComment.get()
 
+        # ----- Profiling ----- #
+        user_request["Profile"] = self.chkProfile.get() == 1
+
         # Passing the user request to the data controller
         self.apphandler.treatUserRequest(userRequest=user_request)
     ## --------------------------------------------------------------------------------------------------------------------- ##
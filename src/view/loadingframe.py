@@ -1,11 +1,16 @@
 import customtkinter as ctk
 
+from common.progress import format_duration
+
 class LoadingFrame(ctk.CTkFrame):
 
     ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
-    def __init__(self, master, **kwargs):
+    def __init__(self, apphandler, master, **kwargs):
         super().__init__(master, **kwargs)
 
+        # Saving AppHandler handling this frame
+        self.apphandler = apphandler
+
         # Percentage variable
         self.percentage = 0
 
@@ -13,6 +18,14 @@ class LoadingFrame(ctk.CTkFrame):
         self.lblStep = ctk.CTkLabel(self, text="Loading...")
         self.lblStep.pack(pady=10, fill='x')
 
+        # Cancel button, under the progress bar
+        self.btnCancel = ctk.CTkButton(self, text="Cancel", command=self.btnCancelClicked)
+        self.btnCancel.pack(side="bottom", pady=10)
+
+        # Throughput and remaining time label, under the progress bar
+        self.lblThroughput = ctk.CTkLabel(self, text="")
+        self.lblThroughput.pack(side="bottom", fill='x')
+
         # Loading ProgressBar
         self.pgbLoading = ctk.CTkProgressBar(self, orientation="horizontal")
         self.pgbLoading.pack(padx=10, fill='x', side="left")
@@ -45,16 +58,49 @@ class LoadingFrame(ctk.CTkFrame):
         # Updating the lblStep content
         self.lblStep.configure(text=new_label)
 
+        # The throughput of the previous step is not the one of this step
+        self.lblThroughput.configure(text="")
+
 
     
     
     # This function changes the percentage label and the progress bar,
-    # depending on the current step and the max step
-    def update_percentage(self, current_step : int, total_steps : int):
+    # depending on the current step and the max step,
+    # and the throughput label, when the throughput and the remaining time of the step are known
+    def update_percentage(self, current_step : int, total_steps : int, items_per_second = None, remaining_seconds = None):
         
         # Updating progress bar
         self.pgbLoading.set(current_step/total_steps)
 
         # Updating Percentage label
         new_label = str(int((current_step/total_steps)*100)) + "%"
-        self.lblPercentage.configure(text=new_label)
\ No newline at end of file
+        self.lblPercentage.configure(text=new_label)
+
+        # Updating Throughput label
+        throughput_label = ""
+
+        if items_per_second is not None:
+            throughput_label = f"{items_per_second:.1f} frames/s"
+
+        if remaining_seconds is not None and current_step < total_steps:
+            throughput_label += f" - {format_duration(remaining_seconds)} left"
+
+        self.lblThroughput.configure(text=throughput_label)
+
+
+
+    # This function, triggered by a click on btnCancel, asks the AppHandler to cancel the generation
+    # (it stops between two frames)
+    def btnCancelClicked(self):
+
+        # The generation can only be cancelled once
+        self.btnCancel.configure(state="disabled")
+        self.update_step("Cancelling...")
+
+        self.apphandler.cancelUserRequest()
+
+
+
+    # This function disables the cancel button, once the generation is over
+    def disable_cancel(self):
+        self.btnCancel.configure(state="disabled")
\ No newline at end of file
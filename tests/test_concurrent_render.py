@@ -0,0 +1,187 @@
+import cv2
+import json
+import numpy as np
+import os
+import sys
+import threading
+
+from datetime import datetime, timedelta
+from PIL import Image
+
+import pytest
+
+# The tests import the application
+ROOT_FOLDER = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(ROOT_FOLDER, "src"))
+
+from controller.videogenerator import VideoGenerator
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Day of the dataset, and time range of the rendered videos
+DAY = datetime(2024, 6, 17)
+BEGIN = datetime(2024, 6, 17, 10, 0)
+END = datetime(2024, 6, 17, 14, 0)
+
+# Solar activity images of the dataset, with the smallest resolution admitted, so that they are quickly decoded
+IMAGE_TYPE = "eit195"
+IMAGE_RESOLUTION = 512
+IMAGE_INTERVAL = 12 # minutes, like the SOHO EIT images
+
+# Proton flux measures of the dataset, every 5 minutes for every GOES energy, like the GOES 1-day JSON files,
+# and neutron flux measures, every minute for every station, like the NMDB files
+PROTON_INTERVAL = 5
+PROTON_ENERGIES = [">=1 MeV", ">=10 MeV", ">=100 MeV", ">=30 MeV", ">=5 MeV", ">=50 MeV", ">=500 MeV", ">=60 MeV"]
+NEUTRON_STATIONS = ["KERG", "TERA"]
+
+# Requests of the jobs rendered at the same time, with different contents, formats and sizes (medium quality)
+JOB_REQUESTS = {
+    "horizontal": {"Format": "YouTube (horizontal)", "ProtonFlux": True, "Comment": "Concurrent render"},
+    "vertical": {"Format": "Instagram (vertical)", "ProtonFlux": False, "Comment": ""}
+}
+
+# Size of the video of every job
+VIDEO_SIZES = {"horizontal": (1280, 720), "vertical": (720, 1280)}
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+# Dataset shared by the tests of the module: the files of a day of the archive
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory) -> str:
+
+    dataset_folder = str(tmp_path_factory.mktemp("dataset"))
+    random_generator = np.random.default_rng(0)
+
+    # Solar activity images, a gradient with some noise, so that every image is different
+    gradient = np.add.outer(np.arange(IMAGE_RESOLUTION), np.arange(IMAGE_RESOLUTION)) * (200 / (2*IMAGE_RESOLUTION))
+
+    for minute in range(0, 24*60, IMAGE_INTERVAL):
+        pixels = np.clip(gradient + random_generator.normal(minute / 60, 4, size=gradient.shape), 0, 255).astype(np.uint8)
+        Image.fromarray(np.stack([pixels, pixels, pixels // 2], axis=-1), mode="RGB").save(os.path.join(dataset_folder, f"{DAY + timedelta(minutes=minute):%Y%m%d_%H%M}_{IMAGE_TYPE}_{IMAGE_RESOLUTION}.jpg"))
+
+    # GOES proton flux file
+    proton_measures = [{"time_tag": f"{DAY + timedelta(minutes=minute):%Y-%m-%dT%H:%M:%S}Z", "satellite": 18, "flux": float(random_generator.lognormal(-energy_index / 2, 0.3)), "energy": one_energy} for minute in range(0, 24*60, PROTON_INTERVAL) for (energy_index, one_energy) in enumerate(PROTON_ENERGIES)]
+
+    with open(os.path.join(dataset_folder, f"{DAY:%Y%m%d}_integral-protons-1-day.json"), mode="w") as json_file:
+        json.dump(proton_measures, json_file)
+
+    # NMDB neutron flux file
+    with open(os.path.join(dataset_folder, f"neutron_flux_{DAY:%Y_%m_%d}.csv"), mode="w") as csv_file:
+        csv_file.write("start_date_time   ;" + ";".join(NEUTRON_STATIONS) + "\n")
+
+        for minute in range(24*60):
+            csv_file.write(f"{DAY + timedelta(minutes=minute):%Y-%m-%d %H:%M:%S};" + ";".join(f"{random_generator.normal(100 + 50*station_index, 1):8.3f}" for station_index in range(len(NEUTRON_STATIONS))) + "\n")
+
+    return dataset_folder
+
+
+
+# Empty application data folder of every test (caches, indexes)
+@pytest.fixture(autouse=True)
+def app_data_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.setenv("USERPROFILE", str(tmp_path / "home"))
+
+
+
+# Function giving the generator of a job, writing its video into output_folder, with the request of the application
+def create_video_generator(dataset_folder : str, job_name : str, output_folder : str) -> VideoGenerator:
+
+    job_request = JOB_REQUESTS[job_name]
+    os.makedirs(output_folder, exist_ok=True)
+
+    return VideoGenerator({
+        "btnSolarActivityVideo": True,
+        "btnParticleFluxGraph": True,
+        "BeginDatetime": BEGIN,
+        "EndDatetime": END,
+        "Format": job_request["Format"],
+        "Quality": "Medium (720p)",
+        "InputFolder": dataset_folder,
+        "OutputFolder": output_folder,
+        "EnergyData": {"ProtonFlux": job_request["ProtonFlux"], "Energies": {one_energy: job_request["ProtonFlux"] for one_energy in PROTON_ENERGIES}, "NeutronFlux": True},
+        "Comment": job_request["Comment"]
+    })
+
+
+
+# Function giving every decoded frame of a video
+def read_video_frames(video_path : str) -> list:
+
+    video_capture = cv2.VideoCapture(video_path)
+    frames = []
+
+    while True:
+        (is_read, frame) = video_capture.read()
+
+        if not is_read:
+            break
+
+        frames.append(frame)
+
+    video_capture.release()
+
+    return frames
+
+
+
+# Function giving the number of solar activity images of the dataset within the time range of the videos
+def get_expected_number_of_frames(dataset_folder : str) -> int:
+    image_suffix = f"_{IMAGE_TYPE}_{IMAGE_RESOLUTION}.jpg"
+    return sum(1 for filename in os.listdir(dataset_folder) if filename.endswith(image_suffix) and BEGIN <= datetime.strptime(filename[:13], "%Y%m%d_%H%M") <= END)
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+def test_concurrent_renders_match_sequential_renders(dataset, tmp_path):
+
+    working_folder = os.getcwd()
+
+    # The jobs are rendered at the same time first, while the application data folder is still empty,
+    # so that they decode the images and fill the caches and the indexes at once
+    assert not os.path.exists(tmp_path / "home")
+
+    # Rendering every job at the same time, in its own thread
+    concurrent_generators = {job_name: create_video_generator(dataset, job_name, str(tmp_path / "concurrent" / job_name)) for job_name in JOB_REQUESTS}
+    errors = []
+
+    def run_job(video_generator : VideoGenerator):
+        try:
+            video_generator.run()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=run_job, args=(video_generator,)) for video_generator in concurrent_generators.values()]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+    # Rendering every job alone, one after the other (reading what the concurrent jobs have cached)
+    sequential_generators = {job_name: create_video_generator(dataset, job_name, str(tmp_path / "sequential" / job_name)) for job_name in JOB_REQUESTS}
+
+    for video_generator in sequential_generators.values():
+        video_generator.run()
+
+    # The jobs don't change the working folder of the process
+    assert os.getcwd() == working_folder
+
+    # Every video has the frames of the images of the time range, at the size of its format,
+    # and the same frames as the video of the job rendered alone
+    expected_number_of_frames = get_expected_number_of_frames(dataset)
+    assert expected_number_of_frames > 0
+
+    for (job_name, video_generator) in concurrent_generators.items():
+
+        assert os.path.isfile(video_generator.video_path)
+
+        frames = read_video_frames(video_generator.video_path)
+        sequential_frames = read_video_frames(sequential_generators[job_name].video_path)
+
+        assert len(frames) == expected_number_of_frames
+        assert all((frame.shape[1], frame.shape[0]) == VIDEO_SIZES[job_name] for frame in frames)
+        assert len(sequential_frames) == len(frames)
+        assert all(np.array_equal(frame, sequential_frame) for (frame, sequential_frame) in zip(frames, sequential_frames))
@@ -0,0 +1,160 @@
+import csv
+import io
+import numpy as np
+import os
+import sys
+
+from datetime import datetime
+
+import pytest
+
+# The tests import the application
+ROOT_FOLDER = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.join(ROOT_FOLDER, "src"))
+
+from model.particlefluxgraphimages import read_neutron_flux_series
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Day of the fixture files, and time ranges read from them (the whole day, and a part of it)
+DAY = datetime(2024, 6, 17)
+TIME_RANGES = [(datetime(2024, 6, 17, 0, 0), datetime(2024, 6, 17, 23, 59)), (datetime(2024, 6, 17, 6, 0), datetime(2024, 6, 17, 12, 0))]
+
+# Header lines of the fixture files: the NMDB layouts, and the headers rewritten by the previous loader
+HEADER_LINES = {
+    "single_station": "start_date_time   ;RCORR_E",
+    "kerg_tera": "start_date_time   ;KERG;TERA",
+    "tera_kerg": "start_date_time   ;TERA;KERG",
+    "rewritten_single_station": "start_date_time; Neutron flux",
+    "rewritten_kerg_tera": "start_date_time; KERG Neutron flux; TERA Neutron flux"
+}
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+# Function writing the fixture file of the day in folder, and giving its path
+def write_neutron_file(folder, header_line : str, measure_lines : list) -> str:
+
+    file_path = os.path.join(folder, f"neutron_flux_{DAY.strftime('%Y_%m_%d')}.csv")
+
+    with open(file_path, mode="w") as csv_file:
+        csv_file.write("\n".join([header_line] + measure_lines) + "\n")
+
+    return file_path
+
+
+
+# Function giving the measure lines of a day, every 10 minutes, with one measure per station
+def get_measure_lines(number_of_stations : int) -> list:
+
+    measure_lines = []
+
+    for line_index in range(24*6):
+        measures = [f"{100 + 10*station_index + (line_index*7 % 13) / 8:.3f}" for station_index in range(number_of_stations)]
+        measure_lines.append(f"{DAY.replace(hour=line_index // 6, minute=10 * (line_index % 6)):%Y-%m-%d %H:%M:%S};" + ";".join(measures))
+
+    return measure_lines
+
+
+
+# Function reading a neutron flux file like the previous loader (which rewrote the header line of the file, then read it
+# with csv.DictReader), from its content, so that the fixture file isn't rewritten
+def read_previous_neutron_csv(file_path : str, begin_date_time : datetime, end_date_time : datetime) -> dict:
+
+    with open(file_path, mode="r") as csv_file:
+        file_content = csv_file.readlines()
+
+    # Changing the header line
+    header = "start_date_time"
+
+    if ("RCORR_E" in file_content[0] or "; Neutron flux" in file_content[0]):
+        header = header + "; Neutron flux"
+    else:
+        if ("KERG" in file_content[0]):
+            header = header + "; KERG Neutron flux"
+        if ("TERA" in file_content[0]):
+            header = header + "; TERA Neutron flux"
+
+    file_content[0] = header + "\n"
+
+    # Converting the lines of the time range
+    final_dict = dict()
+
+    for current_line in csv.DictReader(io.StringIO("".join(file_content)), delimiter=";"):
+
+        current_line["start_date_time"] = datetime.strptime(current_line["start_date_time"], '%Y-%m-%d %H:%M:%S')
+
+        if current_line["start_date_time"] >= begin_date_time and current_line["start_date_time"] <= end_date_time:
+            for current_key in current_line.keys():
+                final_dict.setdefault(current_key, [])
+
+                if "Neutron flux" in current_key:
+                    final_dict[current_key].append(float(current_line[current_key]))
+                else:
+                    final_dict[current_key].append(current_line[current_key])
+
+    return final_dict
+
+
+
+# Function checking that a flux series has the times and the measures of the previous loader,
+# the columns of the series being named after the ones of the previous loader by column_labels
+def assert_same_flux(flux_series, previous_flux : dict, column_labels : dict):
+
+    np.testing.assert_array_equal(flux_series.times, np.array(previous_flux["start_date_time"], dtype='datetime64[s]'))
+    assert sorted(flux_series.columns.keys()) == sorted(column_labels.keys())
+
+    for (one_label, previous_label) in column_labels.items():
+        np.testing.assert_array_equal(flux_series.columns[one_label], np.array(previous_flux[previous_label]))
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+@pytest.mark.parametrize("time_range", TIME_RANGES)
+@pytest.mark.parametrize("layout", ["single_station", "kerg_tera", "rewritten_single_station", "rewritten_kerg_tera"])
+def test_neutron_flux_matches_previous_loader(tmp_path, layout, time_range):
+
+    number_of_stations = 1 if "single_station" in layout else 2
+    file_path = write_neutron_file(tmp_path, HEADER_LINES[layout], get_measure_lines(number_of_stations))
+
+    flux_series = read_neutron_flux_series(str(tmp_path), *time_range)
+    previous_flux = read_previous_neutron_csv(file_path, *time_range)
+
+    column_labels = [one_label for one_label in previous_flux.keys() if one_label != "start_date_time"]
+    assert_same_flux(flux_series, previous_flux, {one_label: one_label for one_label in column_labels})
+
+
+
+# The previous loader named the columns KERG then TERA whatever their order in the file,
+# so the measures of a TERA;KERG file are the same, under the names of their stations
+@pytest.mark.parametrize("time_range", TIME_RANGES)
+def test_neutron_flux_of_tera_kerg_file_is_named_after_its_stations(tmp_path, time_range):
+
+    file_path = write_neutron_file(tmp_path, HEADER_LINES["tera_kerg"], get_measure_lines(2))
+
+    flux_series = read_neutron_flux_series(str(tmp_path), *time_range)
+    previous_flux = read_previous_neutron_csv(file_path, *time_range)
+
+    assert_same_flux(flux_series, previous_flux, {" TERA Neutron flux": " KERG Neutron flux", " KERG Neutron flux": " TERA Neutron flux"})
+
+
+
+# The malformed lines don't lose the whole file: a trailing separator is ignored, a missing cell is a missing measure,
+# and a line with an extra cell is left out (the previous loader failed on these lines, so it reads them repaired)
+def test_neutron_flux_tolerates_malformed_lines(tmp_path):
+
+    measure_lines = get_measure_lines(2)
+    repaired_lines = list(measure_lines)
+
+    measure_lines[10] += ";"
+    (measure_lines[20], repaired_lines[20]) = (measure_lines[20].rpartition(";")[0], measure_lines[20].rpartition(";")[0] + ";nan")
+    measure_lines[30] += ";123.000"
+    del repaired_lines[30]
+    measure_lines.insert(40, "")
+
+    write_neutron_file(tmp_path, HEADER_LINES["kerg_tera"], measure_lines)
+    flux_series = read_neutron_flux_series(str(tmp_path), *TIME_RANGES[0])
+
+    (tmp_path / "repaired").mkdir()
+    previous_flux = read_previous_neutron_csv(write_neutron_file(tmp_path / "repaired", HEADER_LINES["kerg_tera"], repaired_lines), *TIME_RANGES[0])
+
+    assert_same_flux(flux_series, previous_flux, {" KERG Neutron flux": " KERG Neutron flux", " TERA Neutron flux": " TERA Neutron flux"})
+    assert np.isnan(flux_series.columns[" TERA Neutron flux"][20])
@@ -0,0 +1,330 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from datetime import datetime, timedelta
+
+from generate_dataset import build_argument_parser as build_dataset_argument_parser, generate_dataset, get_dataset_arguments
+
+# The maximum memory of the process is only known on Unix
+try:
+    import resource
+except ImportError:
+    resource = None
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Folder of the sources of the application
+SOURCES_FOLDER = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Default content of the benchmarked video
+DEFAULT_FORMAT = "horizontal"
+DEFAULT_QUALITY = "medium"
+DEFAULT_PROTONS = "all"
+DEFAULT_COMMENT = "Benchmark"
+
+# Encoders compared by default (the ffmpeg one is skipped when ffmpeg isn't installed)
+DEFAULT_ENCODERS = "opencv,ffmpeg"
+
+# Graph engines compared by default
+DEFAULT_GRAPH_ENGINES = "matplotlib,raster"
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+class StageTimer():
+
+    ## CONSTRUCTOR --------------------------------------------------------------------------------------------------------- ##
+    ## It measures every stage of the benchmark: its duration, the number of items it produced (frames, images or measures),
+    ## and its peak memory, traced by tracemalloc (allocations of Python and NumPy, not the ones of Pillow and OpenCV)
+    ## When traceMemory isn't set, the stages are not slowed down by tracemalloc
+    def __init__(self, traceMemory = True):
+
+        # Defining attributes from parameters
+        self.traceMemory = traceMemory
+
+        # Results of every stage
+        self.stages = []
+
+        if self.traceMemory:
+            tracemalloc.start()
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+
+
+    ## METHODS ------------------------------------------------------------------------------------------------------------- ##
+
+    # Function running a stage, whose function gives (its result, its number of items), and giving its result
+    # The messages printed by the stage are hidden, so that the standard output is kept for the results
+    def run(self, name : str, unit : str, stage_function, *arguments):
+
+        if self.traceMemory:
+            tracemalloc.reset_peak()
+
+        with open(os.devnull, mode="w") as null_stream, contextlib.redirect_stdout(null_stream):
+            start_time = time.perf_counter()
+            (result, number_of_items) = stage_function(*arguments)
+            duration = time.perf_counter() - start_time
+
+        self.stages.append({
+            "name": name,
+            "seconds": round(duration, 6),
+            "items": number_of_items,
+            "unit": unit,
+            "items_per_second": round(number_of_items / duration, 3) if duration > 0 else None,
+            "peak_traced_memory_mb": round(tracemalloc.get_traced_memory()[1] / 1024**2, 3) if self.traceMemory else None,
+            "max_rss_mb": get_max_rss_mb()
+        })
+
+        # Displaying the progress on the standard error stream
+        print(f"{name:>20}: {duration:8.3f} s, {number_of_items} {unit}", file=sys.stderr, flush=True)
+
+        return result
+    ## --------------------------------------------------------------------------------------------------------------------- ##
+
+## ---------- STATIC FUNCTIONS ---------- ##
+
+# Function giving the maximum memory used by the process since it started (in MB), or None when it isn't known
+def get_max_rss_mb():
+
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # The size is given in bytes on macOS, and in kilobytes on Linux
+    return round(max_rss / 1024**2 if sys.platform == "darwin" else max_rss / 1024, 3)
+
+
+
+# Function running every stage of the video generation separately on a dataset, and giving the results
+# The video is encoded by every encoder of encoder_requests (see get_encoder_settings()), to compare their throughput and video size,
+# and the graphs are rendered by every engine of graph_engines (the video is made of the graphs of the first one)
+def run_benchmark(dataset : dict, spec : dict, work_folder : str, trace_memory = True, encoder_requests = None, graph_engines = None) -> dict:
+
+    # Importing the application (after the application data folder has been moved, see main())
+    sys.path.insert(0, SOURCES_FOLDER)
+
+    from cli import DEFAULT_SPEC, build_user_request
+    from common.fonts import get_font
+    from controller.videogenerator import VideoGenerator
+    from common.constants import GRAPH_ENGINE, PARTICLE_GRAPH_PANEL, SOLAR_ACTIVITY_PANEL
+    from model.particlefluxgraphimages import ParticleFluxGraphImages, read_neutron_flux_series
+    from model.protonfluxstore import ProtonFluxStore
+    from model.solaractivityimages import SolarActivityImages
+    from model.videoencoders import get_encoder_settings
+
+    # Building the request, like the command line does
+    user_request = build_user_request({**DEFAULT_SPEC, **spec, "input": dataset["folder"], "output": work_folder})
+    begin_date_time = user_request["BeginDatetime"]
+    end_date_time = user_request["EndDatetime"]
+    selected_energies = [one_energy for (one_energy, is_selected) in user_request["EnergyData"]["Energies"].items() if is_selected]
+
+    with open(os.devnull, mode="w") as null_stream, contextlib.redirect_stdout(null_stream):
+        video_generator = VideoGenerator(user_request)
+
+    video_dimensions = video_generator.videoDimensions
+    solar_activity_size = (video_dimensions["solar_activity_width"], video_dimensions["solar_activity_height"])
+    particle_graph_size = (video_dimensions["particle_graph_width"], video_dimensions["particle_graph_height"])
+
+    timer = StageTimer(trace_memory)
+
+    # ----- Solar activity images ----- #
+
+    # Selecting the images (the catalog of the dataset folder is built by this first selection)
+    def select_images():
+        solar_activity_object = SolarActivityImages(beginDateTime=begin_date_time, endDateTime=end_date_time, imageWidth=solar_activity_size[0], imageHeight=solar_activity_size[1], inputFolder=dataset["folder"], lazyLoading=True)
+        return (solar_activity_object, len(solar_activity_object))
+
+    solar_activity_object = timer.run("image_selection", "images", select_images)
+
+    # Decoding and resizing the images (without the frame cache)
+    def decode_images():
+        solar_activity_images = list(solar_activity_object.iter_images())
+        return (solar_activity_images, len(solar_activity_images))
+
+    solar_activity_images = timer.run("image_decode_resize", "frames", decode_images)
+    # --------------------------------- #
+
+    # ----- Particle flux ----- #
+
+    # Loading the proton flux from the columnar store, which is built from the JSON files by the first loading
+    proton_store = ProtonFluxStore(dataset["folder"], storeFolder=os.path.join(work_folder, "proton_flux"))
+
+    def load_protons():
+        proton_flux_series = proton_store.load(begin_date_time, end_date_time, selected_energies)
+        return (proton_flux_series, len(proton_flux_series) * len(proton_flux_series.columns))
+
+    timer.run("proton_load_ingest", "measures", load_protons)
+    proton_flux_series = timer.run("proton_load", "measures", load_protons)
+
+    # Loading the neutron flux
+    def load_neutrons():
+        neutron_flux_series = read_neutron_flux_series(dataset["folder"], begin_date_time, end_date_time)
+        return (neutron_flux_series, len(neutron_flux_series) * len(neutron_flux_series.columns))
+
+    neutron_flux_series = timer.run("neutron_load", "measures", load_neutrons)
+
+    # Rendering the graphs with every engine (what dict_to_graph does, from the flux already loaded)
+    graph_engines = graph_engines or [GRAPH_ENGINE]
+    particle_graph_images = None
+
+    for graph_engine in graph_engines:
+
+        def render_graphs():
+            particle_graph_object = ParticleFluxGraphImages(beginDateTime=begin_date_time, endDateTime=end_date_time, dctEnergy=user_request["EnergyData"], imageWidth=particle_graph_size[0], imageHeight=particle_graph_size[1], inputFolder=dataset["folder"], numberOfImages=len(solar_activity_images), lazyLoading=True, graphEngine=graph_engine, protonFluxSeries=proton_flux_series, neutronFluxSeries=neutron_flux_series)
+            graph_images = list(particle_graph_object.iter_images())
+            return (graph_images, len(graph_images))
+
+        graph_images = timer.run(f"dict_to_graph[{graph_engine}]", "frames", render_graphs)
+
+        if particle_graph_images is None:
+            particle_graph_images = graph_images
+    # ------------------------- #
+
+    # ----- Video ----- #
+
+    # Combining the images
+    def combine_images():
+        final_images = video_generator.combineImages({(SOLAR_ACTIVITY_PANEL, solar_activity_size): solar_activity_images}, {(PARTICLE_GRAPH_PANEL, particle_graph_size): particle_graph_images}, user_request["Comment"])
+        return (final_images, len(final_images))
+
+    final_images = timer.run("combineImages", "frames", combine_images)
+
+    # Encoding the video with every encoder
+    encoders = []
+
+    for encoder_request in encoder_requests or [{}]:
+        encoder_settings = get_encoder_settings(encoder_request)
+        encoder_name = encoder_settings["Backend"] if encoder_settings["Backend"] == "opencv" else f"ffmpeg-{encoder_settings['Codec']}-{encoder_settings['PipePixelFormat']}"
+
+        def generate_video():
+            video_generator.generateVideo(final_images, video_names=video_generator.getVideoNames(), videos_dimensions=video_generator.variantsDimensions, output_folder=work_folder, number_of_images=len(final_images), encoder_settings=encoder_settings)
+            return (None, len(final_images))
+
+        timer.run(f"generateVideo[{encoder_name}]", "frames", generate_video)
+
+        # Adding the size of the video to the results of the stage
+        timer.stages[-1]["video_mb"] = round(os.path.getsize(os.path.join(work_folder, video_generator.getVideoName())) / 1024**2, 3)
+        encoders.append({"name": encoder_name, **encoder_settings})
+    # ----------------- #
+
+    return {
+        "dataset": dataset,
+        "request": {"begin": str(begin_date_time), "end": str(end_date_time), "format": spec["format"], "quality": spec["quality"], "width": video_dimensions["video_width"], "height": video_dimensions["video_height"], "energies": selected_energies, "encoders": encoders, "graph_engines": graph_engines},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(), "font": " ".join(get_font(24).getname()), "date": datetime.now().isoformat(timespec="seconds")},
+        "stages": timer.stages,
+        "total_seconds": round(sum(one_stage["seconds"] for one_stage in timer.stages), 6)
+    }
+
+
+
+# Function giving the encoders compared by the benchmark, from the command line (as the "Encoder" of a request)
+def get_encoder_requests(arguments : argparse.Namespace) -> list:
+
+    encoder_requests = []
+
+    for backend in [one_encoder.strip() for one_encoder in arguments.encoders.split(",") if one_encoder.strip() != ""]:
+
+        # The ffmpeg encoder is skipped when ffmpeg isn't installed
+        if backend == "ffmpeg" and shutil.which("ffmpeg") is None:
+            print("ffmpeg isn't installed, its encoder is skipped", file=sys.stderr)
+            continue
+
+        encoder_request = {"Backend": backend}
+
+        if backend == "ffmpeg":
+            ffmpeg_settings = {"Codec": arguments.codec, "CRF": arguments.crf, "Preset": arguments.preset, "PipePixelFormat": arguments.pipe_format}
+            encoder_request.update({setting: value for (setting, value) in ffmpeg_settings.items() if value is not None})
+
+        encoder_requests.append(encoder_request)
+
+    return encoder_requests
+
+
+
+# Function building the parser of the command line of the benchmark, with the options of the dataset generator
+def build_argument_parser() -> argparse.ArgumentParser:
+
+    parser = build_dataset_argument_parser()
+    parser.description = "Times every stage of the video generation separately (image selection, image decoding and resizing, proton and neutron loading, graph rendering, combination, encoding with every encoder) on a synthetic dataset, and prints the results as JSON. The texts of the frames are written with Arial, or with the default font of Pillow where Arial isn't installed (the font used is given in the results)."
+
+    parser.add_argument("--dataset", help="folder of an existing dataset (or of real data), instead of generating one; --begin and --days then give the time range")
+    parser.add_argument("--format", choices=["horizontal", "vertical"], default=DEFAULT_FORMAT)
+    parser.add_argument("--quality", choices=["medium", "high"], default=DEFAULT_QUALITY)
+    parser.add_argument("--protons", default=DEFAULT_PROTONS, help=f"energies of the proton flux graph, separated by commas (default: {DEFAULT_PROTONS})")
+    parser.add_argument("--comment", default=DEFAULT_COMMENT, help="comment written under the images")
+    parser.add_argument("--encoders", default=DEFAULT_ENCODERS, help=f"encoders compared, separated by commas (default: {DEFAULT_ENCODERS}, ffmpeg is skipped when it isn't installed)")
+    parser.add_argument("--graph-engines", dest="graph_engines", default=DEFAULT_GRAPH_ENGINES, help=f"graph engines compared, separated by commas, the video is made of the graphs of the first one (default: {DEFAULT_GRAPH_ENGINES})")
+    parser.add_argument("--codec", help="codec of the ffmpeg encoder (libx264 or libx265)")
+    parser.add_argument("--crf", type=int, help="quality of the ffmpeg encoder, from 0 to 51")
+    parser.add_argument("--preset", help="preset of the ffmpeg encoder, like medium")
+    parser.add_argument("--pipe-format", dest="pipe_format", help="pixel format of the frames sent to ffmpeg (rgb24, bgr24 or yuv420p)")
+    parser.add_argument("--no-memory", dest="trace_memory", action="store_false", help="don't trace the memory, which slows down the stages")
+    parser.add_argument("--results", help="file where the JSON results are written (printed on the standard output by default)")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary folder of the dataset, the caches and the video")
+
+    return parser
+
+
+
+# Main function of the benchmark, giving the exit code of the program
+def main(argv = None) -> int:
+
+    arguments = build_argument_parser().parse_args(argv)
+    dataset_arguments = get_dataset_arguments(arguments)
+
+    work_folder = tempfile.mkdtemp(prefix="solaractivid_benchmark_")
+
+    try:
+        # The catalogs and caches of the application are written in the temporary folder,
+        # so that every run starts without them, and the ones of the user are left untouched
+        os.environ["HOME"] = os.environ["USERPROFILE"] = os.path.join(work_folder, "home")
+
+        # Generating the dataset, or describing the given one
+        if arguments.dataset is None:
+            print("Generating the dataset...", file=sys.stderr, flush=True)
+            dataset = generate_dataset(os.path.join(work_folder, "dataset"), **dataset_arguments)
+        else:
+            dataset = {"folder": arguments.dataset, "begin": dataset_arguments["begin_date"].isoformat(sep=" "), "days": arguments.days}
+
+        # Benchmarking a video of every day of the dataset
+        spec = {
+            "begin": dataset["begin"],
+            "end": (dataset_arguments["begin_date"] + timedelta(days=arguments.days, minutes=-1)).isoformat(sep=" "),
+            "format": arguments.format,
+            "quality": arguments.quality,
+            "solar_activity": True,
+            "protons": arguments.protons,
+            "neutrons": True,
+            "comment": arguments.comment
+        }
+
+        results = run_benchmark(dataset, spec, work_folder, arguments.trace_memory, get_encoder_requests(arguments), [one_engine.strip() for one_engine in arguments.graph_engines.split(",") if one_engine.strip()])
+
+    finally:
+        if arguments.keep:
+            print(f"Files kept in {work_folder}", file=sys.stderr)
+        else:
+            shutil.rmtree(work_folder, ignore_errors=True)
+
+    # Giving the results
+    if arguments.results is not None:
+        with open(arguments.results, mode="w") as results_file:
+            json.dump(results, results_file, indent=4)
+    else:
+        print(json.dumps(results, indent=4))
+
+    return 0
+
+
+
+# Main function
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
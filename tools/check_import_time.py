@@ -0,0 +1,107 @@
+import argparse
+import os
+import subprocess
+import sys
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Folder of the sources of the application
+SOURCES_FOLDER = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# Module imported before the window of the application is shown, and maximum time of its import (in seconds)
+STARTUP_MODULE = "main"
+STARTUP_IMPORT_TIME_BUDGET = 0.5
+
+# Packages that must not be imported before the window is shown (they are imported when the video generation starts)
+DEFERRED_PACKAGES = ["cv2", "matplotlib", "numpy", "model"]
+
+# Number of measures (the fastest one is kept, the first one may also compile the modules)
+NUMBER_OF_RUNS = 5
+
+# Number of slowest imports displayed
+NUMBER_OF_SLOWEST_IMPORTS = 10
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+# Function importing a module in a new interpreter, with -X importtime,
+# and giving the (package, depth, self time, cumulative time) of every import, in seconds
+def measure_imports(module : str) -> list:
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=SOURCES_FOLDER, capture_output=True, text=True)
+
+    if result.returncode != 0:
+        error_lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(error_lines))
+
+    imports = []
+
+    # Reading the lines "import time: self [us] | cumulative | imported package"
+    # (the package is indented by 2 spaces for every level of depth)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+
+        (self_time, cumulative_time, package) = line[len("import time:"):].split("|")
+        depth = (len(package) - len(package.lstrip(" ")) - 1) // 2
+
+        imports.append((package.strip(), depth, int(self_time) / 1e6, int(cumulative_time) / 1e6))
+
+    return imports
+
+
+
+# Function checking the import time of the startup module, and giving the exit code of the program
+def main(argv = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Checks that the modules imported before the window of the application is shown stay under a time budget, and that the heavy modules of the video generation are not among them.")
+    parser.add_argument("--module", default=STARTUP_MODULE, help=f"module imported on startup (default: {STARTUP_MODULE})")
+    parser.add_argument("--budget", type=float, default=STARTUP_IMPORT_TIME_BUDGET, help=f"maximum import time, in seconds (default: {STARTUP_IMPORT_TIME_BUDGET})")
+    parser.add_argument("--runs", type=int, default=NUMBER_OF_RUNS, help=f"number of measures, the fastest one is kept (default: {NUMBER_OF_RUNS})")
+    arguments = parser.parse_args(argv)
+
+    # Keeping the fastest import of the startup module
+    measures = []
+
+    for _ in range(max(1, arguments.runs)):
+        imports = measure_imports(arguments.module)
+
+        # Keeping only the imports of the startup module (the ones of the interpreter startup are before them,
+        # and a package is listed after the packages it imports)
+        module_index = next(import_index for (import_index, (package, depth, _, _)) in enumerate(imports) if depth == 0 and package == arguments.module)
+        first_index = max((import_index + 1 for (import_index, (_, depth, _, _)) in enumerate(imports[:module_index]) if depth == 0), default=0)
+        imports = imports[first_index:module_index + 1]
+
+        measures.append((imports[-1][3], imports))
+
+    (startup_time, imports) = min(measures, key=lambda one_measure: one_measure[0])
+
+    # Displaying the slowest packages imported by the startup module
+    print(f"Import of {arguments.module}: {startup_time*1000:.1f} ms (budget: {arguments.budget*1000:.0f} ms)")
+
+    for (package, depth, _, cumulative_time) in sorted((one_import for one_import in imports if one_import[1] == 1), key=lambda one_import: one_import[3], reverse=True)[:NUMBER_OF_SLOWEST_IMPORTS]:
+        print(f"  {cumulative_time*1000:8.1f} ms  {package}")
+
+    is_passing = True
+
+    # Checking that the deferred packages are not imported
+    deferred_imports = sorted({package for (package, _, _, _) in imports if package.split(".")[0] in DEFERRED_PACKAGES})
+
+    if len(deferred_imports) > 0:
+        print(f"FAILED: these packages should only be imported when the video generation starts: {', '.join(deferred_imports)}")
+        is_passing = False
+
+    # Checking the budget
+    if startup_time > arguments.budget:
+        print(f"FAILED: the import of {arguments.module} takes more than {arguments.budget*1000:.0f} ms")
+        is_passing = False
+
+    if is_passing:
+        print("OK")
+
+    return 0 if is_passing else 1
+
+
+
+# Main function
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
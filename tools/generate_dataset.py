@@ -0,0 +1,235 @@
+import argparse
+import functools
+import json
+import numpy as np
+import os
+import sys
+import tempfile
+
+from datetime import datetime, timedelta
+from PIL import Image
+
+## CONSTANTS --------------------------------------------------------------------------------------------------------- ##
+
+# Default time range and content of a dataset
+DEFAULT_BEGIN = "2024-06-17"
+DEFAULT_DAYS = 2
+DEFAULT_IMAGE_TYPE = "eit195"
+DEFAULT_IMAGE_RESOLUTION = 1024
+DEFAULT_IMAGE_INTERVAL = 12 # minutes, like the SOHO EIT images
+DEFAULT_PROTON_INTERVAL = 5 # minutes, like the GOES 1-day JSON files
+DEFAULT_NEUTRON_INTERVAL = 1 # minutes, like the NMDB files
+DEFAULT_SEED = 0
+
+# Images of other types and resolutions, added every hour so that the selection of the major type and resolution has work to do
+OTHER_IMAGES = [("c2", 512), ("hmiigr", 512)]
+
+# Background level of the GOES energies (pfu), and their order in the files
+PROTON_BACKGROUNDS = {">=1 MeV": 1.2, ">=10 MeV": 0.25, ">=100 MeV": 0.06, ">=30 MeV": 0.12, ">=5 MeV": 0.35, ">=50 MeV": 0.09, ">=500 MeV": 0.02, ">=60 MeV": 0.08}
+
+# Neutron monitor stations, and their usual count rate (counts/s)
+NEUTRON_STATIONS = {"KERG": 235.0, "TERA": 120.0, "OULU": 105.0}
+
+## ------------------------------------------------------------------------------------------------------------------- ##
+
+# Function writing a synthetic dataset into output_folder, with the same files as the real archive:
+# solar activity images (YYYYMMDD_HHMM_<type>_<resolution>.jpg), GOES proton flux files (YYYYMMDD_integral-protons-1-day.json)
+# and NMDB neutron flux files (neutron_flux_YYYY_MM_DD.csv), with a solar event in the middle of the time range
+# It gives the description of the dataset
+def generate_dataset(output_folder : str, begin_date : datetime, days : int, image_type = DEFAULT_IMAGE_TYPE, image_resolution = DEFAULT_IMAGE_RESOLUTION, image_interval = DEFAULT_IMAGE_INTERVAL, proton_interval = DEFAULT_PROTON_INTERVAL, neutron_interval = DEFAULT_NEUTRON_INTERVAL, seed = DEFAULT_SEED) -> dict:
+
+    os.makedirs(output_folder, exist_ok=True)
+    random_generator = np.random.default_rng(seed)
+
+    end_date = begin_date + timedelta(days=days)
+
+    # The event starts in the middle of the time range
+    event_date_time = begin_date + (end_date - begin_date) / 2
+
+    # Writing the files of every day
+    number_of_images = 0
+    number_of_proton_measures = 0
+    number_of_neutron_measures = 0
+
+    for day_index in range(days):
+        day = begin_date + timedelta(days=day_index)
+
+        number_of_images += write_images(output_folder, day, image_type, image_resolution, image_interval, event_date_time, random_generator)
+        number_of_proton_measures += write_proton_file(output_folder, day, proton_interval, event_date_time, random_generator)
+        number_of_neutron_measures += write_neutron_file(output_folder, day, neutron_interval, event_date_time, random_generator)
+
+    return {
+        "folder": output_folder,
+        "begin": begin_date.isoformat(sep=" "),
+        "end": (end_date - timedelta(minutes=1)).isoformat(sep=" "),
+        "days": days,
+        "image_type": image_type,
+        "image_resolution": image_resolution,
+        "images": number_of_images,
+        "proton_measures": number_of_proton_measures,
+        "neutron_measures": number_of_neutron_measures,
+        "seed": seed
+    }
+
+
+
+# Function giving the intensity of the event at every date time, in hours since its start (0 before it starts):
+# a fast rise, then an exponential decay
+def get_event_profile(date_times : list, event_date_time : datetime) -> np.ndarray:
+    hours = np.array([(one_date_time - event_date_time).total_seconds() / 3600 for one_date_time in date_times])
+    return np.where(hours > 0, (1 - np.exp(-np.maximum(hours, 0) / 1.5)) * np.exp(-np.maximum(hours, 0) / 10), 0.0)
+
+
+
+# Function writing the images of a day (the major type and resolution, and the other ones every hour), and giving their number
+def write_images(output_folder : str, day : datetime, image_type : str, image_resolution : int, image_interval : int, event_date_time : datetime, random_generator) -> int:
+
+    number_of_images = 0
+
+    for minute in range(0, 24*60, image_interval):
+        date_time = day + timedelta(minutes=minute)
+        intensity = float(get_event_profile([date_time], event_date_time)[0])
+
+        save_sun_image(os.path.join(output_folder, f"{date_time:%Y%m%d_%H%M}_{image_type}_{image_resolution}.jpg"), image_resolution, intensity, random_generator)
+        number_of_images += 1
+
+        # Images of the other types and resolutions
+        if minute % 60 == 0:
+            for (other_type, other_resolution) in OTHER_IMAGES:
+                save_sun_image(os.path.join(output_folder, f"{date_time:%Y%m%d_%H%M}_{other_type}_{other_resolution}.jpg"), other_resolution, intensity, random_generator)
+                number_of_images += 1
+
+    return number_of_images
+
+
+
+# Function saving a square image of the solar disk, with noise and active regions (brighter during the event),
+# so that it is decoded like a real image
+def save_sun_image(image_path : str, resolution : int, intensity : float, random_generator):
+
+    (coordinates, disk) = get_solar_disk(resolution)
+    brightness = disk.copy()
+
+    # Active regions, only drawn around their center
+    for _ in range(6):
+        (center_x, center_y) = random_generator.uniform(-0.7, 0.7, size=2)
+        spot_size = random_generator.uniform(0.03, 0.08)
+
+        (first_column, last_column) = np.searchsorted(coordinates, [center_x - 4*spot_size, center_x + 4*spot_size])
+        (first_row, last_row) = np.searchsorted(coordinates, [center_y - 4*spot_size, center_y + 4*spot_size])
+
+        spot_x = (coordinates[first_column:last_column] - center_x)**2
+        spot_y = (coordinates[first_row:last_row] - center_y)**2
+        brightness[first_row:last_row, first_column:last_column] += (0.3 + intensity) * np.exp(-(spot_y[:, np.newaxis] + spot_x[np.newaxis, :]) / (2 * spot_size**2))
+
+    # Noise
+    brightness += random_generator.standard_normal(size=brightness.shape, dtype=np.float32) * 0.03
+
+    # Coloring the image like an EIT image
+    np.clip(brightness, 0, 1, out=brightness)
+    pixels = np.stack([brightness, brightness * np.sqrt(brightness) * 0.85, brightness**3 * 0.4], axis=-1)
+
+    Image.fromarray((pixels * 255).astype(np.uint8), mode="RGB").save(image_path, quality=90)
+
+
+
+# Function giving the coordinates of the pixels (relative to the radius of the disk) of an image of the solar disk,
+# and the brightness of the disk, darker on its limb, with a faint corona
+@functools.lru_cache(maxsize=None)
+def get_solar_disk(resolution : int) -> tuple:
+
+    coordinates = ((np.arange(resolution) - resolution / 2) / (resolution * 0.4)).astype(np.float32)
+    distances = np.sqrt(coordinates[np.newaxis, :]**2 + coordinates[:, np.newaxis]**2)
+
+    disk = np.where(distances <= 1, 0.55 + 0.35 * np.sqrt(np.clip(1 - distances**2, 0, 1)), 0.25 * np.exp(-(distances - 1) * 8)).astype(np.float32)
+
+    return (coordinates, disk)
+
+
+
+# Function writing the GOES proton flux file of a day, and giving its number of measures
+def write_proton_file(output_folder : str, day : datetime, proton_interval : int, event_date_time : datetime, random_generator) -> int:
+
+    date_times = [day + timedelta(minutes=minute) for minute in range(0, 24*60, proton_interval)]
+    event_profile = get_event_profile(date_times, event_date_time)
+
+    measures = []
+
+    for (energy_index, (one_energy, background)) in enumerate(PROTON_BACKGROUNDS.items()):
+
+        # The event rises more for the lower energies
+        fluxes = background * (1 + 400 * event_profile / (1 + energy_index)) * random_generator.lognormal(0, 0.08, size=len(date_times))
+
+        for (one_date_time, flux) in zip(date_times, fluxes):
+            measures.append({"time_tag": f"{one_date_time:%Y-%m-%dT%H:%M:%S}Z", "satellite": 18, "flux": float(flux), "energy": one_energy})
+
+    # The measures are sorted by time, like in the real files
+    measures.sort(key=lambda one_measure: one_measure["time_tag"])
+
+    with open(os.path.join(output_folder, f"{day:%Y%m%d}_integral-protons-1-day.json"), mode="w") as json_file:
+        json.dump(measures, json_file)
+
+    return len(measures)
+
+
+
+# Function writing the NMDB neutron flux file of a day, and giving its number of measures
+def write_neutron_file(output_folder : str, day : datetime, neutron_interval : int, event_date_time : datetime, random_generator) -> int:
+
+    date_times = [day + timedelta(minutes=minute) for minute in range(0, 24*60, neutron_interval)]
+
+    # The count rates decrease during the event (Forbush decrease)
+    event_profile = get_event_profile(date_times, event_date_time)
+    columns = [count_rate * (1 - 0.08 * event_profile) * random_generator.normal(1, 0.01, size=len(date_times)) for count_rate in NEUTRON_STATIONS.values()]
+
+    with open(os.path.join(output_folder, f"neutron_flux_{day:%Y_%m_%d}.csv"), mode="w") as csv_file:
+        csv_file.write("start_date_time   ;" + ";".join(NEUTRON_STATIONS.keys()) + "\n")
+
+        for (row_index, one_date_time) in enumerate(date_times):
+            csv_file.write(f"{one_date_time:%Y-%m-%d %H:%M:%S};" + ";".join(f"{one_column[row_index]:8.3f}" for one_column in columns) + "\n")
+
+    return len(date_times)
+
+
+
+# Function building the parser of the command line of the generator
+def build_argument_parser() -> argparse.ArgumentParser:
+
+    parser = argparse.ArgumentParser(description="Writes a synthetic SolarActivid dataset (solar activity images, GOES proton flux and NMDB neutron flux files), and prints its description as JSON.")
+    parser.add_argument("--output", help="folder of the dataset (a new temporary folder by default)")
+    parser.add_argument("--begin", default=DEFAULT_BEGIN, help=f"first day of the dataset (default: {DEFAULT_BEGIN})")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help=f"number of days (default: {DEFAULT_DAYS})")
+    parser.add_argument("--image-type", dest="image_type", default=DEFAULT_IMAGE_TYPE, help=f"type of the images (default: {DEFAULT_IMAGE_TYPE})")
+    parser.add_argument("--image-resolution", dest="image_resolution", type=int, choices=[512, 1024], default=DEFAULT_IMAGE_RESOLUTION, help=f"resolution of the images (default: {DEFAULT_IMAGE_RESOLUTION})")
+    parser.add_argument("--image-interval", dest="image_interval", type=int, default=DEFAULT_IMAGE_INTERVAL, help=f"minutes between two images (default: {DEFAULT_IMAGE_INTERVAL})")
+    parser.add_argument("--proton-interval", dest="proton_interval", type=int, default=DEFAULT_PROTON_INTERVAL, help=f"minutes between two proton flux measures (default: {DEFAULT_PROTON_INTERVAL})")
+    parser.add_argument("--neutron-interval", dest="neutron_interval", type=int, default=DEFAULT_NEUTRON_INTERVAL, help=f"minutes between two neutron flux measures (default: {DEFAULT_NEUTRON_INTERVAL})")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"seed of the random values (default: {DEFAULT_SEED})")
+
+    return parser
+
+
+
+# Function giving the keyword arguments of generate_dataset() from the parsed command line
+def get_dataset_arguments(arguments : argparse.Namespace) -> dict:
+    return {
+        "begin_date": datetime.fromisoformat(arguments.begin),
+        "days": arguments.days,
+        "image_type": arguments.image_type,
+        "image_resolution": arguments.image_resolution,
+        "image_interval": arguments.image_interval,
+        "proton_interval": arguments.proton_interval,
+        "neutron_interval": arguments.neutron_interval,
+        "seed": arguments.seed
+    }
+
+
+
+# Main function
+if __name__ == "__main__":
+
+    arguments = build_argument_parser().parse_args()
+    output_folder = arguments.output if arguments.output is not None else tempfile.mkdtemp(prefix="solaractivid_dataset_")
+
+    print(json.dumps(generate_dataset(output_folder, **get_dataset_arguments(arguments)), indent=4))
+    sys.exit(0)
\ No newline at end of file